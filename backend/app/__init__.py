@@ -1,6 +1,6 @@
-from flask import Flask
+from flask import Flask, jsonify
 from app.config import Config
-from app.extensions import db, ma, cors, bcrypt, jwt, mail
+from app.extensions import db, ma, cors, jwt, mail, sock
 from app.routes import register_routes
 from app.models import * 
 
@@ -12,9 +12,42 @@ def create_app(config_class=Config):
     db.init_app(app)
     ma.init_app(app)
     cors.init_app(app)
-    bcrypt.init_app(app)
     jwt.init_app(app)
     mail.init_app(app)
+    sock.init_app(app)
+
+    from app.models.setting import init_settings_cache
+    init_settings_cache(app)
+
+    from app.services.event_broker import init_broker
+    init_broker(app)
+
+    from app.services.email_service import init_email_outbox
+    init_email_outbox(app)
+
+    from app.passwords import init_password_hasher, HasherBusy
+    init_password_hasher(app)
+
+    @app.errorhandler(HasherBusy)
+    def password_hasher_busy(e):
+        return jsonify({'message': 'Server is busy, please try again shortly'}), 503, {'Retry-After': '1'}
+
+    from app.services.kyc_service import init_kyc_processing
+    init_kyc_processing(app)
+
+    from app.google_tokens import init_google_verifier
+    init_google_verifier(app)
+
+    from app.ratelimit import init_rate_limiter, RateLimited, ServerBusy
+    init_rate_limiter(app)
+
+    @app.errorhandler(RateLimited)
+    def rate_limited(e):
+        return jsonify({'message': 'Too many requests, please try again later'}), 429, {'Retry-After': str(e.retry_after)}
+
+    @app.errorhandler(ServerBusy)
+    def server_busy(e):
+        return jsonify({'message': 'Server is busy, please try again shortly'}), 503, {'Retry-After': '1'}
 
     # Register routes
     register_routes(app)
@@ -0,0 +1,43 @@
+from functools import wraps
+from flask import g, jsonify
+from flask_jwt_extended import jwt_required, get_jwt, get_jwt_identity
+
+def token_claims(user):
+    """Claims embedded in access tokens so authorization needs no user lookup"""
+    return {
+        'role': user.role.value if user.role else None,
+        'verification_status': user.verification_status.value if user.verification_status else None
+    }
+
+def current_user():
+    """The authenticated User row, loaded at most once per request"""
+    if 'current_user' not in g:
+        from app.models.user import User
+        g.current_user = User.query.get(get_jwt_identity())
+    return g.current_user
+
+def current_role():
+    """Role from the token; tokens issued before claims existed fall back to the row"""
+    role = get_jwt().get('role')
+    if role is None:
+        user = current_user()
+        role = user.role.value if user and user.role else None
+    return role
+
+def has_role(*roles):
+    return current_role() in {getattr(r, 'value', r) for r in roles}
+
+def role_required(*roles, message='Admin access required', error_key='message'):
+    """
+    jwt_required plus a role check against the token claims. Claims are
+    fixed at login, so a role change applies once the user's token is renewed.
+    """
+    def decorator(fn):
+        @wraps(fn)
+        @jwt_required()
+        def wrapper(*args, **kwargs):
+            if not has_role(*roles):
+                return jsonify({error_key: message}), 403
+            return fn(*args, **kwargs)
+        return wrapper
+    return decorator
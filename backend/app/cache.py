@@ -0,0 +1,54 @@
+import threading
+import time
+from collections import OrderedDict
+
+class TTLCache:
+    """
+    Small thread-safe process-local cache with per-entry expiry.
+    Values are only as fresh as ttl allows across workers, so callers
+    must invalidate locally on write and tolerate short staleness elsewhere.
+
+    Entries are kept in least-recently-used order. A set drops expired
+    entries from the old end and, when still full, evicts the least
+    recently used one, so every operation is O(1) amortized.
+    """
+
+    def __init__(self, ttl=5.0, maxsize=10000):
+        self.ttl = ttl
+        self.maxsize = maxsize
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, default=None):
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return default
+            value, expires_at = entry
+            if expires_at < time.monotonic():
+                del self._data[key]
+                return default
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key, value, ttl=None):
+        now = time.monotonic()
+        with self._lock:
+            self._data[key] = (value, now + (self.ttl if ttl is None else ttl))
+            self._data.move_to_end(key)
+            # Each expired entry is popped once, so the purge stays O(1) amortized
+            while self._data:
+                oldest_key, (_, expires_at) = next(iter(self._data.items()))
+                if expires_at >= now:
+                    break
+                del self._data[oldest_key]
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def invalidate(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
@@ -8,6 +8,32 @@ class Config:
     JWT_SECRET_KEY = os.environ.get('JWT_SECRET_KEY') or 'jwt-super-secret-key-change-this'
     JWT_ACCESS_TOKEN_EXPIRES = timedelta(days=1)
 
+    # Password hashing: bcrypt work factor and the bounded pool it runs on.
+    # Changing BCRYPT_LOG_ROUNDS rehashes each password on its next login.
+    BCRYPT_LOG_ROUNDS = int(os.environ.get('BCRYPT_LOG_ROUNDS') or 12)
+    PASSWORD_HASH_WORKERS = int(os.environ.get('PASSWORD_HASH_WORKERS') or max(1, (os.cpu_count() or 2) // 2))
+    PASSWORD_HASH_QUEUE_SIZE = int(os.environ.get('PASSWORD_HASH_QUEUE_SIZE') or 64) # Running plus waiting; beyond this requests get 503
+    PASSWORD_HASH_TIMEOUT_SECONDS = float(os.environ.get('PASSWORD_HASH_TIMEOUT_SECONDS') or 10)
+
+    # Rate limiting for the public auth endpoints: token buckets per client IP
+    # and per email ('N/second|minute|hour|day'), plus a per-process cap on
+    # concurrent expensive requests. 'redis' shares buckets across workers.
+    RATE_LIMIT_ENABLED = os.environ.get('RATE_LIMIT_ENABLED', 'true').lower() == 'true'
+    RATE_LIMIT_BACKEND = os.environ.get('RATE_LIMIT_BACKEND') or 'memory' # or 'redis'
+    RATE_LIMIT_REDIS_URL = os.environ.get('RATE_LIMIT_REDIS_URL') or 'redis://localhost:6379/0'
+    RATE_LIMIT_MAX_KEYS = int(os.environ.get('RATE_LIMIT_MAX_KEYS') or 100000)
+    RATE_LIMIT_PROXY_HOPS = int(os.environ.get('RATE_LIMIT_PROXY_HOPS') or 0) # Trusted proxies in front of the app
+    RATE_LIMIT_LOGIN_IP = os.environ.get('RATE_LIMIT_LOGIN_IP') or '30/minute'
+    RATE_LIMIT_LOGIN_EMAIL = os.environ.get('RATE_LIMIT_LOGIN_EMAIL') or '10/minute'
+    RATE_LIMIT_REGISTER_IP = os.environ.get('RATE_LIMIT_REGISTER_IP') or '20/hour'
+    RATE_LIMIT_REGISTER_EMAIL = os.environ.get('RATE_LIMIT_REGISTER_EMAIL') or '5/hour'
+    RATE_LIMIT_OTP_IP = os.environ.get('RATE_LIMIT_OTP_IP') or '30/minute'
+    RATE_LIMIT_OTP_EMAIL = os.environ.get('RATE_LIMIT_OTP_EMAIL') or '5/minute'
+    RATE_LIMIT_PASSWORD_RESET_IP = os.environ.get('RATE_LIMIT_PASSWORD_RESET_IP') or '10/hour'
+    RATE_LIMIT_PASSWORD_RESET_EMAIL = os.environ.get('RATE_LIMIT_PASSWORD_RESET_EMAIL') or '3/hour'
+    RATE_LIMIT_GOOGLE_LOGIN_IP = os.environ.get('RATE_LIMIT_GOOGLE_LOGIN_IP') or '30/minute'
+    AUTH_CONCURRENCY_LIMIT = int(os.environ.get('AUTH_CONCURRENCY_LIMIT') or 32) # In-flight auth requests per process; beyond this 503
+
     # Chapa Configuration
     BACKEND_BASE_URL = os.environ.get('BACKEND_BASE_URL') or 'http://localhost:5000'
     FRONTEND_BASE_URL = os.environ.get('FRONTEND_BASE_URL') or 'http://localhost:3000'
@@ -27,9 +53,61 @@ class Config:
     MAIL_PASSWORD = os.environ.get('MAIL_PASSWORD') or 'vfnn snpl dibp uzzr'
     MAIL_DEFAULT_SENDER = os.environ.get('MAIL_DEFAULT_SENDER') or 'abubekermubarek7545@gmail.com'
     MAIL_FROM_NAME = os.environ.get('MAIL_FROM_NAME') or 'GlobalPath Logistics'
+
+    # Email Outbox
+    EMAIL_OUTBOX_WORKER = os.environ.get('EMAIL_OUTBOX_WORKER', 'true').lower() == 'true' # 'false' when email_worker.py runs separately
+    EMAIL_OUTBOX_BATCH_SIZE = int(os.environ.get('EMAIL_OUTBOX_BATCH_SIZE') or 50) # Messages per SMTP connection
+    EMAIL_OUTBOX_POLL_SECONDS = float(os.environ.get('EMAIL_OUTBOX_POLL_SECONDS') or 30)
+    EMAIL_OUTBOX_LEASE_SECONDS = int(os.environ.get('EMAIL_OUTBOX_LEASE_SECONDS') or 300)
+    EMAIL_MAX_ATTEMPTS = int(os.environ.get('EMAIL_MAX_ATTEMPTS') or 6)
+    EMAIL_RETRY_BASE_SECONDS = int(os.environ.get('EMAIL_RETRY_BASE_SECONDS') or 30) # Doubles per attempt
+    EMAIL_RETRY_MAX_SECONDS = int(os.environ.get('EMAIL_RETRY_MAX_SECONDS') or 3600)
     
     # Google OAuth
     GOOGLE_CLIENT_ID = os.environ.get('GOOGLE_CLIENT_ID') or "40182803174-dijfcrlpuu2du8ptq8hiha4e57h7pirf.apps.googleusercontent.com"
+    GOOGLE_CERTS_URL = os.environ.get('GOOGLE_CERTS_URL') or 'https://www.googleapis.com/oauth2/v1/certs'
+    GOOGLE_CERTS_DEFAULT_TTL = int(os.environ.get('GOOGLE_CERTS_DEFAULT_TTL') or 3600) # When the response has no max-age
+    GOOGLE_CERTS_REFRESH_MARGIN = int(os.environ.get('GOOGLE_CERTS_REFRESH_MARGIN') or 300) # Background refresh this long before expiry
+    GOOGLE_CERTS_TIMEOUT = float(os.environ.get('GOOGLE_CERTS_TIMEOUT') or 5)
+    GOOGLE_TOKEN_CLOCK_SKEW = int(os.environ.get('GOOGLE_TOKEN_CLOCK_SKEW') or 0)
+
+    # Global settings: each worker re-checks the settings version at most this often
+    SETTINGS_CACHE_CHECK_SECONDS = float(os.environ.get('SETTINGS_CACHE_CHECK_SECONDS') or 5)
+    PUBLIC_SETTINGS_MAX_AGE = int(os.environ.get('PUBLIC_SETTINGS_MAX_AGE') or 60) # Browsers revalidate with the ETag after this
+
+    # Notifications
+    NOTIFICATION_COUNT_CACHE_SECONDS = float(os.environ.get('NOTIFICATION_COUNT_CACHE_SECONDS') or 5)
+    NOTIFICATION_COALESCE_WINDOW_SECONDS = int(os.environ.get('NOTIFICATION_COALESCE_WINDOW_SECONDS') or 3600)
+    NOTIFICATION_RETENTION_BATCH_SIZE = int(os.environ.get('NOTIFICATION_RETENTION_BATCH_SIZE') or 1000)
+
+    # Messaging
+    MESSAGE_PAGE_SIZE = int(os.environ.get('MESSAGE_PAGE_SIZE') or 50)
+    MESSAGE_PAGE_SIZE_MAX = int(os.environ.get('MESSAGE_PAGE_SIZE_MAX') or 200)
+    MESSAGE_NOTIFICATION_THROTTLE_SECONDS = int(os.environ.get('MESSAGE_NOTIFICATION_THROTTLE_SECONDS') or 300)
+    USER_NAME_CACHE_SECONDS = int(os.environ.get('USER_NAME_CACHE_SECONDS') or 300)
+
+    # Admin Exports
+    EXPORT_BATCH_SIZE = int(os.environ.get('EXPORT_BATCH_SIZE') or 1000)
+
+    # KYC uploads: normalized off-thread after upload
+    KYC_IMAGE_MAX_DIMENSION = int(os.environ.get('KYC_IMAGE_MAX_DIMENSION') or 2000) # Longest side in pixels
+    KYC_THUMBNAIL_SIZE = int(os.environ.get('KYC_THUMBNAIL_SIZE') or 400)
+    KYC_IMAGE_QUALITY = int(os.environ.get('KYC_IMAGE_QUALITY') or 85)
+    KYC_PROCESSING_WORKERS = int(os.environ.get('KYC_PROCESSING_WORKERS') or 2)
+    KYC_PROCESSING_QUEUE_SIZE = int(os.environ.get('KYC_PROCESSING_QUEUE_SIZE') or 32) # Beyond this uploads wait for maintenance
+
+    # Realtime Event Stream (SSE)
+    EVENT_BROKER_BACKEND = os.environ.get('EVENT_BROKER_BACKEND') or 'memory'
+    SSE_HEARTBEAT_SECONDS = float(os.environ.get('SSE_HEARTBEAT_SECONDS') or 15)
+    SSE_QUEUE_SIZE = int(os.environ.get('SSE_QUEUE_SIZE') or 100)
+    SSE_REPLAY_SIZE = int(os.environ.get('SSE_REPLAY_SIZE') or 1000)
+    SSE_RETRY_MS = int(os.environ.get('SSE_RETRY_MS') or 3000)
+
+    # WebSocket Chat
+    CHAT_WS_QUEUE_SIZE = int(os.environ.get('CHAT_WS_QUEUE_SIZE') or 256)
+    CHAT_WS_OVERFLOW_POLICY = os.environ.get('CHAT_WS_OVERFLOW_POLICY') or 'drop_oldest' # or 'disconnect'
+    CHAT_WS_PING_SECONDS = float(os.environ.get('CHAT_WS_PING_SECONDS') or 25)
+    CHAT_WS_MAX_MESSAGE_LENGTH = int(os.environ.get('CHAT_WS_MAX_MESSAGE_LENGTH') or 4000)
 
     # Default Subscription Plans
     DEFAULT_SENDER_PLAN_ID = os.environ.get('DEFAULT_SENDER_PLAN_ID') or 's-free-promo-6mo'
@@ -15,5 +15,6 @@ SETTING_KYC_VERIFICATION_BONUS = 'kyc_verification_bonus_amount'
 SETTING_HOLIDAY_BONUS_AMOUNT = 'holiday_bonus_amount'
 SETTING_LAST_HOLIDAY_CHECK = 'last_processed_holiday_check_date'
 
-
-
+# Notification Retention Setting Keys
+SETTING_NOTIFICATION_RETENTION_DAYS = 'notification_retention_days'
+SETTING_NOTIFICATION_RETENTION_ARCHIVE = 'notification_retention_archive'
@@ -1,13 +1,13 @@
 from flask_sqlalchemy import SQLAlchemy
 from flask_marshmallow import Marshmallow
 from flask_cors import CORS
-from flask_bcrypt import Bcrypt
 from flask_jwt_extended import JWTManager
 from flask_mail import Mail
+from flask_sock import Sock
 
 db = SQLAlchemy()
 ma = Marshmallow()
-cors = CORS()
-bcrypt = Bcrypt()
+cors = CORS(expose_headers=['X-Next-Cursor']) # Keyset page cursor returned by list endpoints
 jwt = JWTManager()
 mail = Mail()
+sock = Sock()
@@ -0,0 +1,150 @@
+import threading
+import time
+import requests
+from requests.adapters import HTTPAdapter
+from google.auth import jwt as google_jwt
+
+GOOGLE_CERTS_URL = 'https://www.googleapis.com/oauth2/v1/certs'
+GOOGLE_ISSUERS = ('accounts.google.com', 'https://accounts.google.com')
+
+def cache_lifetime(headers, default):
+    """Seconds a response may be reused per Cache-Control max-age minus Age"""
+    max_age = default
+    for directive in headers.get('Cache-Control', '').split(','):
+        name, _, value = directive.strip().partition('=')
+        name = name.lower()
+        if name in ('no-store', 'no-cache'):
+            return 0
+        if name == 'max-age':
+            try:
+                max_age = int(value.strip('"'))
+            except ValueError:
+                pass
+    try:
+        age = int(headers.get('Age') or 0)
+    except ValueError:
+        age = 0
+    return max(0, max_age - age)
+
+class GoogleTokenVerifier:
+    """
+    Verifies Google ID tokens locally against a process-wide copy of
+    Google's signing certificates. The certificates are kept for as long as
+    the response's Cache-Control allows and refreshed on a background thread
+    `refresh_margin` seconds before they expire, so logins normally do no
+    network I/O. Fetches share one pooled HTTP session. A token signed with
+    a key id we don't have (key rotation) forces one early refetch, at most
+    every `min_refetch_interval` seconds. If a refetch fails, the expired
+    keys stay in use and the fetch is retried after that same interval;
+    Google publishes keys well before signing with them.
+    """
+
+    def __init__(self, certs_url=GOOGLE_CERTS_URL, default_ttl=3600, refresh_margin=300, timeout=5, clock_skew=0, min_refetch_interval=60):
+        self._lock = threading.Lock()
+        self._fetch_lock = threading.Lock()
+        self._certs = {}
+        self._expires_at = 0
+        self._refreshing = False
+        self._last_fetch = 0
+        self.session = requests.Session()
+        self.session.mount('https://', HTTPAdapter(pool_connections=1, pool_maxsize=4))
+        self.configure(certs_url, default_ttl, refresh_margin, timeout, clock_skew, min_refetch_interval)
+
+    def configure(self, certs_url=GOOGLE_CERTS_URL, default_ttl=3600, refresh_margin=300, timeout=5, clock_skew=0, min_refetch_interval=60):
+        with self._lock:
+            if certs_url != getattr(self, 'certs_url', certs_url):
+                self._certs, self._expires_at = {}, 0
+            self.certs_url = certs_url
+            self.default_ttl = default_ttl
+            self.refresh_margin = refresh_margin
+            self.timeout = timeout
+            self.clock_skew = clock_skew
+            self.min_refetch_interval = min_refetch_interval
+
+    def _fetch(self, force=False):
+        with self._fetch_lock:
+            with self._lock:
+                # Another thread may have refreshed while we waited for the fetch lock
+                if not force and self._certs and time.monotonic() < self._expires_at - self.refresh_margin:
+                    return self._certs
+            response = self.session.get(self.certs_url, timeout=self.timeout)
+            response.raise_for_status()
+            certs = response.json()
+            lifetime = cache_lifetime(response.headers, self.default_ttl)
+            with self._lock:
+                self._certs = certs
+                self._expires_at = time.monotonic() + lifetime
+                self._last_fetch = time.monotonic()
+            return certs
+
+    def _refresh_in_background(self):
+        with self._lock:
+            if self._refreshing:
+                return
+            self._refreshing = True
+
+        def run():
+            try:
+                self._fetch()
+            except Exception as e:
+                print(f"Google certificate refresh failed: {str(e)}")
+            finally:
+                with self._lock:
+                    self._refreshing = False
+
+        threading.Thread(target=run, name='google-certs', daemon=True).start()
+
+    def certs(self):
+        now = time.monotonic()
+        with self._lock:
+            certs, expires_at = self._certs, self._expires_at
+        if certs and now < expires_at:
+            if expires_at - now <= self.refresh_margin:
+                self._refresh_in_background()
+            return certs
+        try:
+            return self._fetch()
+        except Exception as e:
+            if not certs:
+                raise
+            print(f"Google certificate fetch failed, using expired keys: {str(e)}")
+            with self._lock:
+                # Don't make every login wait on a dead endpoint; retry after the interval
+                self._expires_at = time.monotonic() + self.min_refetch_interval
+            return certs
+
+    def _certs_with_key(self, kid):
+        certs = self.certs()
+        if kid and kid not in certs:
+            with self._lock:
+                recently = time.monotonic() - self._last_fetch < self.min_refetch_interval
+            if not recently:
+                certs = self._fetch(force=True)
+        return certs
+
+    def verify(self, token, audience):
+        """Decoded claims of a valid Google ID token for `audience`; raises ValueError otherwise"""
+        if isinstance(token, bytes):
+            token = token.decode('utf-8')
+        kid = google_jwt.decode_header(token).get('kid')
+        claims = google_jwt.decode(
+            token,
+            certs=self._certs_with_key(kid),
+            audience=audience,
+            clock_skew_in_seconds=self.clock_skew
+        )
+        if claims.get('iss') not in GOOGLE_ISSUERS:
+            raise ValueError('Wrong issuer.')
+        return claims
+
+google_verifier = GoogleTokenVerifier()
+
+def init_google_verifier(app):
+    google_verifier.configure(
+        certs_url=app.config.get('GOOGLE_CERTS_URL', GOOGLE_CERTS_URL),
+        default_ttl=app.config.get('GOOGLE_CERTS_DEFAULT_TTL', 3600),
+        refresh_margin=app.config.get('GOOGLE_CERTS_REFRESH_MARGIN', 300),
+        timeout=app.config.get('GOOGLE_CERTS_TIMEOUT', 5),
+        clock_skew=app.config.get('GOOGLE_TOKEN_CLOCK_SKEW', 0)
+    )
+    return google_verifier
@@ -1,7 +1,9 @@
 from .user import User
-from .subscription import SubscriptionPlan, SubscriptionTransaction
+from .subscription import SubscriptionPlan, SubscriptionTransaction, UserEntitlement
 from .shipment import ShipmentItem
 from .message import Message
-from .setting import GlobalSetting
+from .setting import GlobalSetting, SettingsVersion
 from .enums import UserRole, ItemStatus, VerificationStatus
 from .supported_country import SupportedCountry
+from .sync import SyncSequence
+from .email_outbox import OutboundEmail
@@ -0,0 +1,42 @@
+from app.extensions import db
+from datetime import datetime
+import uuid
+
+class OutboundEmail(db.Model):
+    """
+    Persisted outgoing email. Request handlers only insert rows; the outbox
+    worker (app.services.email_service) claims due rows, delivers them over
+    one SMTP connection per batch and records the outcome here.
+    """
+    __tablename__ = 'email_outbox'
+
+    id = db.Column(db.String(36), primary_key=True, default=lambda: str(uuid.uuid4()))
+    recipients = db.Column(db.JSON, nullable=False)
+    subject = db.Column(db.String(255), nullable=False)
+    body = db.Column(db.Text, nullable=False)
+    subtype = db.Column(db.String(10), default='html') # 'html' | 'plain'
+    status = db.Column(db.String(20), default='PENDING') # 'PENDING' | 'SENDING' | 'SENT' | 'FAILED'
+    attempts = db.Column(db.Integer, default=0)
+    next_attempt_at = db.Column(db.DateTime, default=datetime.utcnow)
+    claim_token = db.Column(db.String(36)) # Set by the worker holding the row
+    locked_until = db.Column(db.DateTime) # A SENDING row past this is reclaimed (worker died mid-batch)
+    last_error = db.Column(db.Text)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    sent_at = db.Column(db.DateTime)
+
+    __table_args__ = (
+        db.Index('ix_email_outbox_status_due', 'status', 'next_attempt_at'),
+    )
+
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'recipients': self.recipients,
+            'subject': self.subject,
+            'status': self.status,
+            'attempts': self.attempts,
+            'next_attempt_at': self.next_attempt_at.isoformat() if self.next_attempt_at else None,
+            'last_error': self.last_error,
+            'created_at': self.created_at.isoformat() if self.created_at else None,
+            'sent_at': self.sent_at.isoformat() if self.sent_at else None
+        }
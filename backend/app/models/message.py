@@ -1,7 +1,10 @@
 from app.extensions import db
+from sqlalchemy import event
 from datetime import datetime
 import uuid
 
+PREVIEW_LENGTH = 140
+
 class MessageThread(db.Model):
     __tablename__ = 'message_threads'
 
@@ -9,8 +12,25 @@ class MessageThread(db.Model):
     shipment_id = db.Column(db.String(36), db.ForeignKey('shipment_items.id'), nullable=True) # Optional context
     participant1_id = db.Column(db.String(36), db.ForeignKey('users.id'), nullable=False)
     participant2_id = db.Column(db.String(36), db.ForeignKey('users.id'), nullable=False)
+
+    # Canonical lookup key: participants in sorted order plus the shipment context
+    # ('' for a general conversation, since NULLs never collide in a unique index)
+    participant_low = db.Column(db.String(36), nullable=False)
+    participant_high = db.Column(db.String(36), nullable=False)
+    context_key = db.Column(db.String(36), nullable=False, default='')
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    change_seq = db.Column(db.BigInteger, nullable=True) # Delta-sync stamp, see app.models.sync
+
+    # Denormalized summary of the newest message, maintained by message_service.create_message
+    last_message_id = db.Column(db.String(36), nullable=True)
+    last_message_preview = db.Column(db.String(255), nullable=True)
+    last_sender_id = db.Column(db.String(36), nullable=True)
+    last_message_at = db.Column(db.DateTime, nullable=True)
+
+    # Unread messages addressed to each participant
+    participant1_unread = db.Column(db.Integer, default=0)
+    participant2_unread = db.Column(db.Integer, default=0)
     
     # Relationships
     participant1 = db.relationship('User', foreign_keys=[participant1_id], backref='threads_as_p1')
@@ -18,6 +38,37 @@ class MessageThread(db.Model):
     shipment = db.relationship('ShipmentItem', backref='threads')
     messages = db.relationship('Message', backref='thread', lazy=True, cascade="all, delete-orphan")
 
+    __table_args__ = (
+        db.Index('ix_message_threads_p1_updated', 'participant1_id', 'updated_at'),
+        db.Index('ix_message_threads_p2_updated', 'participant2_id', 'updated_at'),
+        db.Index('ix_message_threads_p1_change', 'participant1_id', 'change_seq'),
+        db.Index('ix_message_threads_p2_change', 'participant2_id', 'change_seq'),
+        db.Index('ux_message_threads_key', 'participant_low', 'participant_high', 'context_key', unique=True),
+    )
+
+    @staticmethod
+    def thread_key(user_id1, user_id2, shipment_id=None):
+        """(participant_low, participant_high, context_key) for a pair of users"""
+        low, high = sorted((user_id1, user_id2))
+        return low, high, shipment_id or ''
+
+    def unread_column_for(self, user_id):
+        return MessageThread.participant1_unread if user_id == self.participant1_id else MessageThread.participant2_unread
+
+    def unread_for(self, user_id):
+        if user_id == self.participant1_id:
+            return self.participant1_unread or 0
+        if user_id == self.participant2_id:
+            return self.participant2_unread or 0
+        return 0
+
+    def set_last_message(self, message):
+        self.last_message_id = message.id
+        self.last_message_preview = message.text[:PREVIEW_LENGTH] if message.text else None
+        self.last_sender_id = message.sender_id
+        self.last_message_at = message.timestamp
+        self.updated_at = message.timestamp
+
 class Message(db.Model):
     __tablename__ = 'messages'
 
@@ -34,3 +85,84 @@ class Message(db.Model):
     shipment = db.relationship('ShipmentItem', backref='messages')
     sender = db.relationship('User', foreign_keys=[sender_id], backref='sent_messages')
     receiver = db.relationship('User', foreign_keys=[receiver_id], backref='received_messages')
+
+    __table_args__ = (
+        db.Index('ix_messages_thread_timestamp', 'thread_id', 'timestamp', 'id'),
+    )
+
+# Full-text index over Message.text. It lives outside the model metadata
+# because the DDL is dialect specific: an FTS5 shadow table kept in sync by
+# triggers on SQLite, a GIN expression index on PostgreSQL. Other databases
+# fall back to LIKE in message_service.search_messages.
+#
+# The FTS5 table is an external-content index over messages keyed by the
+# messages rowid, so the triggers delete by rowid instead of scanning for a
+# message id, and snippet() reads the text back from messages itself.
+# VACUUM may renumber rowids of a table without an INTEGER PRIMARY KEY; run
+# rebuild_search_index afterwards.
+SEARCH_DDL = {
+    'sqlite': [
+        "CREATE VIRTUAL TABLE IF NOT EXISTS messages_fts USING fts5(text, content='messages', content_rowid='rowid')",
+        "CREATE TRIGGER IF NOT EXISTS messages_fts_insert AFTER INSERT ON messages BEGIN "
+        "INSERT INTO messages_fts (rowid, text) VALUES (new.rowid, new.text); END",
+        "CREATE TRIGGER IF NOT EXISTS messages_fts_delete AFTER DELETE ON messages BEGIN "
+        "INSERT INTO messages_fts (messages_fts, rowid, text) VALUES ('delete', old.rowid, old.text); END",
+        "CREATE TRIGGER IF NOT EXISTS messages_fts_update AFTER UPDATE OF text ON messages BEGIN "
+        "INSERT INTO messages_fts (messages_fts, rowid, text) VALUES ('delete', old.rowid, old.text); "
+        "INSERT INTO messages_fts (rowid, text) VALUES (new.rowid, new.text); END",
+    ],
+    'postgresql': [
+        "CREATE INDEX IF NOT EXISTS ix_messages_text_search ON messages USING gin (to_tsvector('simple', text))",
+    ],
+}
+
+SEARCH_REBUILD = {
+    'sqlite': "INSERT INTO messages_fts (messages_fts) VALUES ('rebuild')",
+}
+
+# Earlier layout: a standalone FTS table with the message id in an UNINDEXED column
+LEGACY_SQLITE_DROP = [
+    "DROP TRIGGER IF EXISTS messages_fts_insert",
+    "DROP TRIGGER IF EXISTS messages_fts_delete",
+    "DROP TRIGGER IF EXISTS messages_fts_update",
+    "DROP TABLE IF EXISTS messages_fts",
+]
+
+def _sqlite_search_table(connection):
+    return connection.exec_driver_sql(
+        "SELECT sql FROM sqlite_master WHERE type = 'table' AND name = 'messages_fts'"
+    ).scalar()
+
+def create_search_index(connection, backfill=False):
+    """
+    Create the dialect's message search index; `backfill` indexes existing
+    rows when the index is new, replacing the legacy message_id layout.
+    """
+    dialect = connection.dialect.name
+    created = False
+    if dialect == 'sqlite':
+        existing = _sqlite_search_table(connection)
+        if existing and 'message_id' in existing:
+            for statement in LEGACY_SQLITE_DROP:
+                connection.exec_driver_sql(statement)
+            existing = None
+        created = existing is None
+    for statement in SEARCH_DDL.get(dialect, []):
+        connection.exec_driver_sql(statement)
+    if backfill and created:
+        rebuild_search_index(connection)
+
+def rebuild_search_index(connection):
+    """Reindex every message from the messages table"""
+    statement = SEARCH_REBUILD.get(connection.dialect.name)
+    if statement:
+        connection.exec_driver_sql(statement)
+
+@event.listens_for(Message.__table__, 'after_create')
+def _create_search_index(target, connection, **kw):
+    create_search_index(connection)
+
+@event.listens_for(Message.__table__, 'before_drop')
+def _drop_search_index(target, connection, **kw):
+    if connection.dialect.name == 'sqlite':
+        connection.exec_driver_sql("DROP TABLE IF EXISTS messages_fts")
@@ -1,5 +1,5 @@
 from app.extensions import db
-from datetime import datetime
+from datetime import datetime, timedelta
 import uuid
 
 class Notification(db.Model):
@@ -14,8 +14,22 @@ class Notification(db.Model):
     is_read = db.Column(db.Boolean, default=False)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
 
+    # Coalescing: repeated events with the same key fold into one unread row
+    group_key = db.Column(db.String(100), nullable=True)
+    group_count = db.Column(db.Integer, default=1)
+    group_amount = db.Column(db.Integer, default=0)
+    open_group_key = db.Column(db.String(400), nullable=True) # '<group_key>|<link>' while the group accepts events, else NULL
+    last_event_at = db.Column(db.DateTime, nullable=True) # Newest event folded in; created_at never moves
+    change_seq = db.Column(db.BigInteger, nullable=True) # Delta-sync stamp, see app.models.sync
+
     user = db.relationship('User', backref=db.backref('notifications', lazy=True, cascade="all, delete-orphan"))
 
+    __table_args__ = (
+        db.Index('ix_notifications_user_created', 'user_id', 'created_at', 'id'),
+        db.Index('ux_notifications_open_group', 'user_id', 'open_group_key', unique=True),
+        db.Index('ix_notifications_user_change', 'user_id', 'change_seq'),
+    )
+
     def to_dict(self):
         return {
             'id': self.id,
@@ -25,18 +39,204 @@ class Notification(db.Model):
             'type': self.type,
             'link': self.link,
             'is_read': self.is_read,
-            'created_at': self.created_at.isoformat()
+            'is_broadcast': False,
+            'group_count': self.group_count or 1,
+            'created_at': self.created_at.isoformat(),
+            'updated_at': (self.last_event_at or self.created_at).isoformat()
         }
 
-def create_notification(user_id, title, message, type='INFO', link=None):
-    """Helper function to create a notification"""
+def create_notification(user_id, title, message, type='INFO', link=None, group_key=None, group_amount=0, commit=True, open_group_key=None):
+    """
+    Helper function to create a notification. With commit=False the row joins
+    the caller's transaction and the live event goes out when that commits.
+    """
     notification = Notification(
         user_id=user_id,
         title=title,
         message=message,
         type=type,
-        link=link
+        link=link,
+        group_key=group_key,
+        group_count=1,
+        group_amount=group_amount,
+        open_group_key=open_group_key
     )
     db.session.add(notification)
-    db.session.commit()
+    NotificationCounter.adjust(user_id, 1)
+    db.session.flush()
+
+    from app.services.event_broker import publish_after_commit
+    publish_after_commit(user_id, 'notification', notification.to_dict())
+    if commit:
+        db.session.commit()
     return notification
+
+def create_grouped_notification(user_id, group_key, title, message, type='INFO', link=None, amount=0, summarize=None, window=None, commit=True):
+    """
+    Like create_notification, but folds the event into the user's open group
+    for the same group_key and link. A group stays open while it is unread
+    and younger than `window` seconds (NOTIFICATION_COALESCE_WINDOW_SECONDS
+    by default), counted from its first event, so a steady trickle still
+    starts a new row each window. `summarize(count, amount)` returns the
+    (title, message) for a folded row. `commit` works as in create_notification.
+    """
+    from flask import current_app
+    from sqlalchemy.exc import IntegrityError
+    if window is None:
+        window = current_app.config.get('NOTIFICATION_COALESCE_WINDOW_SECONDS', 3600)
+    if window <= 0:
+        return create_notification(user_id, title, message, type=type, link=link, group_key=group_key, group_amount=amount or 0, commit=commit)
+
+    open_key = f"{group_key}|{link or ''}"
+    now = datetime.utcnow()
+    for attempt in range(3):
+        existing = Notification.query.filter_by(user_id=user_id, open_group_key=open_key).first()
+        if existing and (existing.is_read or existing.created_at < now - timedelta(seconds=window)):
+            existing.open_group_key = None # Close it; the next event starts a fresh group
+            db.session.flush()
+            existing = None
+        if existing:
+            break
+        try:
+            # ux_notifications_open_group turns a concurrent insert of the same group into a conflict
+            with db.session.begin_nested():
+                notification = create_notification(
+                    user_id, title, message, type=type, link=link, group_key=group_key,
+                    group_amount=amount or 0, commit=False, open_group_key=open_key
+                )
+        except IntegrityError:
+            continue
+        if commit:
+            db.session.commit()
+        return notification
+    else:
+        raise RuntimeError(f"Could not open notification group {open_key} for user {user_id}")
+
+    # Increment in SQL so concurrent folds don't lose events
+    existing.group_count = db.func.coalesce(Notification.group_count, 1) + 1
+    existing.group_amount = db.func.coalesce(Notification.group_amount, 0) + (amount or 0)
+    existing.last_event_at = now
+    db.session.flush()
+    if summarize:
+        title, message = summarize(existing.group_count, existing.group_amount)
+    existing.title = title[:100]
+    existing.message = message
+    existing.type = type
+    db.session.flush()
+
+    from app.services.event_broker import publish_after_commit
+    publish_after_commit(user_id, 'notification', existing.to_dict())
+    if commit:
+        db.session.commit()
+    return existing
+
+class NotificationArchive(db.Model):
+    """Read notifications moved out of the hot table by the retention job"""
+    __tablename__ = 'notifications_archive'
+
+    id = db.Column(db.String(36), primary_key=True)
+    user_id = db.Column(db.String(36), nullable=False, index=True)
+    title = db.Column(db.String(100), nullable=False)
+    message = db.Column(db.Text, nullable=False)
+    type = db.Column(db.String(20), nullable=False, default='INFO')
+    link = db.Column(db.String(255), nullable=True)
+    is_read = db.Column(db.Boolean, default=True)
+    created_at = db.Column(db.DateTime)
+    archived_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+class BroadcastArchive(db.Model):
+    """Broadcasts every recipient had read, moved out by the retention job"""
+    __tablename__ = 'broadcast_notifications_archive'
+
+    id = db.Column(db.String(36), primary_key=True)
+    title = db.Column(db.String(100), nullable=False)
+    message = db.Column(db.Text, nullable=False)
+    type = db.Column(db.String(20), nullable=False, default='INFO')
+    link = db.Column(db.String(255), nullable=True)
+    target_type = db.Column(db.String(20), nullable=False)
+    target_values = db.Column(db.JSON) # BroadcastTarget values at archive time
+    read_count = db.Column(db.Integer, default=0) # Receipts at archive time
+    created_by = db.Column(db.String(36), nullable=True)
+    created_at = db.Column(db.DateTime)
+    archived_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+class NotificationCounter(db.Model):
+    """
+    Maintained unread total per user (personal notifications plus broadcasts
+    up to broadcast_watermark), so unread-count is a primary-key read.
+    Rows are created lazily from a full count and repaired by the
+    reconciliation job in maintenance_service.
+    """
+    __tablename__ = 'notification_counters'
+
+    user_id = db.Column(db.String(36), db.ForeignKey('users.id'), primary_key=True)
+    unread_count = db.Column(db.Integer, nullable=False, default=0)
+    broadcast_watermark = db.Column(db.DateTime, nullable=True) # Newest broadcast already folded into unread_count
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    user = db.relationship('User', backref=db.backref('notification_counter', uselist=False, cascade="all, delete-orphan"))
+
+    @staticmethod
+    def adjust(user_id, delta):
+        """Atomically shift a user's counter; a missing row is rebuilt on next read. The cached count is dropped on commit."""
+        from app.services.notification_service import invalidate_unread_count
+        if delta:
+            column = NotificationCounter.unread_count
+            NotificationCounter.query.filter_by(user_id=user_id).update(
+                {'unread_count': db.case((column + delta > 0, column + delta), else_=0)},
+                synchronize_session=False
+            )
+        invalidate_unread_count(user_id)
+
+class BroadcastNotification(db.Model):
+    """
+    Announcement stored once and resolved per user at read time.
+    Recipients are described by target_type plus BroadcastTarget values
+    (roles, user ids or a country) instead of one Notification row per user.
+    """
+    __tablename__ = 'broadcast_notifications'
+
+    id = db.Column(db.String(36), primary_key=True, default=lambda: str(uuid.uuid4()))
+    title = db.Column(db.String(100), nullable=False)
+    message = db.Column(db.Text, nullable=False)
+    type = db.Column(db.String(20), nullable=False, default='INFO')
+    link = db.Column(db.String(255), nullable=True)
+    target_type = db.Column(db.String(20), nullable=False, default='ALL') # ALL, ROLE, USERS, LOCATION_HISTORY
+    created_by = db.Column(db.String(36), db.ForeignKey('users.id'), nullable=True)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, index=True)
+    change_seq = db.Column(db.BigInteger, nullable=True, index=True)
+
+    targets = db.relationship('BroadcastTarget', backref='broadcast', lazy=True, cascade="all, delete-orphan")
+    receipts = db.relationship('BroadcastReceipt', backref='broadcast', lazy=True, cascade="all, delete-orphan")
+
+    def to_dict(self, user_id=None, is_read=False):
+        # Same shape as Notification.to_dict so clients can render both in one list
+        return {
+            'id': self.id,
+            'user_id': user_id,
+            'title': self.title,
+            'message': self.message,
+            'type': self.type,
+            'link': self.link,
+            'is_read': is_read,
+            'is_broadcast': True,
+            'created_at': self.created_at.isoformat()
+        }
+
+class BroadcastTarget(db.Model):
+    __tablename__ = 'broadcast_targets'
+
+    broadcast_id = db.Column(db.String(36), db.ForeignKey('broadcast_notifications.id'), primary_key=True)
+    value = db.Column(db.String(100), primary_key=True, index=True) # Role name, user id or country depending on target_type
+
+class BroadcastReceipt(db.Model):
+    __tablename__ = 'broadcast_receipts'
+
+    broadcast_id = db.Column(db.String(36), db.ForeignKey('broadcast_notifications.id'), primary_key=True)
+    user_id = db.Column(db.String(36), db.ForeignKey('users.id'), primary_key=True)
+    read_at = db.Column(db.DateTime, default=datetime.utcnow)
+    change_seq = db.Column(db.BigInteger, nullable=True)
+
+    __table_args__ = (
+        db.Index('ix_broadcast_receipts_user_change', 'user_id', 'change_seq'),
+    )
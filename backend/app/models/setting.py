@@ -1,4 +1,11 @@
+import re
+import threading
+import time
 from app.extensions import db
+from sqlalchemy import event
+from sqlalchemy.orm import Session, object_session
+
+NUMBER = re.compile(r'-?\d+(\.\d+)?')
 
 class GlobalSetting(db.Model):
     __tablename__ = 'global_settings'
@@ -8,14 +15,32 @@ class GlobalSetting(db.Model):
     description = db.Column(db.String(255))
     updated_at = db.Column(db.DateTime, onupdate=db.func.now(), default=db.func.now())
 
+    @staticmethod
+    def parse(value):
+        """Stored string to bool, int, float or str; numbers only when str() gives the stored text back"""
+        if value.lower() == 'true': return True
+        if value.lower() == 'false': return False
+        if NUMBER.fullmatch(value):
+            number = float(value) if '.' in value else int(value)
+            if str(number) == value: # '007' or '1.50' stay strings
+                return number
+        return value
+
     @staticmethod
     def get_value(key, default=None):
-        setting = GlobalSetting.query.get(key)
-        if setting:
-            if setting.value.lower() == 'true': return True
-            if setting.value.lower() == 'false': return False
-            return setting.value
-        return default
+        """
+        Parsed value of a setting. A numeric default also fixes the type: a
+        value that did not parse as a number falls back to the default, and
+        a str default gets the stored text even when it looks numeric.
+        """
+        value = settings_cache.values().get(key)
+        if value is None:
+            return default
+        if isinstance(default, (int, float)) and not isinstance(default, bool):
+            return value if isinstance(value, (int, float)) and not isinstance(value, bool) else default
+        if isinstance(default, str) and not isinstance(value, str):
+            return str(value)
+        return value
 
     @staticmethod
     def set_value(key, value, description=None):
@@ -29,3 +54,106 @@ class GlobalSetting(db.Model):
                 setting.description = description
         db.session.commit()
         return setting
+
+class SettingsVersion(db.Model):
+    """
+    Single row bumped in the same transaction as any GlobalSetting write, so
+    every worker's SettingsCache can tell its copy is stale with one
+    primary-key read.
+    """
+    __tablename__ = 'settings_version'
+
+    id = db.Column(db.Integer, primary_key=True)
+    version = db.Column(db.BigInteger, nullable=False, default=0)
+
+class SettingsCache:
+    """
+    Process-local copy of global_settings with values already parsed. The
+    version row is read at most once per request and at most every
+    `check_interval` seconds; only when it has moved are the settings
+    reloaded. Writes made by this process invalidate it on commit, other
+    workers pick them up within `check_interval`.
+    """
+
+    def __init__(self, check_interval=5):
+        self._lock = threading.Lock()
+        self._values = {}
+        self._derived = {}
+        self._version = None
+        self._checked_at = 0
+        self.check_interval = check_interval
+
+    def configure(self, check_interval=5):
+        self.check_interval = check_interval
+        self.invalidate()
+
+    def values(self):
+        from flask import g, has_request_context
+        in_request = has_request_context()
+        if in_request and 'settings_snapshot' in g:
+            return g.settings_snapshot # One consistent view per request
+        if self._version is None or time.monotonic() - self._checked_at >= self.check_interval:
+            self._refresh()
+        values = self._values
+        if in_request:
+            g.settings_snapshot = values
+        return values
+
+    def derived(self, name, build):
+        """build(values), computed once per loaded settings version and shared by all requests"""
+        values = self.values()
+        cached = self._derived.get(name)
+        if cached is None or cached[0] is not values:
+            cached = (values, build(values))
+            self._derived[name] = cached
+        return cached[1]
+
+    def _refresh(self):
+        now = time.monotonic()
+        version = db.session.query(SettingsVersion.version).filter_by(id=1).scalar() or 0
+        if version == self._version:
+            self._checked_at = now
+            return
+        rows = db.session.query(GlobalSetting.key, GlobalSetting.value).all()
+        values = {key: GlobalSetting.parse(value) for key, value in rows}
+        with self._lock:
+            self._values, self._version, self._checked_at = values, version, now
+
+    def invalidate(self):
+        from flask import g, has_request_context
+        with self._lock:
+            self._version = None
+        if has_request_context():
+            g.pop('settings_snapshot', None)
+
+settings_cache = SettingsCache()
+
+def init_settings_cache(app):
+    settings_cache.configure(check_interval=app.config.get('SETTINGS_CACHE_CHECK_SECONDS', 5))
+    return settings_cache
+
+def _bump_settings_version(mapper, connection, target):
+    table = SettingsVersion.__table__
+    result = connection.execute(table.update().where(table.c.id == 1).values(version=table.c.version + 1))
+    if not result.rowcount:
+        connection.execute(table.insert().values(id=1, version=1))
+    session = object_session(target)
+    if session is not None:
+        session.info['settings_changed'] = True
+
+# Covers set_value as well as rows written directly (seed.py, admin edits)
+for _event in ('after_insert', 'after_update', 'after_delete'):
+    event.listen(GlobalSetting, _event, _bump_settings_version)
+
+@event.listens_for(Session, 'after_commit')
+def _invalidate_settings_cache(session):
+    if session.info.pop('settings_changed', False):
+        settings_cache.invalidate()
+
+@event.listens_for(Session, 'after_rollback')
+def _discard_settings_change(session):
+    session.info.pop('settings_changed', None)
+
+@event.listens_for(SettingsVersion.__table__, 'after_create')
+def _seed_version(target, connection, **kw):
+    connection.execute(target.insert().values(id=1, version=0))
@@ -25,12 +25,18 @@ class ShipmentItem(db.Model):
     available_pickup_time = db.Column(db.DateTime)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     ranking_score = db.Column(db.Float, default=0.0)
+    change_seq = db.Column(db.BigInteger, nullable=True, index=True) # Delta-sync stamp, see app.models.sync
 
     # Relationships
     sender = db.relationship('User', foreign_keys=[sender_id], backref='sent_shipments')
     partner = db.relationship('User', foreign_keys=[partner_id], backref='partnered_shipments')
     requests = db.relationship('ShipmentRequest', backref='shipment', lazy=True, cascade='all, delete-orphan')
 
+    __table_args__ = (
+        db.Index('ix_shipment_items_sender_change', 'sender_id', 'change_seq'),
+        db.Index('ix_shipment_items_partner_change', 'partner_id', 'change_seq'),
+    )
+
 class ShipmentRequest(db.Model):
     __tablename__ = 'shipment_requests'
 
@@ -39,5 +45,10 @@ class ShipmentRequest(db.Model):
     picker_id = db.Column(db.String(36), db.ForeignKey('users.id'), nullable=False)
     status = db.Column(db.String(20), default='PENDING') # PENDING, APPROVED, REJECTED
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    change_seq = db.Column(db.BigInteger, nullable=True) # Delta-sync stamp, see app.models.sync
 
     picker = db.relationship('User', backref='shipment_requests')
+
+    __table_args__ = (
+        db.Index('ix_shipment_requests_picker_change', 'picker_id', 'change_seq'),
+    )
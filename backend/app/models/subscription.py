@@ -34,6 +34,7 @@ class SubscriptionTransaction(db.Model):
     # Payment Details
     transaction_reference = db.Column(db.String(100)) # Telebirr ID or Bank Ref
     receipt_url = db.Column(db.String(255)) # Path to uploaded receipt image
+    change_seq = db.Column(db.BigInteger, nullable=True, index=True) # Change stamp for incremental exports, see app.models.sync
 
     # Relationships
     user = db.relationship('User', backref=db.backref('subscription_transactions', lazy=True))
@@ -63,3 +64,41 @@ class SubscriptionTransaction(db.Model):
             'receipt_url': self.receipt_url,
             'days_remaining': self.days_remaining
         }
+
+class UserEntitlement(db.Model):
+    """
+    What a user's current subscription allows, one row per user, so quota
+    and premium checks are a primary-key read rather than a scan of
+    subscription_transactions. Kept in step with the transactions by
+    app.services.subscription_service on activation, quota use and expiry;
+    transaction_id is None while the user has no active subscription.
+    """
+    __tablename__ = 'user_entitlements'
+
+    user_id = db.Column(db.String(36), db.ForeignKey('users.id'), primary_key=True)
+    transaction_id = db.Column(db.String(36), db.ForeignKey('subscription_transactions.id'))
+    plan_id = db.Column(db.String(36), db.ForeignKey('subscription_plans.id'))
+    is_premium = db.Column(db.Boolean, default=False)
+    end_date = db.Column(db.DateTime)
+    remaining_usage = db.Column(db.Integer, default=0)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    # Loaded once per User instance, so repeated checks in a request reuse it
+    user = db.relationship('User', backref=db.backref('entitlement', uselist=False, cascade='all, delete-orphan'))
+
+    __table_args__ = (
+        db.Index('ix_user_entitlements_premium', 'is_premium', 'end_date'),
+    )
+
+    def is_active(self, now=None):
+        now = now or datetime.utcnow()
+        return bool(self.transaction_id) and (self.end_date is None or self.end_date >= now)
+
+    def has_quota(self, now=None):
+        now = now or datetime.utcnow()
+        return bool(self.transaction_id) and (self.remaining_usage or 0) > 0 \
+            and self.end_date is not None and self.end_date > now
+
+    def is_premium_active(self, now=None):
+        now = now or datetime.utcnow()
+        return bool(self.transaction_id and self.is_premium) and self.end_date is not None and self.end_date > now
@@ -0,0 +1,100 @@
+from app.extensions import db
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+CHANGES = 'changes'
+
+class SyncSequence(db.Model):
+    """
+    Change counter behind delta sync on SQLite. Every flush that inserts or
+    modifies a model with a `change_seq` column takes the next value and
+    stamps it on those rows. SQLite already admits one writer at a time, so
+    the counter row adds no contention there and sequence order matches
+    commit order. Deletes are not tracked.
+    """
+    __tablename__ = 'sync_sequences'
+
+    name = db.Column(db.String(50), primary_key=True)
+    value = db.Column(db.BigInteger, nullable=False, default=0)
+
+# PostgreSQL hands out values from a sequence instead, so concurrent writers
+# never queue on one counter row. Sequence values are not issued in commit
+# order, so before its first value a transaction takes a shared advisory lock
+# keyed on the highest value issued so far. The lock goes away with the
+# transaction (or its connection), and the sync token stops at the lowest
+# such key still held.
+change_sequence = db.Sequence('change_seq', metadata=db.metadata)
+
+# Advisory key space for those locks: WATERMARK_LOCK_BASE + issued value
+WATERMARK_LOCK_BASE = 0x53594e43 << 32
+
+ISSUED = "CASE WHEN is_called THEN last_value ELSE last_value - 1 END"
+
+RESERVED = 'change_seq_reserved'
+
+def _uses_sequence(bind):
+    return bind.dialect.name == 'postgresql'
+
+def next_change_seq(session=None):
+    """Reserve the next change sequence value in the current transaction"""
+    session = session or db.session
+    bind = session.get_bind()
+    if _uses_sequence(bind):
+        # Rolling back a savepoint drops locks taken inside it, so the lock is
+        # remembered per (sub)transaction
+        transaction = session.get_nested_transaction() or session.get_transaction()
+        if session.info.get(RESERVED) is not transaction:
+            # Every value this transaction draws is above the key it holds
+            session.execute(db.text(
+                f"SELECT pg_advisory_xact_lock_shared(:base + {ISSUED}) FROM change_seq"
+            ), {'base': WATERMARK_LOCK_BASE})
+            session.info[RESERVED] = transaction
+        return session.execute(db.select(change_sequence.next_value())).scalar()
+
+    table = SyncSequence.__table__
+    result = session.execute(
+        table.update().where(table.c.name == CHANGES).values(value=table.c.value + 1)
+    )
+    if not result.rowcount:
+        session.execute(table.insert().values(name=CHANGES, value=1))
+    return session.execute(db.select(table.c.value).where(table.c.name == CHANGES)).scalar()
+
+def current_change_seq():
+    """
+    Highest sequence value below which every write has committed; the token
+    handed back to sync clients. Later values may already be visible, they
+    are simply returned again on the next sync.
+    """
+    bind = db.session.get_bind()
+    if not _uses_sequence(bind):
+        return db.session.query(SyncSequence.value).filter_by(name=CHANGES).scalar() or 0
+
+    # Issued value first: a writer whose lock is missing from the scan below
+    # takes its first value after this read
+    issued = db.session.execute(db.text(f"SELECT {ISSUED} FROM change_seq")).scalar()
+    held = db.session.execute(db.text(
+        "SELECT min((classid::bigint << 32 | objid::bigint) - :base) FROM pg_locks "
+        "WHERE locktype = 'advisory' AND objsubid = 1 AND granted "
+        "AND (classid::bigint << 32 | objid::bigint) >= :base"
+    ), {'base': WATERMARK_LOCK_BASE}).scalar()
+    return min(issued, held) if held is not None else issued
+
+@event.listens_for(Session, 'after_transaction_end')
+def _end_reservation(session, transaction):
+    if session.info.get(RESERVED) is transaction:
+        del session.info[RESERVED]
+
+@event.listens_for(Session, 'before_flush')
+def _stamp_change_seq(session, flush_context, instances):
+    changed = [
+        obj for obj in list(session.new) + list(session.dirty)
+        if hasattr(type(obj), 'change_seq') and (obj in session.new or session.is_modified(obj, include_collections=False))
+    ]
+    if changed:
+        seq = next_change_seq(session)
+        for obj in changed:
+            obj.change_seq = seq
+
+@event.listens_for(SyncSequence.__table__, 'after_create')
+def _seed_sequence(target, connection, **kw):
+    connection.execute(target.insert().values(name=CHANGES, value=0))
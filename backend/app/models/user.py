@@ -1,4 +1,6 @@
-from app.extensions import db, bcrypt
+from app.extensions import db
+from sqlalchemy import event
+from app.passwords import password_hasher
 from app.models.enums import UserRole, VerificationStatus
 from datetime import datetime
 import uuid
@@ -10,6 +12,7 @@ class User(db.Model):
     first_name = db.Column(db.String(50), nullable=False)
     last_name = db.Column(db.String(50), nullable=False)
     email = db.Column(db.String(120), unique=True, nullable=False)
+    email_lower = db.Column(db.String(120), nullable=True) # Normalized copy for case-insensitive lookups, set on assignment
     is_email_verified = db.Column(db.Boolean, default=False)
     email_verification_token = db.Column(db.String(100), unique=True)
     email_otp = db.Column(db.String(6))
@@ -45,8 +48,10 @@ class User(db.Model):
     id_front_url = db.Column(db.String(255))
     id_back_url = db.Column(db.String(255))
     liveness_video = db.Column(db.String(255))
+    kyc_documents = db.Column(db.JSON) # Per upload field: normalized url, thumbnail_url, size, checksum, original source and original_checksum; see app.services.kyc_service
     date_of_birth = db.Column(db.DateTime)
-    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, index=True)
+    change_seq = db.Column(db.BigInteger, nullable=True, index=True) # Delta-sync stamp, see app.models.sync
 
     # Privacy Settings
     hide_phone_number = db.Column(db.Boolean, default=False)
@@ -66,18 +71,17 @@ class User(db.Model):
             return True
             
         from app.models.subscription import SubscriptionTransaction
-        active_sub = SubscriptionTransaction.query.filter_by(
-            user_id=self.id, 
-            is_active=True, 
-            status='COMPLETED'
-        ).first()
+        entitlement = self.entitlement
         
-        if not active_sub:
+        if not entitlement or not entitlement.transaction_id:
             return False
             
-        if active_sub.end_date and active_sub.end_date < datetime.utcnow():
+        if not entitlement.is_active():
             # Auto-deactivate if expired
-            active_sub.is_active = False
+            from app.services.subscription_service import expire_subscription
+            transaction = db.session.get(SubscriptionTransaction, entitlement.transaction_id)
+            if transaction:
+                expire_subscription(transaction)
             db.session.commit()
             return False
             
@@ -86,8 +90,69 @@ class User(db.Model):
     # Relationships
     plan = db.relationship('SubscriptionPlan', backref='users')
 
+    __table_args__ = (
+        db.Index('ux_users_email_lower', 'email_lower', unique=True),
+    )
+
+    @staticmethod
+    def normalize_email(email):
+        return (email or '').strip().lower()
+
+    @db.validates('email')
+    def _set_email_lower(self, key, email):
+        self.email_lower = User.normalize_email(email) or None
+        return email
+
     def set_password(self, password):
-        self.password_hash = bcrypt.generate_password_hash(password).decode('utf-8')
+        self.password_hash = password_hasher.hash(password)
 
     def check_password(self, password):
-        return bcrypt.check_password_hash(self.password_hash, password)
+        return password_hasher.verify(password, self.password_hash)
+
+    def password_needs_rehash(self):
+        return password_hasher.needs_rehash(self.password_hash)
+
+# Substring search over name and email for the admin directory. Like the
+# message index this is dialect specific: an FTS5 trigram table kept in sync
+# by triggers on SQLite, a pg_trgm GIN index on PostgreSQL.
+SEARCH_EXPRESSION = "lower(first_name || ' ' || last_name || ' ' || email)"
+
+SEARCH_DDL = {
+    'sqlite': [
+        "CREATE VIRTUAL TABLE IF NOT EXISTS users_fts USING fts5(name, email, user_id, tokenize='trigram')",
+        "CREATE TRIGGER IF NOT EXISTS users_fts_insert AFTER INSERT ON users BEGIN "
+        "INSERT INTO users_fts (name, email, user_id) VALUES (new.first_name || ' ' || new.last_name, new.email, new.id); END",
+        # user_id is trigram-indexed too, so removing a row is an index lookup rather than a scan
+        "CREATE TRIGGER IF NOT EXISTS users_fts_delete AFTER DELETE ON users BEGIN "
+        "DELETE FROM users_fts WHERE users_fts MATCH 'user_id : \"' || old.id || '\"'; END",
+        "CREATE TRIGGER IF NOT EXISTS users_fts_update AFTER UPDATE OF first_name, last_name, email ON users BEGIN "
+        "DELETE FROM users_fts WHERE users_fts MATCH 'user_id : \"' || old.id || '\"'; "
+        "INSERT INTO users_fts (name, email, user_id) VALUES (new.first_name || ' ' || new.last_name, new.email, new.id); END",
+    ],
+    'postgresql': [
+        "CREATE EXTENSION IF NOT EXISTS pg_trgm",
+        f"CREATE INDEX IF NOT EXISTS ix_users_search_trgm ON users USING gin (({SEARCH_EXPRESSION}) gin_trgm_ops)",
+    ],
+}
+
+SEARCH_BACKFILL = {
+    'sqlite': "INSERT INTO users_fts (name, email, user_id) SELECT first_name || ' ' || last_name, email, id FROM users "
+              "WHERE id NOT IN (SELECT user_id FROM users_fts)",
+}
+
+def create_search_index(connection, backfill=False):
+    """Create the dialect's user search index; `backfill` indexes existing rows"""
+    dialect = connection.dialect.name
+    for statement in SEARCH_DDL.get(dialect, []):
+        connection.exec_driver_sql(statement)
+    if backfill and dialect in SEARCH_BACKFILL:
+        connection.exec_driver_sql(SEARCH_BACKFILL[dialect])
+
+@event.listens_for(User.__table__, 'after_create')
+def _create_search_index(target, connection, **kw):
+    create_search_index(connection)
+
+@event.listens_for(User.__table__, 'before_drop')
+def _drop_search_index(target, connection, **kw):
+    if connection.dialect.name == 'sqlite':
+        connection.exec_driver_sql("DROP TABLE IF EXISTS users_fts")
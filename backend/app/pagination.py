@@ -0,0 +1,22 @@
+from datetime import datetime
+from sqlalchemy import or_, and_
+
+def parse_cursor(value):
+    """Parse a `<timestamp>,<id>` keyset cursor; raises ValueError when malformed"""
+    timestamp, _, item_id = (value or '').partition(',')
+    if not timestamp or not item_id:
+        raise ValueError("Cursor must be '<timestamp>,<id>'")
+    return datetime.fromisoformat(timestamp), item_id
+
+def format_cursor(timestamp, item_id):
+    return f"{timestamp.isoformat()},{item_id}"
+
+def before_cursor(time_column, id_column, cursor):
+    """Rows strictly older than the cursor in (time, id) order"""
+    timestamp, item_id = cursor
+    return or_(time_column < timestamp, and_(time_column == timestamp, id_column < item_id))
+
+def after_cursor(time_column, id_column, cursor):
+    """Rows strictly newer than the cursor in (time, id) order"""
+    timestamp, item_id = cursor
+    return or_(time_column > timestamp, and_(time_column == timestamp, id_column > item_id))
@@ -0,0 +1,87 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor, TimeoutError
+import bcrypt
+
+BCRYPT_MAX_BYTES = 72 # bcrypt ignores anything past this; newer releases raise instead
+
+class HasherBusy(Exception):
+    """The hashing pool is saturated; the request should be retried later"""
+
+class PasswordHasher:
+    """
+    Runs bcrypt on a small dedicated thread pool instead of the request
+    thread. bcrypt releases the GIL, so at most `workers` cores hash at once
+    and the rest of the worker keeps serving other endpoints during a login
+    storm. Work beyond `max_pending` queued jobs is rejected immediately with
+    HasherBusy rather than piling up behind the pool.
+    """
+
+    def __init__(self, rounds=12, workers=2, max_pending=64, timeout=10):
+        self._lock = threading.Lock()
+        self._executor = None
+        self._pending = 0
+        self.configure(rounds, workers, max_pending, timeout)
+
+    def configure(self, rounds=12, workers=2, max_pending=64, timeout=10):
+        with self._lock:
+            if self._executor is None or workers != self.workers:
+                previous = self._executor
+                self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='bcrypt')
+                if previous:
+                    previous.shutdown(wait=False)
+            self.rounds = rounds
+            self.workers = workers
+            self.max_pending = max_pending
+            self.timeout = timeout
+
+    def _run(self, fn, *args):
+        with self._lock:
+            if self._pending >= self.max_pending:
+                raise HasherBusy()
+            self._pending += 1
+            executor = self._executor
+        try:
+            future = executor.submit(fn, *args)
+        except Exception:
+            self._release()
+            raise
+        future.add_done_callback(lambda _: self._release())
+        try:
+            return future.result(timeout=self.timeout)
+        except TimeoutError:
+            raise HasherBusy()
+
+    def _release(self):
+        with self._lock:
+            self._pending -= 1
+
+    @staticmethod
+    def _encode(password):
+        return password.encode('utf-8')[:BCRYPT_MAX_BYTES]
+
+    def hash(self, password):
+        rounds = self.rounds
+        return self._run(lambda: bcrypt.hashpw(self._encode(password), bcrypt.gensalt(rounds)).decode('utf-8'))
+
+    def verify(self, password, password_hash):
+        if not password or not password_hash:
+            return False
+        return self._run(lambda: bcrypt.checkpw(self._encode(password), password_hash.encode('utf-8')))
+
+    def needs_rehash(self, password_hash):
+        """True when a stored hash was made with a different work factor"""
+        try:
+            return int(password_hash.split('$')[2]) != self.rounds
+        except (AttributeError, IndexError, ValueError):
+            return False
+
+password_hasher = PasswordHasher()
+
+def init_password_hasher(app):
+    password_hasher.configure(
+        rounds=app.config.get('BCRYPT_LOG_ROUNDS', 12),
+        workers=app.config.get('PASSWORD_HASH_WORKERS', 2),
+        max_pending=app.config.get('PASSWORD_HASH_QUEUE_SIZE', 64),
+        timeout=app.config.get('PASSWORD_HASH_TIMEOUT_SECONDS', 10)
+    )
+    return password_hasher
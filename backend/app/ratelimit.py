@@ -0,0 +1,191 @@
+import math
+import threading
+import time
+from collections import OrderedDict
+from functools import wraps
+from flask import current_app, request
+
+class RateLimited(Exception):
+    """A caller exhausted its token bucket; retry_after is in seconds"""
+
+    def __init__(self, retry_after=1):
+        super().__init__()
+        self.retry_after = max(1, math.ceil(retry_after))
+
+class ServerBusy(Exception):
+    """An endpoint group is at its concurrency limit; fail fast instead of queueing"""
+
+def parse_limit(limit):
+    """'10/minute' -> (capacity, tokens per second)"""
+    count, _, period = limit.partition('/')
+    seconds = {'second': 1, 'minute': 60, 'hour': 3600, 'day': 86400}[period.strip().rstrip('s') or 'second']
+    count = int(count)
+    return count, count / seconds
+
+class MemoryBucketStore:
+    """
+    Token buckets for a single worker process. Keys are evicted least
+    recently used past `maxsize`; an evicted caller simply starts again with
+    a full bucket.
+    """
+
+    def __init__(self, maxsize=100000):
+        self.maxsize = maxsize
+        self._lock = threading.Lock()
+        self._buckets = OrderedDict()
+
+    def take(self, key, capacity, rate, cost=1):
+        """Returns (allowed, seconds until enough tokens)"""
+        now = time.monotonic()
+        with self._lock:
+            tokens, updated = self._buckets.pop(key, (capacity, now))
+            tokens = min(capacity, tokens + (now - updated) * rate)
+            allowed = tokens >= cost
+            if allowed:
+                tokens -= cost
+            self._buckets[key] = (tokens, now)
+            if len(self._buckets) > self.maxsize:
+                self._buckets.popitem(last=False)
+        return allowed, 0 if allowed else (cost - tokens) / rate
+
+    def reset(self):
+        with self._lock:
+            self._buckets.clear()
+
+class RedisBucketStore:
+    """
+    Token buckets shared by every worker through Redis. The refill and take
+    run as one Lua script on the server clock, so concurrent workers see a
+    single bucket. Needs the optional `redis` package.
+    """
+
+    SCRIPT = """
+    local now = redis.call('TIME')
+    now = tonumber(now[1]) + tonumber(now[2]) / 1000000
+    local capacity, rate, cost = tonumber(ARGV[1]), tonumber(ARGV[2]), tonumber(ARGV[3])
+    local bucket = redis.call('HMGET', KEYS[1], 'tokens', 'ts')
+    local tokens = tonumber(bucket[1]) or capacity
+    local updated = tonumber(bucket[2]) or now
+    tokens = math.min(capacity, tokens + (now - updated) * rate)
+    local allowed, wait = 0, 0
+    if tokens >= cost then
+        tokens = tokens - cost
+        allowed = 1
+    else
+        wait = (cost - tokens) / rate
+    end
+    redis.call('HSET', KEYS[1], 'tokens', tostring(tokens), 'ts', tostring(now))
+    redis.call('EXPIRE', KEYS[1], math.ceil(capacity / rate) + 1)
+    return {allowed, tostring(wait)}
+    """
+
+    def __init__(self, url, prefix='ratelimit:'):
+        import redis
+        self.prefix = prefix
+        self._client = redis.Redis.from_url(url)
+        self._script = self._client.register_script(self.SCRIPT)
+
+    def take(self, key, capacity, rate, cost=1):
+        allowed, wait = self._script(keys=[self.prefix + key], args=[capacity, rate, cost])
+        return bool(allowed), float(wait)
+
+    def reset(self):
+        for key in self._client.scan_iter(match=self.prefix + '*'):
+            self._client.delete(key)
+
+BUCKET_BACKENDS = {
+    'memory': lambda app: MemoryBucketStore(maxsize=app.config.get('RATE_LIMIT_MAX_KEYS', 100000)),
+    'redis': lambda app: RedisBucketStore(app.config['RATE_LIMIT_REDIS_URL'])
+}
+
+class RateLimiter:
+    def __init__(self):
+        self.store = MemoryBucketStore()
+        self.enabled = True
+        self.proxy_hops = 0
+        self._semaphores = {}
+        self._lock = threading.Lock()
+
+    def configure(self, app):
+        backend = app.config.get('RATE_LIMIT_BACKEND', 'memory')
+        if backend not in BUCKET_BACKENDS:
+            raise ValueError(f"Unknown rate limit backend: {backend}")
+        self.store = BUCKET_BACKENDS[backend](app)
+        self.enabled = app.config.get('RATE_LIMIT_ENABLED', True)
+        self.proxy_hops = app.config.get('RATE_LIMIT_PROXY_HOPS', 0)
+        with self._lock:
+            self._semaphores = {}
+
+    def client_ip(self):
+        """remote_addr, or the address `proxy_hops` trusted proxies reported in X-Forwarded-For"""
+        route = request.access_route
+        if self.proxy_hops and len(route) >= self.proxy_hops:
+            return route[-self.proxy_hops]
+        return request.remote_addr or 'unknown'
+
+    def hit(self, key, limit):
+        capacity, rate = parse_limit(limit)
+        try:
+            allowed, retry_after = self.store.take(key, capacity, rate)
+        except Exception as e:
+            # A broken shared backend must not take logins down with it
+            print(f"Rate limit backend error, allowing request: {str(e)}")
+            return
+        if not allowed:
+            raise RateLimited(retry_after)
+
+    def semaphore(self, group, limit):
+        with self._lock:
+            if group not in self._semaphores:
+                self._semaphores[group] = threading.BoundedSemaphore(limit)
+            return self._semaphores[group]
+
+limiter = RateLimiter()
+
+def init_rate_limiter(app):
+    limiter.configure(app)
+    return limiter
+
+def rate_limit(ip=None, email=None):
+    """
+    Token-bucket limits per client IP and per the `email` field of the JSON
+    body. Arguments name config keys holding limits such as '10/minute';
+    exhausting either bucket raises RateLimited (429).
+    """
+    def decorator(fn):
+        @wraps(fn)
+        def wrapper(*args, **kwargs):
+            if limiter.enabled:
+                config = current_app.config
+                if ip and config.get(ip):
+                    limiter.hit(f"{ip}:{limiter.client_ip()}", config[ip])
+                if email and config.get(email):
+                    from app.models.user import User
+                    address = User.normalize_email((request.get_json(silent=True) or {}).get('email'))
+                    if address:
+                        limiter.hit(f"{email}:{address}", config[email])
+            return fn(*args, **kwargs)
+        return wrapper
+    return decorator
+
+def concurrency_limit(group, limit_key):
+    """
+    Caps in-flight requests across every endpoint sharing `group` in this
+    process. Past the limit (config key `limit_key`) ServerBusy (503) is
+    raised immediately rather than letting requests queue.
+    """
+    def decorator(fn):
+        @wraps(fn)
+        def wrapper(*args, **kwargs):
+            limit = current_app.config.get(limit_key)
+            if not limiter.enabled or not limit:
+                return fn(*args, **kwargs)
+            semaphore = limiter.semaphore(group, limit)
+            if not semaphore.acquire(blocking=False):
+                raise ServerBusy()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                semaphore.release()
+        return wrapper
+    return decorator
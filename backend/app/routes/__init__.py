@@ -5,6 +5,8 @@ from .message_routes import bp as message_bp
 from .support_routes import bp as support_bp
 from .notification_routes import bp as notification_bp
 from .admin_routes import bp as admin_bp
+from .event_routes import bp as event_bp
+from .sync_routes import bp as sync_bp
 
 def register_routes(app):
     # Register blueprints with v1 API versioning
@@ -15,3 +17,5 @@ def register_routes(app):
     app.register_blueprint(support_bp, url_prefix='/api/v1/support')
     app.register_blueprint(notification_bp, url_prefix='/api/v1/notifications')
     app.register_blueprint(admin_bp, url_prefix='/api/v1/admin')
+    app.register_blueprint(event_bp, url_prefix='/api/v1/events')
+    app.register_blueprint(sync_bp, url_prefix='/api/v1/sync')
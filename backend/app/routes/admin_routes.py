@@ -1,31 +1,25 @@
-from flask import Blueprint, request, jsonify
-from app.models.setting import GlobalSetting
+import hashlib
+import json
+from flask import Blueprint, request, jsonify, Response, stream_with_context, current_app
+from app.models.setting import GlobalSetting, settings_cache
 from app.models.user import User, UserRole
 from flask_jwt_extended import jwt_required, get_jwt_identity
+from app.auth import role_required
 from app.extensions import db
-from app.models.notification import Notification, create_notification
-from app.models.shipment import ShipmentItem
+from app.services import notification_service
 from app.models.supported_country import SupportedCountry
 
 bp = Blueprint('admin', __name__, url_prefix='/api/admin')
 
 @bp.route('/settings', methods=['GET'])
-@jwt_required()
+@role_required(UserRole.ADMIN)
 def get_settings():
-    current_user = User.query.get(get_jwt_identity())
-    if not current_user or current_user.role != UserRole.ADMIN:
-        return jsonify({'message': 'Admin access required'}), 403
-        
     settings = GlobalSetting.query.all()
     return jsonify({s.key: {'value': s.value, 'description': s.description} for s in settings})
 
 @bp.route('/settings', methods=['POST'])
-@jwt_required()
+@role_required(UserRole.ADMIN)
 def update_settings():
-    current_user = User.query.get(get_jwt_identity())
-    if not current_user or current_user.role != UserRole.ADMIN:
-        return jsonify({'message': 'Admin access required'}), 403
-        
     data = request.get_json()
     if not data:
         return jsonify({'message': 'No data provided'}), 400
@@ -37,57 +31,41 @@ def update_settings():
         
     return jsonify({'message': 'Settings updated successfully'})
 
+# Settings the frontend needs, with the value used when the row is missing
+PUBLIC_SETTINGS = {
+    'require_subscription_for_details': False,
+    'require_subscription_for_chat': False,
+    'require_otp_for_signup': True,
+    'enable_free_promo_sender': True,
+    'enable_free_promo_picker': True,
+    'enable_google_login': True,
+    'maintenance_interval_hours': 24
+}
+
+def _build_public_settings(values):
+    settings = {}
+    for key, default in PUBLIC_SETTINGS.items():
+        val = values.get(key) # Already parsed by the settings cache
+        settings[key] = default if val is None else val
+    body = json.dumps(settings, sort_keys=True, separators=(',', ':')).encode('utf-8')
+    etag = hashlib.sha256(body).hexdigest()[:32]
+    return body, etag
+
 @bp.route('/settings/public', methods=['GET'])
 def get_public_settings():
-    # Only expose specific settings that frontend needs to know
-    keys = [
-        'require_subscription_for_details', 
-        'require_subscription_for_chat',
-        'require_otp_for_signup',
-        'enable_free_promo_sender',
-        'enable_free_promo_picker',
-        'enable_google_login',
-        'maintenance_interval_hours'
-    ]
-    boolean_keys = [
-        'require_subscription_for_details', 
-        'require_subscription_for_chat',
-        'require_otp_for_signup',
-        'enable_free_promo_sender',
-        'enable_free_promo_picker',
-        'enable_google_login'
-    ]
-    
-    settings = {}
-    for key in keys:
-        val = GlobalSetting.get_value(key)
-        
-        if val is not None:
-            # Type conversion for boolean keys
-            if key in boolean_keys:
-                if isinstance(val, str):
-                    settings[key] = val.lower() == 'true'
-                else:
-                    settings[key] = bool(val)
-            else:
-                settings[key] = val
-        else:
-            # Defaults
-            if key in ['require_otp_for_signup', 'enable_free_promo_sender', 'enable_free_promo_picker', 'enable_google_login']:
-                settings[key] = True
-            elif key == 'maintenance_interval_hours':
-                settings[key] = '24'
-            else:
-                settings[key] = False
-            
-    return jsonify(settings)
+    # Body and ETag are rebuilt only when the settings version moves
+    body, etag = settings_cache.derived('public_settings', _build_public_settings)
+    headers = {
+        'ETag': f'"{etag}"',
+        'Cache-Control': f"public, max-age={current_app.config.get('PUBLIC_SETTINGS_MAX_AGE', 60)}"
+    }
+    if request.if_none_match.contains_weak(etag):
+        return Response(status=304, headers=headers)
+    return Response(body, mimetype='application/json', headers=headers)
+
 @bp.route('/notifications/broadcast', methods=['POST'])
-@jwt_required()
+@role_required(UserRole.ADMIN)
 def broadcast_notification():
-    current_user = User.query.get(get_jwt_identity())
-    if not current_user or current_user.role != UserRole.ADMIN:
-        return jsonify({'message': 'Admin access required'}), 403
-        
     data = request.get_json()
     title = data.get('title')
     message = data.get('message')
@@ -97,43 +75,72 @@ def broadcast_notification():
     if not title or not message:
         return jsonify({'message': 'Title and message are required'}), 400
         
-    targets = []
-    
-    if target_type == 'ALL':
-        targets = User.query.all()
-    elif target_type == 'ROLE':
-        roles = data.get('roles', [])
-        targets = User.query.filter(User.role.in_(roles)).all()
+    values = []
+    if target_type == 'ROLE':
+        values = data.get('roles', [])
     elif target_type == 'USERS':
-        user_ids = data.get('user_ids', [])
-        targets = User.query.filter(User.id.in_(user_ids)).all()
+        values = data.get('user_ids', [])
     elif target_type == 'LOCATION_HISTORY':
-        location = data.get('location')
-        if location:
-            # Find users who have picked up or delivered to this location
-            pickers = db.session.query(User).join(ShipmentItem, User.id == ShipmentItem.partner_id)\
-                .filter((ShipmentItem.pickup_country == location) | (ShipmentItem.dest_country == location)).all()
-            targets = list(set(pickers)) # Unique users
+        values = [data.get('location')]
     
-    for user in targets:
-        create_notification(user.id, title, message, ntype)
+    # Stored once and resolved per user on read, so cost does not grow with the user base
+    try:
+        broadcast = notification_service.create_broadcast(
+            title, message, ntype,
+            target_type=target_type,
+            values=values,
+            created_by=get_jwt_identity()
+        )
+    except ValueError as e:
+        return jsonify({'message': str(e)}), 400
     
-    return jsonify({'message': f'Notification broadcasted to {len(targets)} users successfully'})
+    return jsonify({'message': 'Notification broadcasted successfully', 'broadcast_id': broadcast.id})
 
 @bp.route('/users', methods=['GET'])
-@jwt_required()
+@role_required(UserRole.ADMIN)
 def get_users_list():
-    current_user = User.query.get(get_jwt_identity())
-    if not current_user or current_user.role != UserRole.ADMIN:
-        return jsonify({'message': 'Admin access required'}), 403
-        
-    users = User.query.all()
-    return jsonify([{
+    from app.services.export_service import stream_json_array
+    rows = db.session.query(User.id, User.first_name, User.last_name, User.email, User.role).order_by(User.created_at) \
+        .execution_options(yield_per=current_app.config.get('EXPORT_BATCH_SIZE', 1000))
+    users = ({
         'id': u.id,
-        'name': u.name,
+        'name': f"{u.first_name} {u.last_name}",
         'email': u.email,
         'role': u.role.value
-    } for u in users])
+    } for u in rows)
+    return Response(stream_with_context(stream_json_array(users)), mimetype='application/json')
+
+@bp.route('/export/<name>', methods=['GET'])
+@role_required(UserRole.ADMIN)
+def export_records(name):
+    """
+    Streams users, shipments or transactions as NDJSON (default) or CSV.
+    Query params: format, since (the X-Export-Watermark of a previous export,
+    for incremental runs) and per-export filters, e.g. role,
+    verification_status, status, pickup_country, dest_country, payment_method.
+    """
+    from app.services import export_service
+    fmt = request.args.get('format', 'ndjson')
+    if name not in export_service.EXPORTS:
+        return jsonify({'message': f"Unknown export '{name}'"}), 404
+    if fmt not in export_service.FORMATS:
+        return jsonify({'message': "format must be 'ndjson' or 'csv'"}), 400
+    try:
+        since = int(request.args.get('since') or 0)
+        fields, rows, watermark = export_service.prepare_export(
+            name, request.args, since=since,
+            batch_size=current_app.config.get('EXPORT_BATCH_SIZE', 1000)
+        )
+    except ValueError as e:
+        return jsonify({'message': f"Invalid export parameter: {e}"}), 400
+
+    stream = export_service.stream_csv if fmt == 'csv' else export_service.stream_ndjson
+    filename = f"{name}-{watermark}.{fmt}"
+    return Response(stream_with_context(stream(fields, rows)), mimetype=export_service.FORMATS[fmt], headers={
+        'Content-Disposition': f'attachment; filename="{filename}"',
+        'X-Export-Watermark': str(watermark),
+        'Cache-Control': 'no-store'
+    })
 
 @bp.route('/countries', methods=['GET'])
 @jwt_required()
@@ -143,12 +150,8 @@ def get_countries():
     return jsonify([c.to_dict() for c in countries])
 
 @bp.route('/countries', methods=['POST'])
-@jwt_required()
+@role_required(UserRole.ADMIN)
 def add_country():
-    current_user = User.query.get(get_jwt_identity())
-    if not current_user or current_user.role != UserRole.ADMIN:
-        return jsonify({'message': 'Admin access required'}), 403
-        
     data = request.get_json()
     name = data.get('name')
     if not name:
@@ -163,12 +166,8 @@ def add_country():
     return jsonify(country.to_dict()), 201
 
 @bp.route('/countries/<country_id>', methods=['DELETE'])
-@jwt_required()
+@role_required(UserRole.ADMIN)
 def delete_country(country_id):
-    current_user = User.query.get(get_jwt_identity())
-    if not current_user or current_user.role != UserRole.ADMIN:
-        return jsonify({'message': 'Admin access required'}), 403
-        
     country = SupportedCountry.query.get(country_id)
     if not country:
         return jsonify({'message': 'Country not found'}), 404
@@ -178,12 +177,8 @@ def delete_country(country_id):
     return jsonify({'message': 'Country deleted successfully'})
 
 @bp.route('/countries/<country_id>/toggle', methods=['POST'])
-@jwt_required()
+@role_required(UserRole.ADMIN)
 def toggle_country(country_id):
-    current_user = User.query.get(get_jwt_identity())
-    if not current_user or current_user.role != UserRole.ADMIN:
-        return jsonify({'message': 'Admin access required'}), 403
-        
     country = SupportedCountry.query.get(country_id)
     if not country:
         return jsonify({'message': 'Country not found'}), 404
@@ -193,24 +188,36 @@ def toggle_country(country_id):
     return jsonify(country.to_dict())
 
 @bp.route('/maintenance/run', methods=['POST'])
-@jwt_required()
+@role_required(UserRole.ADMIN)
 def trigger_maintenance():
-    current_user = User.query.get(get_jwt_identity())
-    if not current_user or current_user.role != UserRole.ADMIN:
-        return jsonify({'message': 'Admin access required'}), 403
-    
     from app.services.maintenance_service import run_system_maintenance
     run_system_maintenance()
     
     return jsonify({'message': 'System maintenance protocol executed successfully'})
 
+@bp.route('/emails', methods=['GET'])
+@role_required(UserRole.ADMIN)
+def get_email_outbox():
+    from app.models.email_outbox import OutboundEmail
+    page = request.args.get('page', 1, type=int)
+    per_page = request.args.get('per_page', 20, type=int)
+    status = request.args.get('status')
+
+    query = OutboundEmail.query
+    if status and status != 'ALL':
+        query = query.filter_by(status=status)
+    pagination = query.order_by(OutboundEmail.created_at.desc()).paginate(page=page, per_page=per_page, error_out=False)
+
+    return jsonify({
+        'emails': [e.to_dict() for e in pagination.items],
+        'total': pagination.total,
+        'pages': pagination.pages,
+        'current_page': pagination.page
+    })
+
 @bp.route('/rewards/all', methods=['POST'])
-@jwt_required()
+@role_required(UserRole.ADMIN)
 def award_all_users():
-    current_user = User.query.get(get_jwt_identity())
-    if not current_user or current_user.role != UserRole.ADMIN:
-        return jsonify({'message': 'Admin access required'}), 403
-        
     data = request.get_json()
     try:
         amount = int(data.get('amount', 0))
@@ -0,0 +1,61 @@
+from flask import Blueprint, request, Response, current_app
+from flask_jwt_extended import jwt_required, get_jwt_identity
+from app.models.user import User
+from app.services import event_broker
+from app.services.event_broker import format_sse
+import time
+
+bp = Blueprint('events', __name__, url_prefix='/api/events')
+
+@bp.route('/stream', methods=['GET'])
+@jwt_required(locations=['headers', 'query_string'])
+def stream():
+    """
+    Server-Sent Events feed of notification and message events for the caller.
+    EventSource cannot set headers, so the JWT may also be passed as ?jwt=<token>.
+    """
+    user_id = get_jwt_identity()
+    user = User.query.get(user_id)
+    if not user:
+        return {'message': 'User not found'}, 404
+
+    last_event_id = request.headers.get('Last-Event-ID') or request.args.get('last_event_id')
+    try:
+        last_event_id = int(last_event_id) if last_event_id else None
+    except ValueError:
+        last_event_id = None
+
+    topics = [f"user:{user.id}", f"role:{user.role.value}", 'all']
+    heartbeat = current_app.config.get('SSE_HEARTBEAT_SECONDS', 15)
+    retry_ms = current_app.config.get('SSE_RETRY_MS', 3000)
+    broker = event_broker.get_broker()
+    subscription, replay, needs_resync = broker.subscribe(topics, last_event_id)
+
+    def generate():
+        try:
+            yield f"retry: {retry_ms}\n\n"
+            if needs_resync:
+                yield format_sse(None, 'resync', {'reason': 'replay_unavailable'})
+            for event in replay:
+                yield format_sse(event['id'], event['event'], event['data'])
+
+            last_sent = time.monotonic()
+            while True:
+                event = subscription.get(timeout=heartbeat)
+                if subscription.overflowed:
+                    # Slow consumer: some events were dropped, client must refetch
+                    subscription.overflowed = False
+                    yield format_sse(None, 'resync', {'reason': 'buffer_overflow'})
+                if event:
+                    yield format_sse(event['id'], event['event'], event['data'])
+                    last_sent = time.monotonic()
+                elif time.monotonic() - last_sent >= heartbeat:
+                    yield ": heartbeat\n\n"
+                    last_sent = time.monotonic()
+        finally:
+            broker.unsubscribe(subscription)
+
+    return Response(generate(), mimetype='text/event-stream', headers={
+        'Cache-Control': 'no-cache',
+        'X-Accel-Buffering': 'no'
+    })
@@ -1,7 +1,13 @@
-from flask import Blueprint, request, jsonify
+from flask import Blueprint, request, jsonify, current_app
+from app.pagination import parse_cursor
 from app.services import message_service
+from app.services.event_broker import get_broker
 from app.schemas.message import MessageSchema, MessageThreadSchema
-from flask_jwt_extended import jwt_required, get_jwt_identity
+from app.extensions import db, sock
+from flask_jwt_extended import jwt_required, get_jwt_identity, verify_jwt_in_request
+from simple_websocket import ConnectionClosed
+import json
+import threading
 
 bp = Blueprint('messages', __name__, url_prefix='/api/messages')
 message_schema = MessageSchema()
@@ -28,13 +34,72 @@ def create_thread():
 def get_user_threads():
     current_user_id = get_jwt_identity()
     threads = message_service.get_user_threads(current_user_id)
-    return jsonify(threads_schema.dump(threads))
+    result = threads_schema.dump(threads)
+    for data, thread in zip(result, threads):
+        data['unread_count'] = thread.unread_for(current_user_id)
+    return jsonify(result)
+
+@bp.route('/search', methods=['GET'])
+@jwt_required()
+def search_messages():
+    current_user_id = get_jwt_identity()
+    query = request.args.get('q', '').strip()
+    if not query:
+        return jsonify({"error": "q is required"}), 400
+    page = max(request.args.get('page', 1, type=int), 1)
+    per_page = min(max(request.args.get('per_page', 20, type=int), 1), current_app.config.get('MESSAGE_PAGE_SIZE_MAX', 200))
+
+    hits, has_more = message_service.search_messages(current_user_id, query, limit=per_page, offset=(page - 1) * per_page)
+    results = []
+    for message, snippet in hits:
+        thread = message.thread
+        other = thread.participant2 if thread.participant1_id == current_user_id else thread.participant1
+        results.append({
+            'message': message_schema.dump(message),
+            'snippet': snippet,
+            'thread': {
+                'id': thread.id,
+                'shipment_id': thread.shipment_id,
+                'participant': {'id': other.id, 'first_name': other.first_name, 'last_name': other.last_name} if other else None
+            }
+        })
+    return jsonify({
+        'results': results,
+        'page': page,
+        'per_page': per_page,
+        'has_more': has_more
+    })
+
+@bp.route('/threads/<thread_id>/read', methods=['PUT'])
+@jwt_required()
+def mark_thread_read(thread_id):
+    current_user_id = get_jwt_identity()
+    updated = message_service.mark_thread_read(thread_id, current_user_id)
+    if updated is None:
+        return jsonify({"error": "Thread not found"}), 404
+    return jsonify({"thread_id": thread_id, "marked_read": updated, "unread_count": 0})
 
 @bp.route('/threads/<thread_id>/messages', methods=['GET'])
 @jwt_required()
 def get_thread_messages(thread_id):
-    messages = message_service.get_thread_messages(thread_id)
-    return jsonify(messages_schema.dump(messages))
+    current_user_id = get_jwt_identity()
+    if not message_service.is_participant(thread_id, current_user_id):
+        return jsonify({"error": "Thread not found"}), 404
+
+    default_size = current_app.config.get('MESSAGE_PAGE_SIZE', 50)
+    limit = min(max(request.args.get('limit', default_size, type=int), 1), current_app.config.get('MESSAGE_PAGE_SIZE_MAX', 200))
+    try:
+        before = parse_cursor(request.args['before']) if request.args.get('before') else None
+        after = parse_cursor(request.args['after']) if request.args.get('after') else None
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    messages, next_cursor = message_service.get_thread_messages(thread_id, limit=limit, before=before, after=after)
+    response = jsonify(messages_schema.dump(messages))
+    # Pass back as ?before= (or ?after= when paging forward) to load the next page
+    if next_cursor:
+        response.headers['X-Next-Cursor'] = next_cursor
+    return response
 
 @bp.route('/', methods=['POST'])
 @jwt_required()
@@ -48,3 +113,140 @@ def create_message():
 
     new_message = message_service.create_message(data)
     return jsonify(message_schema.dump(new_message)), 201
+
+def _ws_frame(type, **fields):
+    return json.dumps(dict(type=type, **fields))
+
+class _SerializedSocket:
+    """
+    One writer for a connection. The pump thread (events, resync, ping) and
+    the receive loop (ack, error, pong) both send, and simple_websocket's
+    send/close update shared wsproto state without a lock, so every outgoing
+    frame goes through this lock.
+    """
+
+    def __init__(self, ws):
+        self.ws = ws
+        self._lock = threading.Lock()
+
+    def send(self, data):
+        with self._lock:
+            self.ws.send(data)
+
+    def close(self, reason=None, message=None):
+        with self._lock:
+            self.ws.close(reason=reason, message=message)
+
+    def receive(self, timeout=None):
+        return self.ws.receive(timeout=timeout)
+
+def _handle_ws_frame(ws, user_id, frame):
+    """Process one client frame: send, read or ping"""
+    kind = frame.get('type')
+    client_id = frame.get('client_id')
+
+    if kind == 'ping':
+        ws.send(_ws_frame('pong'))
+    elif kind == 'send':
+        thread_id = frame.get('thread_id')
+        text = (frame.get('text') or '').strip()
+        if not thread_id or not text:
+            ws.send(_ws_frame('error', client_id=client_id, error='thread_id and text are required'))
+            return
+        if len(text) > current_app.config.get('CHAT_WS_MAX_MESSAGE_LENGTH', 4000):
+            ws.send(_ws_frame('error', client_id=client_id, error='Message too long'))
+            return
+        if not message_service.is_participant(thread_id, user_id):
+            ws.send(_ws_frame('error', client_id=client_id, error='Thread not found'))
+            return
+        # Delivery to the receiver happens through the broker publish inside create_message
+        message = message_service.create_message({'sender_id': user_id, 'thread_id': thread_id, 'text': text})
+        ws.send(_ws_frame('ack', client_id=client_id, message=message_schema.dump(message)))
+    elif kind == 'read':
+        updated = message_service.mark_thread_read(frame.get('thread_id'), user_id)
+        if updated is None:
+            ws.send(_ws_frame('error', client_id=client_id, error='Thread not found'))
+    else:
+        ws.send(_ws_frame('error', client_id=client_id, error='Unknown frame type'))
+
+@sock.route('/ws', bp=bp)
+def chat_socket(ws):
+    """
+    Bidirectional chat over WebSocket (JWT via ?jwt= or Authorization header).
+    Client frames: {"type": "send", "thread_id", "text", "client_id"},
+    {"type": "read", "thread_id"} and {"type": "ping"}. Server frames carry
+    broker events ({"type": "message" | "notification" | "thread.read", "id", "data"}),
+    plus "ack", "error", "resync" and "ping".
+    """
+    try:
+        verify_jwt_in_request(locations=['query_string', 'headers'])
+        user_id = get_jwt_identity()
+    except Exception:
+        ws.close(reason=1008, message='Unauthorized')
+        return
+
+    ws = _SerializedSocket(ws)
+    config = current_app.config
+    policy = config.get('CHAT_WS_OVERFLOW_POLICY', 'drop_oldest')
+    ping_seconds = config.get('CHAT_WS_PING_SECONDS', 25)
+    last_event_id = request.args.get('last_event_id', type=int)
+    broker = get_broker()
+    subscription, replay, needs_resync = broker.subscribe(
+        [f"user:{user_id}"],
+        last_event_id=last_event_id,
+        queue_size=config.get('CHAT_WS_QUEUE_SIZE', 256),
+        overflow_policy=policy
+    )
+    stopped = threading.Event()
+
+    def pump():
+        """Drain this connection's send queue so a slow socket never blocks publishers"""
+        try:
+            if needs_resync:
+                ws.send(_ws_frame('resync', reason='replay_unavailable'))
+            for event in replay:
+                ws.send(_ws_frame(event['event'], id=event['id'], data=event['data']))
+            while not stopped.is_set():
+                event = subscription.get(timeout=ping_seconds)
+                if subscription.closed:
+                    if subscription.overflowed:
+                        ws.close(reason=1013, message='Slow consumer')
+                    break
+                if subscription.overflowed:
+                    subscription.overflowed = False
+                    ws.send(_ws_frame('resync', reason='buffer_overflow'))
+                if event:
+                    ws.send(_ws_frame(event['event'], id=event['id'], data=event['data']))
+                else:
+                    ws.send(_ws_frame('ping'))
+        except ConnectionClosed:
+            pass
+        finally:
+            stopped.set()
+
+    sender = threading.Thread(target=pump, daemon=True)
+    sender.start()
+    try:
+        while not stopped.is_set():
+            raw = ws.receive(timeout=ping_seconds)
+            if raw is None:
+                continue
+            try:
+                frame = json.loads(raw)
+            except (TypeError, ValueError):
+                frame = None
+            if not isinstance(frame, dict):
+                ws.send(_ws_frame('error', error='Invalid JSON'))
+                continue
+            try:
+                _handle_ws_frame(ws, user_id, frame)
+            except ValueError as e:
+                db.session.rollback()
+                ws.send(_ws_frame('error', client_id=frame.get('client_id'), error=str(e)))
+            finally:
+                # Long-lived connection: do not keep a session (and its identity map) open between frames
+                db.session.remove()
+    finally:
+        stopped.set()
+        broker.unsubscribe(subscription)
+        db.session.remove()
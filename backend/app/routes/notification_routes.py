@@ -1,7 +1,7 @@
 from flask import Blueprint, request, jsonify
 from flask_jwt_extended import jwt_required, get_jwt_identity
-from app.extensions import db
-from app.models.notification import Notification
+from app.services import notification_service
+from app.pagination import parse_cursor
 
 bp = Blueprint('notifications', __name__, url_prefix='/api/notifications')
 
@@ -9,33 +9,41 @@ bp = Blueprint('notifications', __name__, url_prefix='/api/notifications')
 @jwt_required()
 def get_notifications():
     user_id = get_jwt_identity()
-    notifications = Notification.query.filter_by(user_id=user_id).order_by(Notification.created_at.desc()).limit(50).all()
-    return jsonify([n.to_dict() for n in notifications]), 200
+    limit = min(max(request.args.get('limit', 50, type=int), 1), 100)
+    before = request.args.get('before')
+    try:
+        cursor = parse_cursor(before) if before else None
+    except ValueError as e:
+        return jsonify({'message': str(e)}), 400
+
+    notifications, next_cursor = notification_service.get_notifications(user_id, limit=limit, before=cursor)
+    response = jsonify(notifications)
+    # Body stays a plain list for existing clients; the next page is ?before=<X-Next-Cursor>
+    if next_cursor:
+        response.headers['X-Next-Cursor'] = next_cursor
+    return response, 200
 
 @bp.route('/unread-count', methods=['GET'])
 @jwt_required()
 def get_unread_count():
     user_id = get_jwt_identity()
-    count = Notification.query.filter_by(user_id=user_id, is_read=False).count()
+    count = notification_service.get_unread_count(user_id)
     return jsonify({'count': count}), 200
 
 @bp.route('/<notification_id>/read', methods=['PUT'])
 @jwt_required()
 def mark_as_read(notification_id):
     user_id = get_jwt_identity()
-    notification = Notification.query.filter_by(id=notification_id, user_id=user_id).first()
+    notification = notification_service.mark_as_read(user_id, notification_id)
     
     if not notification:
         return jsonify({'message': 'Notification not found'}), 404
     
-    notification.is_read = True
-    db.session.commit()
-    return jsonify(notification.to_dict()), 200
+    return jsonify(notification), 200
 
 @bp.route('/read-all', methods=['PUT'])
 @jwt_required()
 def mark_all_as_read():
     user_id = get_jwt_identity()
-    Notification.query.filter_by(user_id=user_id, is_read=False).update({'is_read': True})
-    db.session.commit()
+    notification_service.mark_all_as_read(user_id)
     return jsonify({'message': 'All notifications marked as read'}), 200
@@ -2,6 +2,8 @@ from flask import Blueprint, request, jsonify
 from app.services import subscription_service
 from app.schemas.subscription import SubscriptionPlanSchema, SubscriptionTransactionSchema
 from flask_jwt_extended import jwt_required
+from app.auth import role_required
+from app.models.enums import UserRole
 from werkzeug.utils import secure_filename
 import os
 import uuid
@@ -51,15 +53,8 @@ def get_user_transactions(user_id):
     return jsonify(transactions_schema.dump(transactions))
 
 @bp.route('/transactions', methods=['GET'])
-@jwt_required()
+@role_required(UserRole.ADMIN, error_key='error')
 def get_all_transactions():
-    # Admin check
-    from flask_jwt_extended import get_jwt_identity
-    from app.models.user import User, UserRole
-    current_user = User.query.get(get_jwt_identity())
-    if not current_user or current_user.role != UserRole.ADMIN:
-        return jsonify({'error': 'Admin access required'}), 403
-
     page = request.args.get('page', 1, type=int)
     per_page = request.args.get('per_page', 20, type=int)
     status = request.args.get('status')
@@ -82,15 +77,8 @@ def get_all_transactions():
     })
 
 @bp.route('/transactions/<transaction_id>', methods=['PATCH'])
-@jwt_required()
+@role_required(UserRole.ADMIN, error_key='error')
 def update_transaction(transaction_id):
-    # Admin check
-    from flask_jwt_extended import get_jwt_identity
-    from app.models.user import User, UserRole
-    current_user = User.query.get(get_jwt_identity())
-    if not current_user or current_user.role != UserRole.ADMIN:
-        return jsonify({'error': 'Admin access required'}), 403
-
     data = request.get_json()
     status = data.get('status')
     if not status:
@@ -1,5 +1,6 @@
 from flask import Blueprint, request, jsonify
 from flask_jwt_extended import jwt_required, get_jwt_identity
+from app.auth import role_required, has_role, current_user
 from app.extensions import db
 from app.models.support import SupportTicket, TicketReply
 from app.models.user import User
@@ -77,7 +78,6 @@ def trigger_bot_response(ticket_id):
 @jwt_required()
 def get_tickets():
     user_id = get_jwt_identity()
-    user = User.query.get(user_id)
     
     page = request.args.get('page', 1, type=int)
     per_page = request.args.get('per_page', 20, type=int)
@@ -87,7 +87,7 @@ def get_tickets():
 
     query = SupportTicket.query
 
-    if user.role != UserRole.ADMIN:
+    if not has_role(UserRole.ADMIN):
         query = query.filter_by(user_id=user_id)
     
     if status and status != 'ALL':
@@ -130,13 +130,12 @@ def get_tickets():
 @jwt_required()
 def get_ticket(ticket_id):
     user_id = get_jwt_identity()
-    user = User.query.get(user_id)
     ticket = SupportTicket.query.get(ticket_id)
 
     if not ticket:
         return jsonify({'message': 'Ticket not found'}), 404
     
-    if user.role != UserRole.ADMIN and ticket.user_id != user_id:
+    if not has_role(UserRole.ADMIN) and ticket.user_id != user_id:
         return jsonify({'message': 'Unauthorized'}), 403
 
     result = ticket.to_dict()
@@ -147,13 +146,13 @@ def get_ticket(ticket_id):
 @jwt_required()
 def reply_to_ticket(ticket_id):
     user_id = get_jwt_identity()
-    user = User.query.get(user_id)
+    is_admin = has_role(UserRole.ADMIN)
     ticket = SupportTicket.query.get(ticket_id)
 
     if not ticket:
         return jsonify({'message': 'Ticket not found'}), 404
     
-    if user.role != UserRole.ADMIN and ticket.user_id != user_id:
+    if not is_admin and ticket.user_id != user_id:
         return jsonify({'message': 'Unauthorized'}), 403
 
     data = request.get_json()
@@ -167,7 +166,7 @@ def reply_to_ticket(ticket_id):
     )
 
     # If admin replies, change status to PENDING or RESOLVED optionally
-    if user.role == UserRole.ADMIN:
+    if is_admin:
         ticket.status = TicketStatus.PENDING
     else:
         ticket.status = TicketStatus.OPEN
@@ -176,7 +175,7 @@ def reply_to_ticket(ticket_id):
     
     # Notify relevant party
     from app.models.notification import create_notification
-    if user.role == UserRole.ADMIN:
+    if is_admin:
         # Notify ticket owner
         create_notification(
             user_id=ticket.user_id,
@@ -187,6 +186,7 @@ def reply_to_ticket(ticket_id):
         )
     else:
         # Notify all admins
+        user = current_user()
         admins = User.query.filter_by(role=UserRole.ADMIN).all()
         for admin in admins:
             create_notification(
@@ -201,14 +201,8 @@ def reply_to_ticket(ticket_id):
     return jsonify(reply.to_dict()), 201
 
 @bp.route('/tickets/<ticket_id>/status', methods=['PUT'])
-@jwt_required()
+@role_required(UserRole.ADMIN)
 def update_ticket_status(ticket_id):
-    user_id = get_jwt_identity()
-    user = User.query.get(user_id)
-    
-    if user.role != UserRole.ADMIN:
-        return jsonify({'message': 'Admin access required'}), 403
-
     data = request.get_json()
     status = data.get('status')
     if not status or status not in [s.value for s in TicketStatus]:
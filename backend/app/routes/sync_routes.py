@@ -0,0 +1,49 @@
+from flask import Blueprint, request, jsonify
+from flask_jwt_extended import jwt_required, get_jwt_identity
+from app.services import sync_service
+from app.schemas.user import UserSchema
+from app.schemas.shipment import ShipmentItemSchema
+from app.schemas.message import MessageThreadSchema
+
+bp = Blueprint('sync', __name__, url_prefix='/api/sync')
+user_schema = UserSchema()
+shipments_schema = ShipmentItemSchema(many=True)
+shipment_schema = ShipmentItemSchema()
+threads_schema = MessageThreadSchema(many=True)
+
+@bp.route('', methods=['GET'])
+@jwt_required()
+def sync():
+    """
+    Delta sync for app start and resume. Pass the previous response's token
+    as ?token= to receive only records changed since then; omit it for a
+    full snapshot. Deleted records are not reported.
+    """
+    user_id = get_jwt_identity()
+    token = request.args.get('token', '0')
+    if not token.isdigit():
+        return jsonify({'message': 'Invalid sync token'}), 400
+
+    changes = sync_service.get_changes(user_id, since=int(token))
+    if changes is None:
+        return jsonify({'message': 'User not found'}), 404
+
+    threads = threads_schema.dump(changes['threads'])
+    for data, thread in zip(threads, changes['threads']):
+        data['unread_count'] = thread.unread_for(user_id)
+
+    return jsonify({
+        'token': str(changes['token']),
+        'full': changes['full'],
+        'profile': user_schema.dump(changes['profile']) if changes['profile'] else None,
+        'shipments': shipments_schema.dump(changes['shipments']),
+        'requests': [{
+            'id': r.id,
+            'status': r.status,
+            'shipment': shipment_schema.dump(r.shipment),
+            'created_at': r.created_at.isoformat()
+        } for r in changes['requests']],
+        'threads': threads,
+        'notifications': changes['notifications'],
+        'unread_count': changes['unread_count']
+    }), 200
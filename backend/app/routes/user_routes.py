@@ -4,7 +4,10 @@ from app.extensions import db
 from app.models.enums import UserRole, VerificationStatus
 from app.schemas.user import UserSchema
 from flask_jwt_extended import jwt_required, get_jwt_identity
+from app.auth import role_required, has_role
+from app.ratelimit import rate_limit, concurrency_limit
 import os
+import secrets
 from werkzeug.utils import secure_filename
 from datetime import datetime
 
@@ -13,6 +16,8 @@ user_schema = UserSchema()
 users_schema = UserSchema(many=True)
 
 @bp.route('/register', methods=['POST'])
+@rate_limit(ip='RATE_LIMIT_REGISTER_IP', email='RATE_LIMIT_REGISTER_EMAIL')
+@concurrency_limit('auth', 'AUTH_CONCURRENCY_LIMIT')
 def register():
     data = request.get_json()
     if not data or not data.get('email') or not data.get('password'):
@@ -26,14 +31,11 @@ def register():
     user = user_service.create_user(data)
     if not user:
         return jsonify({'message': 'User already exists'}), 400
-        
-    # Send Actual OTP Email
-    from app.services.email_service import send_otp_email
-    send_otp_email(user.email, user.email_otp)
     
     return jsonify(user_schema.dump(user)), 201
 
 @bp.route('/verify-otp', methods=['POST'])
+@rate_limit(ip='RATE_LIMIT_OTP_IP', email='RATE_LIMIT_OTP_EMAIL')
 def verify_otp():
     data = request.get_json()
     email = data.get('email')
@@ -49,6 +51,8 @@ def verify_otp():
         return jsonify({'message': message}), 400
 
 @bp.route('/login', methods=['POST'])
+@rate_limit(ip='RATE_LIMIT_LOGIN_IP', email='RATE_LIMIT_LOGIN_EMAIL')
+@concurrency_limit('auth', 'AUTH_CONCURRENCY_LIMIT')
 def login():
     data = request.get_json()
     if not data or not data.get('email') or not data.get('password'):
@@ -67,6 +71,8 @@ def login():
     }), 200
 
 @bp.route('/google-login', methods=['POST'])
+@rate_limit(ip='RATE_LIMIT_GOOGLE_LOGIN_IP')
+@concurrency_limit('auth', 'AUTH_CONCURRENCY_LIMIT')
 def google_login():
     data = request.get_json()
     token = data.get('token')
@@ -125,22 +131,22 @@ def get_profile():
 @jwt_required()
 def update_user(user_id):
     current_user_id = get_jwt_identity()
-    current_user = user_service.get_user(current_user_id)
+    is_admin = has_role(UserRole.ADMIN)
     
     # Basic authorization check: only allow users to update themselves or admin
-    if current_user_id != user_id and current_user.role != UserRole.ADMIN:
+    if current_user_id != user_id and not is_admin:
         return jsonify({'message': 'Unauthorized'}), 403
 
     data = request.get_json()
     
     # Security: Prevent users from changing their own verification status
     # Only admins can update verification_status
-    if current_user.role != UserRole.ADMIN and 'verification_status' in data:
+    if not is_admin and 'verification_status' in data:
         return jsonify({'message': 'Only admins can update verification status'}), 403
 
     # Logic: If sensitive fields change, revert to PENDING (unless Admin)
     sensitive_fields = ['passport_number', 'national_id', 'id_front_url', 'id_back_url', 'selfie_url', 'liveness_video', 'id_type']
-    if any(field in data for field in sensitive_fields) and current_user.role != UserRole.ADMIN:
+    if any(field in data for field in sensitive_fields) and not is_admin:
          data['verification_status'] = VerificationStatus.PENDING
     
     user = user_service.update_user(user_id, data)
@@ -229,25 +235,29 @@ def update_registration(user_id):
                 file_url = f"{request.host_url}static/uploads/{filename}"
                 data[model_key] = file_url
 
+    uploaded = [key for key in file_mapping.values() if key in data]
+    if uploaded and user.kyc_documents:
+        # Same filename can be re-uploaded; drop stale metadata so it is processed again
+        data['kyc_documents'] = {k: v for k, v in user.kyc_documents.items() if k not in uploaded}
+
     # Set verification_status to PENDING after registration is complete
     data['verification_status'] = 'PENDING'
 
     # Update user with all registration data
     try:
         updated_user = user_service.update_user(user_id, data)
-        return jsonify(user_schema.dump(updated_user)), 200
     except Exception as e:
         return jsonify({'message': str(e)}), 500
 
+    if uploaded:
+        # Recompress, thumbnail and checksum the documents off the request thread
+        from app.services.kyc_service import processing_pool
+        processing_pool.submit(user_id)
+    return jsonify(user_schema.dump(updated_user)), 200
+
 @bp.route('/<user_id>/verify', methods=['POST'])
-@jwt_required()
+@role_required(UserRole.ADMIN, message='Unauthorized. Admin role required.')
 def verify_user(user_id):
-    current_user_id = get_jwt_identity()
-    current_admin = user_service.get_user(current_user_id)
-    
-    if not current_admin or current_admin.role != UserRole.ADMIN:
-        return jsonify({'message': 'Unauthorized. Admin role required.'}), 403
-
     user = user_service.get_user(user_id)
     if not user:
         return jsonify({'message': 'User not found'}), 404
@@ -265,11 +275,7 @@ def verify_user(user_id):
     from app.constants import SETTING_KYC_VERIFICATION_BONUS
     
     # Use config value or default
-    kyc_bonus_val = GlobalSetting.get_value(SETTING_KYC_VERIFICATION_BONUS, default="50")
-    try:
-        kyc_bonus = int(kyc_bonus_val)
-    except (ValueError, TypeError):
-        kyc_bonus = 50
+    kyc_bonus = GlobalSetting.get_value(SETTING_KYC_VERIFICATION_BONUS, default=50)
 
     if kyc_bonus > 0:
         user_service.reward_user_coins(user_id, kyc_bonus, "KYC Fulfillment Bonus")
@@ -321,11 +327,11 @@ def request_email_verification():
         return jsonify({'message': 'User not found'}), 404
         
     token = secrets.token_urlsafe(32)
-    user_service.update_user(user_id, {'email_verification_token': token})
     
-    # Send Actual Email
+    # Queued first so update_user commits the email together with the token
     from app.services.email_service import send_verification_email
     send_verification_email(user.email, token)
+    user_service.update_user(user_id, {'email_verification_token': token})
     
     return jsonify({'message': 'Verification email sent. Please check your inbox.'}), 200
 
@@ -347,6 +353,8 @@ def verify_email():
     return "<h1>Email Verified!</h1><p>Your email has been successfully verified. You can now close this window.</p>", 200
 
 @bp.route('/forgot-password', methods=['POST'])
+@rate_limit(ip='RATE_LIMIT_PASSWORD_RESET_IP', email='RATE_LIMIT_PASSWORD_RESET_EMAIL')
+@concurrency_limit('auth', 'AUTH_CONCURRENCY_LIMIT')
 def forgot_password():
     data = request.get_json()
     email = data.get('email')
@@ -14,17 +14,9 @@ class MessageSchema(ma.SQLAlchemyAutoSchema):
 class MessageThreadSchema(ma.SQLAlchemyAutoSchema):
     participant1 = fields.Nested('UserSchema', only=('id', 'first_name', 'last_name', 'name', 'avatar'))
     participant2 = fields.Nested('UserSchema', only=('id', 'first_name', 'last_name', 'name', 'avatar'))
-    last_message = fields.Method("get_last_message_content")
+    last_message = fields.String(attribute='last_message_preview', dump_only=True)
     shipment = fields.Nested('ShipmentItemSchema', only=('id', 'status', 'pickup_country', 'dest_country', 'category'))
 
-    def get_last_message_content(self, obj):
-        # Efficiently get last message if not stored
-        if obj.messages:
-            # Sort by timestamp desc and get first
-            sorted_msgs = sorted(obj.messages, key=lambda x: x.timestamp, reverse=True)
-            return sorted_msgs[0].text if sorted_msgs else None
-        return None
-
     class Meta:
         model = MessageThread
         load_instance = True
@@ -1,32 +1,216 @@
 from flask_mail import Message
-from app.extensions import mail
+from app.extensions import db, mail
 from flask import current_app
+from datetime import datetime, timedelta
+from sqlalchemy import event
+from sqlalchemy.orm import Session
 import logging
+import smtplib
+import threading
+import uuid
 
 logger = logging.getLogger(__name__)
 
-def send_email(subject, recipients, body, subtype='html'):
-    """Base helper to send email."""
-    try:
-        msg = Message(
-            subject=subject,
-            recipients=recipients if isinstance(recipients, list) else [recipients],
-            body=body if subtype == 'plain' else None,
-            html=body if subtype == 'html' else None,
-            sender=(current_app.config.get('MAIL_FROM_NAME', 'GlobalPath'), current_app.config.get('MAIL_DEFAULT_SENDER'))
+def send_email(subject, recipients, body, subtype='html', commit=False):
+    """
+    Queue an email in the outbox; the outbox worker delivers it. The row
+    joins the caller's transaction and is only sent once the caller commits
+    its unit of work; commit=True commits it on its own.
+    """
+    from app.models.email_outbox import OutboundEmail
+    email = OutboundEmail(
+        subject=subject[:255],
+        recipients=recipients if isinstance(recipients, list) else [recipients],
+        body=body,
+        subtype=subtype
+    )
+    db.session.add(email)
+    db.session.info[OUTBOX_QUEUED] = True
+    if commit:
+        db.session.commit()
+    return True
+
+OUTBOX_QUEUED = 'outbox_queued'
+
+@event.listens_for(Session, 'after_commit')
+def _wake_outbox(session):
+    # Whoever commits the row, the worker hears about it right away instead of on its next poll
+    if session.info.pop(OUTBOX_QUEUED, False):
+        outbox_worker.wake()
+
+@event.listens_for(Session, 'after_rollback')
+def _discard_outbox_wake(session):
+    session.info.pop(OUTBOX_QUEUED, None)
+
+def _build_message(email):
+    return Message(
+        subject=email.subject,
+        recipients=email.recipients,
+        body=email.body if email.subtype == 'plain' else None,
+        html=email.body if email.subtype == 'html' else None,
+        sender=(current_app.config.get('MAIL_FROM_NAME', 'GlobalPath'), current_app.config.get('MAIL_DEFAULT_SENDER'))
+    )
+
+def _is_permanent(error):
+    """Rejections a retry cannot fix: 5xx replies, including every recipient refused with one"""
+    if isinstance(error, smtplib.SMTPRecipientsRefused):
+        return all(500 <= code < 600 for code, _ in error.recipients.values())
+    if isinstance(error, smtplib.SMTPResponseException):
+        return 500 <= error.smtp_code < 600
+    return False
+
+def _claim_due(batch_size, lease_seconds):
+    """Mark up to batch_size due rows SENDING for this worker; safe against concurrent workers"""
+    from app.models.email_outbox import OutboundEmail
+    now = datetime.utcnow()
+    due = db.or_(
+        db.and_(OutboundEmail.status == 'PENDING', OutboundEmail.next_attempt_at <= now),
+        db.and_(OutboundEmail.status == 'SENDING', OutboundEmail.locked_until < now)
+    )
+    ids = [row.id for row in db.session.query(OutboundEmail.id).filter(due)
+           .order_by(OutboundEmail.next_attempt_at).limit(batch_size)]
+    if not ids:
+        return []
+    token = str(uuid.uuid4())
+    OutboundEmail.query.filter(OutboundEmail.id.in_(ids), due).update({
+        'status': 'SENDING',
+        'claim_token': token,
+        'locked_until': now + timedelta(seconds=lease_seconds)
+    }, synchronize_session=False)
+    db.session.commit()
+    return OutboundEmail.query.filter_by(claim_token=token, status='SENDING') \
+        .order_by(OutboundEmail.next_attempt_at).all()
+
+def _record_failure(email, error, config):
+    email.attempts = (email.attempts or 0) + 1
+    email.last_error = f"{type(error).__name__}: {error}"[:1000]
+    email.claim_token = None
+    if _is_permanent(error) or email.attempts >= config.get('EMAIL_MAX_ATTEMPTS', 6):
+        email.status = 'FAILED'
+        logger.error(f"Giving up on email {email.id} to {email.recipients} after {email.attempts} attempts: {email.last_error}")
+    else:
+        delay = min(
+            config.get('EMAIL_RETRY_BASE_SECONDS', 30) * 2 ** (email.attempts - 1),
+            config.get('EMAIL_RETRY_MAX_SECONDS', 3600)
         )
-        mail.send(msg)
-        logger.info(f"Email sent to {recipients}")
-        return True
-    except Exception as e:
-        logger.error(f"Failed to send email to {recipients}: {str(e)}")
-        # Log for dev if sending fails
-        print(f"--- EMAIL SENDING FAILED ---")
-        print(f"Subject: {subject}")
-        print(f"To: {recipients}")
-        print(f"Body: {body}")
-        print(f"---------------------------")
-        return False
+        email.status = 'PENDING'
+        email.next_attempt_at = datetime.utcnow() + timedelta(seconds=delay)
+        logger.warning(f"Email {email.id} attempt {email.attempts} failed, retrying in {delay}s: {email.last_error}")
+
+def deliver_outbox(batch_size=None):
+    """
+    Send one batch of due outbox rows over a single SMTP connection.
+    Returns (sent, failed) counts; failed includes rows rescheduled for retry.
+    """
+    config = current_app.config
+    batch = _claim_due(
+        batch_size or config.get('EMAIL_OUTBOX_BATCH_SIZE', 50),
+        config.get('EMAIL_OUTBOX_LEASE_SECONDS', 300)
+    )
+    if not batch:
+        return 0, 0
+
+    sent = failed = 0
+    connection = mail.connect()
+    try:
+        connection.__enter__()
+    except (smtplib.SMTPException, OSError) as e:
+        # Server unreachable or login refused: the whole batch waits for a retry
+        for email in batch:
+            _record_failure(email, e, config)
+        db.session.commit()
+        return 0, len(batch)
+
+    try:
+        for email in batch:
+            try:
+                if connection.host is None and not connection.mail.suppress:
+                    connection.host = connection.configure_host() # Dropped by an earlier failure
+                connection.send(_build_message(email))
+            except (smtplib.SMTPException, OSError) as e:
+                _record_failure(email, e, config)
+                failed += 1
+                if isinstance(e, (smtplib.SMTPServerDisconnected, OSError)):
+                    connection.host = None
+            else:
+                email.status = 'SENT'
+                email.attempts = (email.attempts or 0) + 1
+                email.sent_at = datetime.utcnow()
+                email.claim_token = None
+                email.last_error = None
+                sent += 1
+            db.session.commit() # Per message, so a crash never resends what already went out
+    finally:
+        try:
+            connection.__exit__(None, None, None)
+        except (smtplib.SMTPException, OSError):
+            pass
+    if sent:
+        logger.info(f"Outbox delivered {sent} emails ({failed} failed)")
+    return sent, failed
+
+class OutboxWorker:
+    """
+    Background thread that drains the outbox: it wakes when a request
+    queues mail and otherwise polls every `poll_seconds` for retries that
+    came due. Rows are claimed with a lease, so running this in several
+    processes (or email_worker.py alongside the web app) is safe.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._thread = None
+        self.app = None
+        self.enabled = False
+        self.poll_seconds = 30
+
+    def configure(self, app, enabled=True, poll_seconds=30):
+        self.app = app
+        self.enabled = enabled
+        self.poll_seconds = poll_seconds
+
+    def wake(self):
+        if not self.enabled:
+            return
+        self.start()
+        self._wakeup.set()
+
+    def start(self):
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self.run_forever, name='email-outbox', daemon=True)
+                self._thread.start()
+
+    def run_forever(self):
+        while True:
+            self._wakeup.clear()
+            try:
+                with self.app.app_context():
+                    while True:
+                        sent, failed = deliver_outbox()
+                        if not sent and not failed:
+                            break
+            except Exception as e:
+                logger.error(f"Email outbox worker error: {str(e)}")
+            self._wakeup.wait(self.poll_seconds)
+
+outbox_worker = OutboxWorker()
+
+def init_email_outbox(app):
+    outbox_worker.configure(
+        app,
+        enabled=app.config.get('EMAIL_OUTBOX_WORKER', True),
+        poll_seconds=app.config.get('EMAIL_OUTBOX_POLL_SECONDS', 30)
+    )
+
+    @app.before_request
+    def _start_outbox_worker():
+        # Pick up mail left pending by a previous process without waiting for new mail
+        if outbox_worker.enabled:
+            outbox_worker.start()
+
+    return outbox_worker
 
 def send_password_reset_email(email, reset_token):
     """Send password reset email to user."""
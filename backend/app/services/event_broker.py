@@ -0,0 +1,171 @@
+import itertools
+import json
+import threading
+from abc import ABC, abstractmethod
+from collections import deque
+from sqlalchemy import event as sa_event
+from sqlalchemy.orm import Session
+
+class Subscription:
+    """
+    One connection's bounded event buffer. When the consumer falls behind,
+    the 'drop_oldest' policy discards the oldest events and flags the
+    subscription so the client can be told to resync; 'disconnect' marks it
+    closed so the transport can drop the slow consumer.
+    """
+
+    def __init__(self, topics, maxsize, overflow_policy='drop_oldest'):
+        self.topics = set(topics)
+        self.maxsize = maxsize
+        self.overflow_policy = overflow_policy
+        self.overflowed = False
+        self.closed = False
+        self._events = deque()
+        self._cond = threading.Condition()
+
+    def push(self, event):
+        with self._cond:
+            if self.closed:
+                return
+            if len(self._events) >= self.maxsize:
+                self.overflowed = True
+                if self.overflow_policy == 'disconnect':
+                    self.closed = True
+                    self._cond.notify_all()
+                    return
+                self._events.popleft()
+            self._events.append(event)
+            self._cond.notify()
+
+    def get(self, timeout=None):
+        """Next event, or None once `timeout` seconds pass with nothing queued"""
+        with self._cond:
+            if not self._events and not self.closed:
+                self._cond.wait(timeout)
+            return self._events.popleft() if self._events else None
+
+    def close(self):
+        with self._cond:
+            self.closed = True
+            self._cond.notify_all()
+
+class EventBroker(ABC):
+    """
+    Pub/sub interface used by the SSE stream. Topics are plain strings such
+    as 'user:<id>', 'role:<ROLE>' or 'all'. A cross-process backend (Redis,
+    Postgres LISTEN/NOTIFY) implements the three abstract methods;
+    configure is optional.
+    """
+
+    @abstractmethod
+    def publish(self, topic, event, data):
+        ...
+
+    @abstractmethod
+    def subscribe(self, topics, last_event_id=None, queue_size=None, overflow_policy='drop_oldest'):
+        """Returns (subscription, replay_events, needs_resync)"""
+
+    @abstractmethod
+    def unsubscribe(self, subscription):
+        ...
+
+    def configure(self, queue_size=100, replay_size=1000):
+        pass
+
+class InProcessBroker(EventBroker):
+    """Broker for a single worker process; events never leave the process"""
+
+    def __init__(self, queue_size=100, replay_size=1000):
+        self._lock = threading.Lock()
+        self._ids = itertools.count(1)
+        self._subscribers = {}
+        self.configure(queue_size, replay_size)
+
+    def configure(self, queue_size=100, replay_size=1000):
+        with self._lock:
+            self.queue_size = queue_size
+            self._history = deque(getattr(self, '_history', ()), maxlen=replay_size)
+
+    def publish(self, topic, event, data):
+        with self._lock:
+            item = {'id': next(self._ids), 'topic': topic, 'event': event, 'data': data}
+            self._history.append(item)
+            subscribers = list(self._subscribers.get(topic, ()))
+        for subscription in subscribers:
+            subscription.push(item)
+        return item['id']
+
+    def subscribe(self, topics, last_event_id=None, queue_size=None, overflow_policy='drop_oldest'):
+        subscription = Subscription(topics, queue_size or self.queue_size, overflow_policy)
+        with self._lock:
+            for topic in subscription.topics:
+                self._subscribers.setdefault(topic, set()).add(subscription)
+
+            replay, needs_resync = [], False
+            if last_event_id is not None:
+                oldest = self._history[0]['id'] if self._history else None
+                newest = self._history[-1]['id'] if self._history else 0
+                # Gap in the buffer, or an id from another process/restart
+                if (oldest is not None and last_event_id < oldest - 1) or last_event_id > newest:
+                    needs_resync = True
+                replay = [e for e in self._history if e['id'] > last_event_id and e['topic'] in subscription.topics]
+        return subscription, replay, needs_resync
+
+    def unsubscribe(self, subscription):
+        subscription.close()
+        with self._lock:
+            for topic in subscription.topics:
+                subscribers = self._subscribers.get(topic)
+                if subscribers:
+                    subscribers.discard(subscription)
+                    if not subscribers:
+                        del self._subscribers[topic]
+
+BROKER_BACKENDS = {
+    'memory': InProcessBroker
+}
+
+broker = InProcessBroker()
+
+def init_broker(app):
+    """Select and size the broker from app config"""
+    global broker
+    backend = app.config.get('EVENT_BROKER_BACKEND', 'memory')
+    if backend not in BROKER_BACKENDS:
+        raise ValueError(f"Unknown event broker backend: {backend}")
+    if not isinstance(broker, BROKER_BACKENDS[backend]):
+        broker = BROKER_BACKENDS[backend]()
+    broker.configure(
+        queue_size=app.config.get('SSE_QUEUE_SIZE', 100),
+        replay_size=app.config.get('SSE_REPLAY_SIZE', 1000)
+    )
+    return broker
+
+def get_broker():
+    return broker
+
+def publish_to_user(user_id, event, data):
+    return broker.publish(f"user:{user_id}", event, data)
+
+PENDING_EVENTS = 'pending_user_events'
+
+def publish_after_commit(user_id, event, data, session=None):
+    """Hold a user event until the current transaction commits; dropped on rollback"""
+    if session is None:
+        from app.extensions import db
+        session = db.session()
+    session.info.setdefault(PENDING_EVENTS, []).append((user_id, event, data))
+
+@sa_event.listens_for(Session, 'after_commit')
+def _publish_pending(session):
+    for user_id, event, data in session.info.pop(PENDING_EVENTS, []):
+        publish_to_user(user_id, event, data)
+
+@sa_event.listens_for(Session, 'after_rollback')
+def _discard_pending(session):
+    session.info.pop(PENDING_EVENTS, None)
+
+def format_sse(event_id, event, data):
+    """Serialize one event in text/event-stream framing; control events carry no id"""
+    frame = f"id: {event_id}\n" if event_id is not None else ""
+    return f"{frame}event: {event}\ndata: {json.dumps(data)}\n\n"
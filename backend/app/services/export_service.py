@@ -0,0 +1,160 @@
+import csv
+import enum
+import io
+import json
+from datetime import datetime
+from sqlalchemy import or_
+from sqlalchemy.orm import aliased
+from app.extensions import db
+from app.models.enums import UserRole, VerificationStatus, ItemStatus
+from app.models.user import User
+from app.models.shipment import ShipmentItem
+from app.models.subscription import SubscriptionTransaction
+from app.models.sync import current_change_seq
+
+FORMATS = {
+    'ndjson': 'application/x-ndjson',
+    'csv': 'text/csv'
+}
+
+def _user_columns():
+    return [
+        User.id, User.first_name, User.last_name, User.email, User.role,
+        User.verification_status, User.is_email_verified, User.phone_number,
+        User.wallet_balance, User.coins_balance, User.rating,
+        User.completed_deliveries, User.current_plan_id, User.created_at, User.change_seq
+    ], []
+
+def _user_filters(args):
+    filters = []
+    if args.get('role'):
+        filters.append(User.role == UserRole(args['role']))
+    if args.get('verification_status'):
+        filters.append(User.verification_status == VerificationStatus(args['verification_status']))
+    return filters
+
+def _shipment_columns():
+    sender = aliased(User)
+    return [
+        ShipmentItem.id, ShipmentItem.sender_id, sender.email.label('sender_email'),
+        ShipmentItem.partner_id, ShipmentItem.category, ShipmentItem.pickup_country,
+        ShipmentItem.dest_country, ShipmentItem.weight, ShipmentItem.fee, ShipmentItem.status,
+        ShipmentItem.picked_at, ShipmentItem.created_at, ShipmentItem.change_seq
+    ], [(sender, ShipmentItem.sender_id == sender.id)]
+
+def _shipment_filters(args):
+    filters = []
+    if args.get('status'):
+        filters.append(ShipmentItem.status == ItemStatus(args['status']))
+    if args.get('pickup_country'):
+        filters.append(ShipmentItem.pickup_country == args['pickup_country'])
+    if args.get('dest_country'):
+        filters.append(ShipmentItem.dest_country == args['dest_country'])
+    if args.get('sender_id'):
+        filters.append(ShipmentItem.sender_id == args['sender_id'])
+    return filters
+
+def _transaction_columns():
+    return [
+        SubscriptionTransaction.id, SubscriptionTransaction.user_id, User.email.label('user_email'),
+        SubscriptionTransaction.plan_id, SubscriptionTransaction.plan_name, SubscriptionTransaction.amount,
+        SubscriptionTransaction.payment_method, SubscriptionTransaction.status, SubscriptionTransaction.is_active,
+        SubscriptionTransaction.timestamp, SubscriptionTransaction.end_date,
+        SubscriptionTransaction.transaction_reference, SubscriptionTransaction.change_seq
+    ], [(User, SubscriptionTransaction.user_id == User.id)]
+
+def _transaction_filters(args):
+    filters = []
+    if args.get('status') and args['status'] != 'ALL':
+        filters.append(SubscriptionTransaction.status == args['status'])
+    if args.get('payment_method') and args['payment_method'] != 'ALL':
+        filters.append(SubscriptionTransaction.payment_method == args['payment_method'])
+    if args.get('user_id'):
+        filters.append(SubscriptionTransaction.user_id == args['user_id'])
+    return filters
+
+# name -> (model, columns factory, filters factory)
+EXPORTS = {
+    'users': (User, _user_columns, _user_filters),
+    'shipments': (ShipmentItem, _shipment_columns, _shipment_filters),
+    'transactions': (SubscriptionTransaction, _transaction_columns, _transaction_filters)
+}
+
+def _plain(value):
+    if isinstance(value, enum.Enum):
+        return value.value
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return value
+
+def prepare_export(name, args, since=0, batch_size=1000):
+    """
+    Builds the query for an export and returns (fields, rows, watermark).
+    Raises KeyError for an unknown export and ValueError for a bad filter.
+
+    Rows come back in change sequence order, `batch_size` at a time through
+    a server-side cursor where the driver supports one, so memory stays flat
+    however large the table is. The watermark is read before the query runs:
+    the export covers changes up to it, and passing it back as `since` picks
+    up rows created or modified afterwards. Deletes are not exported.
+    """
+    model, columns_factory, filters_factory = EXPORTS[name]
+    columns, joins = columns_factory()
+    filters = filters_factory(args)
+    watermark = current_change_seq()
+    if since > watermark:
+        since = 0 # Watermark from another database (reset/restore): export everything
+
+    query = db.session.query(*columns)
+    for target, condition in joins:
+        query = query.outerjoin(target, condition)
+    if since:
+        query = query.filter(model.change_seq > since, model.change_seq <= watermark)
+    else:
+        # Rows written before change stamps existed carry none until migrate.py runs
+        query = query.filter(or_(model.change_seq <= watermark, model.change_seq.is_(None)))
+    query = query.filter(*filters).order_by(model.change_seq, model.id)
+
+    fields = [d['name'] for d in query.column_descriptions]
+    return fields, query.execution_options(yield_per=batch_size), watermark
+
+def stream_ndjson(fields, rows, chunk_rows=500):
+    """One JSON object per line, yielded in chunks of `chunk_rows` lines"""
+    buffer = []
+    for row in rows:
+        buffer.append(json.dumps({f: _plain(v) for f, v in zip(fields, row)}))
+        if len(buffer) >= chunk_rows:
+            yield '\n'.join(buffer) + '\n'
+            buffer = []
+    if buffer:
+        yield '\n'.join(buffer) + '\n'
+
+def stream_csv(fields, rows, chunk_rows=500):
+    """Header line then one CSV record per row, yielded in chunks of `chunk_rows` records"""
+    out = io.StringIO()
+    writer = csv.writer(out)
+    writer.writerow(fields)
+    pending = 1
+    for row in rows:
+        writer.writerow(['' if v is None else _plain(v) for v in row])
+        pending += 1
+        if pending >= chunk_rows:
+            yield out.getvalue()
+            out.seek(0)
+            out.truncate()
+            pending = 0
+    if pending:
+        yield out.getvalue()
+
+def stream_json_array(items, chunk_rows=500):
+    """A JSON array written element by element, for endpoints whose clients expect one"""
+    yield '['
+    buffer, first = [], True
+    for item in items:
+        buffer.append(json.dumps(item))
+        if len(buffer) >= chunk_rows:
+            yield ('' if first else ',') + ','.join(buffer)
+            buffer, first = [], False
+    if buffer:
+        yield ('' if first else ',') + ','.join(buffer)
+    yield ']'
@@ -0,0 +1,214 @@
+import hashlib
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from flask import current_app
+from app.extensions import db
+from app.models.user import User
+from app.models.enums import VerificationStatus
+
+KYC_IMAGE_FIELDS = ('id_front_url', 'id_back_url', 'selfie_url')
+KYC_FILE_FIELDS = KYC_IMAGE_FIELDS + ('liveness_video',)
+
+class KycProcessingPool:
+    """
+    Bounded thread pool for post-upload KYC processing. Uploads beyond
+    `max_pending` queued jobs are not processed right away; the maintenance
+    sweep (process_pending_documents) picks them up later.
+    """
+
+    def __init__(self, workers=2, max_pending=32):
+        self._lock = threading.Lock()
+        self._executor = None
+        self._pending = 0
+        self.configure(workers, max_pending)
+
+    def configure(self, workers=2, max_pending=32):
+        with self._lock:
+            if self._executor is None or workers != self.workers:
+                previous = self._executor
+                self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='kyc')
+                if previous:
+                    previous.shutdown(wait=False)
+            self.workers = workers
+            self.max_pending = max_pending
+
+    def submit(self, user_id):
+        app = current_app._get_current_object()
+        with self._lock:
+            if self._pending >= self.max_pending:
+                print(f"KYC processing queue full, deferring user {user_id} to maintenance")
+                return False
+            self._pending += 1
+            executor = self._executor
+        future = executor.submit(self._run, app, user_id)
+        future.add_done_callback(lambda _: self._release())
+        return True
+
+    def _release(self):
+        with self._lock:
+            self._pending -= 1
+
+    @staticmethod
+    def _run(app, user_id):
+        with app.app_context():
+            try:
+                process_user_documents(user_id)
+            except Exception as e:
+                db.session.rollback()
+                print(f"KYC processing failed for user {user_id}: {str(e)}")
+
+processing_pool = KycProcessingPool()
+
+def init_kyc_processing(app):
+    processing_pool.configure(
+        workers=app.config.get('KYC_PROCESSING_WORKERS', 2),
+        max_pending=app.config.get('KYC_PROCESSING_QUEUE_SIZE', 32)
+    )
+    return processing_pool
+
+def _upload_dir():
+    return os.path.join(current_app.root_path, 'static', 'uploads')
+
+def _sibling_url(url, filename):
+    return f"{url.rsplit('/', 1)[0]}/{filename}"
+
+def _digest(path):
+    sha = hashlib.sha256()
+    size = 0
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b''):
+            sha.update(chunk)
+            size += len(chunk)
+    return size, f"sha256:{sha.hexdigest()}"
+
+def _normalize_image(path, config):
+    """
+    Re-encode an uploaded image as an upright JPEG no larger than
+    KYC_IMAGE_MAX_DIMENSION and write a KYC_THUMBNAIL_SIZE review thumbnail
+    next to it; the upload itself is left untouched. Returns (image path,
+    thumbnail path, width, height), or None when Pillow is not installed.
+    """
+    try:
+        from PIL import Image, ImageOps
+    except ImportError:
+        return None
+
+    max_dim = config.get('KYC_IMAGE_MAX_DIMENSION', 2000)
+    thumb_dim = config.get('KYC_THUMBNAIL_SIZE', 400)
+    quality = config.get('KYC_IMAGE_QUALITY', 85)
+    stem = os.path.splitext(path)[0]
+    image_path, thumb_path = f"{stem}_normalized.jpg", f"{stem}_thumb.jpg"
+
+    with Image.open(path) as original:
+        original.draft('RGB', (max_dim, max_dim)) # JPEG decodes at reduced scale directly
+        image = ImageOps.exif_transpose(original).convert('RGB')
+    image.thumbnail((max_dim, max_dim))
+    tmp_path = f"{image_path}.tmp"
+    image.save(tmp_path, 'JPEG', quality=quality, optimize=True)
+    os.replace(tmp_path, image_path)
+
+    width, height = image.size
+    image.thumbnail((thumb_dim, thumb_dim))
+    image.save(thumb_path, 'JPEG', quality=quality)
+    return image_path, thumb_path, width, height
+
+def _process_file(field, url, config):
+    filename = url.rsplit('/', 1)[-1]
+    path = os.path.join(_upload_dir(), filename)
+    if not os.path.exists(path):
+        return None, None
+
+    original_size, original_checksum = _digest(path)
+    entry = {
+        'source': url,
+        'original_size': original_size,
+        'original_checksum': original_checksum,
+        'processed_at': datetime.utcnow().isoformat()
+    }
+    new_url = url
+    if field in KYC_IMAGE_FIELDS:
+        try:
+            result = _normalize_image(path, config)
+        except Exception as e:
+            result = None
+            entry['error'] = f"Unreadable image: {str(e)}"[:255]
+        if result:
+            image_path, thumb_path, width, height = result
+            new_url = _sibling_url(url, os.path.basename(image_path))
+            entry.update(
+                thumbnail_url=_sibling_url(url, os.path.basename(thumb_path)),
+                width=width,
+                height=height
+            )
+            path = image_path
+
+    entry['url'] = new_url
+    entry['size'], entry['checksum'] = _digest(path)
+    return new_url, entry
+
+def _is_processed(user, field):
+    url = getattr(user, field)
+    entry = (user.kyc_documents or {}).get(field)
+    return not url or (entry and url in (entry.get('url'), entry.get('source')))
+
+def process_user_documents(user_id):
+    """
+    Normalize the user's unprocessed KYC uploads and record size, checksum
+    and thumbnail on User.kyc_documents. The original upload stays on disk
+    as `source`, with its own checksum, as the evidence the user submitted.
+    A document the user replaced while it was being processed is left for
+    the next run.
+    """
+    config = current_app.config
+    user = User.query.get(user_id)
+    if not user:
+        return 0
+
+    results = {}
+    for field in KYC_FILE_FIELDS:
+        if not _is_processed(user, field):
+            url = getattr(user, field)
+            new_url, entry = _process_file(field, url, config)
+            if entry:
+                results[field] = (url, new_url, entry)
+    if not results:
+        return 0
+
+    db.session.refresh(user) # Uploads may have changed while files were processed
+    documents = dict(user.kyc_documents or {})
+    for field, (url, new_url, entry) in results.items():
+        if getattr(user, field) != url:
+            continue
+        setattr(user, field, new_url)
+        documents[field] = entry
+    user.kyc_documents = documents
+    db.session.commit()
+    return len(results)
+
+def process_pending_documents(limit=200, batch_size=500):
+    """
+    Maintenance sweep for uploads the pool deferred or a restart interrupted.
+    Walks PENDING users in keyset batches so `limit` counts users that still
+    had work, not the oldest users, who are usually done already.
+    """
+    from app.pagination import after_cursor
+    processed = handled = 0
+    cursor = None
+    while handled < limit:
+        query = User.query.filter(User.verification_status == VerificationStatus.PENDING)
+        if cursor:
+            query = query.filter(after_cursor(User.created_at, User.id, cursor))
+        users = query.order_by(User.created_at.asc(), User.id.asc()).limit(batch_size).all()
+        if not users:
+            break
+        cursor = (users[-1].created_at, users[-1].id)
+        for user in users:
+            if all(_is_processed(user, field) for field in KYC_FILE_FIELDS):
+                continue
+            processed += process_user_documents(user.id)
+            handled += 1
+            if handled >= limit:
+                break
+    return processed
@@ -1,7 +1,7 @@
 from datetime import datetime, timedelta
 from app.extensions import db
 from app.models.shipment import ShipmentItem
-from app.models.subscription import SubscriptionTransaction, SubscriptionPlan
+from app.models.subscription import SubscriptionTransaction, UserEntitlement
 from app.models.user import User
 
 def recalculate_rankings():
@@ -13,20 +13,20 @@ def recalculate_rankings():
     from app.models.enums import ItemStatus
     shipments = ShipmentItem.query.filter(ShipmentItem.status.in_(['POSTED', 'REQUESTED'])).all()
     now = datetime.utcnow()
+    premium_senders = {
+        user_id for (user_id,) in db.session.query(UserEntitlement.user_id).filter(
+            UserEntitlement.transaction_id.isnot(None),
+            UserEntitlement.is_premium == True,
+            UserEntitlement.end_date > now
+        )
+    }
 
     for item in shipments:
         score = 100.0 # Base score
 
         # 1. Premium Boost
         # Find if sender has an active premium subscription
-        premium_sub = db.session.query(SubscriptionTransaction).join(SubscriptionPlan).filter(
-            SubscriptionTransaction.user_id == item.sender_id,
-            SubscriptionTransaction.is_active == True,
-            SubscriptionPlan.is_premium == True,
-            SubscriptionTransaction.end_date > now
-        ).first()
-
-        if premium_sub:
+        if item.sender_id in premium_senders:
             score += 500.0 # Significant boost for premium users
             print(f"Applying premium boost to item {item.id}")
 
@@ -58,9 +58,9 @@ def deactivate_expired_subscriptions():
 
     from app.models.notification import create_notification
     count = 0
+    from app.services.subscription_service import expire_subscription
     for sub in expired:
-        sub.is_active = False
-        sub.remaining_usage = 0 # Protocol reset: clear all remaining delivery slots
+        expire_subscription(sub)
         count += 1
         
         # Broadcast termination notification to edge node
@@ -89,7 +89,7 @@ def award_daily_activity_coins():
     yesterday = datetime.utcnow() - timedelta(days=1)
     
     # 1. Rewards for Active Senders
-    sender_reward = int(GlobalSetting.get_value('reward_daily_active_sender', default=1))
+    sender_reward = GlobalSetting.get_value('reward_daily_active_sender', default=1)
     active_senders = db.session.query(ShipmentItem.sender_id).filter(
         ShipmentItem.created_at >= yesterday,
         ShipmentItem.status.in_(['POSTED', 'REQUESTED'])
@@ -99,7 +99,7 @@ def award_daily_activity_coins():
         reward_user_coins(uid, sender_reward, "Standard Active Sender Reward")
 
     # 2. Rewards for High-Performance Pickers
-    picker_reward = int(GlobalSetting.get_value('reward_daily_active_picker', default=5))
+    picker_reward = GlobalSetting.get_value('reward_daily_active_picker', default=5)
     # Find pickers with >= 3 items picked/approved in the last 24h
     active_pickers = db.session.query(ShipmentItem.partner_id).filter(
         ShipmentItem.partner_id.isnot(None),
@@ -119,13 +119,13 @@ def process_holiday_bonuses():
     import requests
     from app.models.setting import GlobalSetting
     from app.constants import SETTING_HOLIDAY_BONUS_AMOUNT, SETTING_LAST_HOLIDAY_CHECK
-    from app.models.notification import create_notification
+    from app.services.notification_service import create_broadcast
     
     today = datetime.utcnow().date()
     today_str = today.isoformat()
     
     # Avoid duplicate checks/bonuses on the same day
-    if GlobalSetting.get_value(SETTING_LAST_HOLIDAY_CHECK) == today_str:
+    if GlobalSetting.get_value(SETTING_LAST_HOLIDAY_CHECK, default='') == today_str:
         return
         
     print(f"Checking for public holidays on {today_str}...")
@@ -144,18 +144,19 @@ def process_holiday_bonuses():
                 holiday_name = holiday_today['name']
                 print(f"National Holiday Detected: {holiday_name}! Initiating global reward sequence...")
                 
-                bonus_amount = int(GlobalSetting.get_value(SETTING_HOLIDAY_BONUS_AMOUNT, default=15))
+                bonus_amount = GlobalSetting.get_value(SETTING_HOLIDAY_BONUS_AMOUNT, default=15)
                 users = User.query.all()
                 
                 for user in users:
                     user.coins_balance += bonus_amount
-                    create_notification(
-                        user_id=user.id,
-                        title=f"Happy {holiday_name}! 🎊",
-                        message=f"To celebrate the holiday, we've awarded you {bonus_amount} technical credits. Protocol connectivity for all!",
-                        type='SUCCESS',
-                        link='/packaging'
-                    )
+
+                # One announcement for everyone instead of a notification row per user
+                create_broadcast(
+                    title=f"Happy {holiday_name}! 🎊",
+                    message=f"To celebrate the holiday, we've awarded you {bonus_amount} technical credits. Protocol connectivity for all!",
+                    type='SUCCESS',
+                    link='/packaging'
+                )
                 
                 # Sync settings to prevent re-processing
                 GlobalSetting.set_value('current_holiday_protocol', holiday_name)
@@ -170,6 +171,43 @@ def process_holiday_bonuses():
     except Exception as e:
         print(f"Failed to process holiday bonuses: {str(e)}")
 
+def purge_old_notifications():
+    """
+    Applies the notification retention policy: read notifications older than
+    the configured age are archived or deleted in batches.
+    """
+    from flask import current_app
+    from app.models.setting import GlobalSetting
+    from app.constants import SETTING_NOTIFICATION_RETENTION_DAYS, SETTING_NOTIFICATION_RETENTION_ARCHIVE
+    from app.services.notification_service import purge_read_notifications
+
+    days = GlobalSetting.get_value(SETTING_NOTIFICATION_RETENTION_DAYS, default=90)
+    if days <= 0:
+        print("Notification retention disabled.")
+        return
+
+    archive = GlobalSetting.get_value(SETTING_NOTIFICATION_RETENTION_ARCHIVE, default=False)
+    print(f"Purging read notifications older than {days} days ({'archive' if archive else 'delete'})...")
+    removed = purge_read_notifications(days, archive=archive, batch_size=current_app.config.get('NOTIFICATION_RETENTION_BATCH_SIZE', 1000))
+    print(f"Notification retention complete. removed: {removed}")
+
+def reconcile_notification_counters():
+    """
+    Rebuilds every per-user unread notification counter from the source rows
+    to repair any drift left by failed writes or out-of-band updates.
+    """
+    from app.services.notification_service import reconcile_unread_counters
+    print("Reconciling notification counters...")
+    repaired = reconcile_unread_counters()
+    print(f"Counter reconciliation complete. repaired: {repaired}")
+
+def process_kyc_uploads():
+    """Normalizes KYC documents the upload-time pool deferred or never finished"""
+    from app.services.kyc_service import process_pending_documents
+    print("Processing pending KYC uploads...")
+    processed = process_pending_documents()
+    print(f"KYC upload processing complete. processed: {processed}")
+
 def run_system_maintenance():
     """Run all maintenance tasks"""
     print(f"--- System Maintenance Log: {datetime.utcnow()} ---")
@@ -177,4 +215,7 @@ def run_system_maintenance():
     recalculate_rankings()
     award_daily_activity_coins()
     process_holiday_bonuses()
+    purge_old_notifications()
+    reconcile_notification_counters()
+    process_kyc_uploads()
     print("--- Maintenance Session Finished ---")
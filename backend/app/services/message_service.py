@@ -1,46 +1,228 @@
 from app.models.message import Message, MessageThread
+from app.models.sync import next_change_seq
 from app.extensions import db
-from sqlalchemy import or_, and_
+from sqlalchemy import or_
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import joinedload
+from app.pagination import format_cursor, before_cursor, after_cursor
+from app.cache import TTLCache
+from app.config import Config
+from datetime import datetime
+import re
+import uuid
+
+# (receiver_id, thread_id) pairs notified recently; further messages in the
+# window only raise the thread's unread counter and the live 'message' event
+message_notification_throttle = TTLCache(ttl=Config.MESSAGE_NOTIFICATION_THROTTLE_SECONDS)
+sender_name_cache = TTLCache(ttl=Config.USER_NAME_CACHE_SECONDS)
+
+def sender_name(user_id):
+    name = sender_name_cache.get(user_id)
+    if name is None:
+        from app.models.user import User
+        row = db.session.query(User.first_name, User.last_name).filter_by(id=user_id).first()
+        name = f"{row.first_name} {row.last_name}" if row else "Someone"
+        sender_name_cache.set(user_id, name)
+    return name
+
+def _notify_new_message(receiver_id, sender_id, thread_id):
+    """
+    Bell notification for an incoming message, at most one per thread: none
+    while an unread one for the thread exists or within the throttle window.
+    """
+    key = (receiver_id, thread_id)
+    if message_notification_throttle.get(key):
+        return
+
+    from app.models.notification import Notification, create_notification
+    group_key = f"message:{thread_id}"
+    pending = db.session.query(Notification.query.filter_by(
+        user_id=receiver_id, group_key=group_key, is_read=False
+    ).exists()).scalar()
+    if not pending:
+        create_notification(
+            user_id=receiver_id,
+            title="New Message",
+            message=f"{sender_name(sender_id)} sent you a message.",
+            type='MESSAGE',
+            link=f"/messages",
+            group_key=group_key
+        )
+    message_notification_throttle.set(key, True)
 
 def get_user_threads(user_id):
-    """Get all message threads for a user"""
-    return MessageThread.query.filter(
+    """Get all message threads for a user; previews come from the thread row, not its messages"""
+    return MessageThread.query.options(
+        joinedload(MessageThread.participant1),
+        joinedload(MessageThread.participant2),
+        joinedload(MessageThread.shipment)
+    ).filter(
         or_(MessageThread.participant1_id == user_id, MessageThread.participant2_id == user_id)
     ).order_by(MessageThread.updated_at.desc()).all()
 
-def get_thread_messages(thread_id):
-    """Get all messages in a thread"""
-    return Message.query.filter_by(thread_id=thread_id).order_by(Message.timestamp).all()
+def get_thread_messages(thread_id, limit=50, before=None, after=None):
+    """
+    One page of a thread's history in chronological order, plus a cursor for
+    the next page (None when exhausted). Without cursors the newest page is
+    returned; `before` scrolls back in time and `after` catches up from a
+    known message.
+    """
+    query = Message.query.filter_by(thread_id=thread_id)
+    if after:
+        page = query.filter(after_cursor(Message.timestamp, Message.id, after))\
+            .order_by(Message.timestamp.asc(), Message.id.asc()).limit(limit + 1).all()
+        has_more = len(page) > limit
+        page = page[:limit]
+        edge = page[-1] if page else None
+    else:
+        if before:
+            query = query.filter(before_cursor(Message.timestamp, Message.id, before))
+        page = query.order_by(Message.timestamp.desc(), Message.id.desc()).limit(limit + 1).all()
+        has_more = len(page) > limit
+        page = list(reversed(page[:limit]))
+        edge = page[0] if page else None
+
+    next_cursor = format_cursor(edge.timestamp, edge.id) if has_more and edge else None
+    return page, next_cursor
+
+SEARCH_SQL = {
+    'sqlite': """
+        SELECT m.id, bm25(messages_fts) AS score,
+               snippet(messages_fts, 0, '[', ']', '...', 12) AS snippet
+        FROM messages_fts JOIN messages m ON m.rowid = messages_fts.rowid
+        WHERE messages_fts MATCH :query AND m.thread_id IN ({threads})
+        ORDER BY score, m.timestamp DESC LIMIT :limit OFFSET :offset
+    """,
+    'postgresql': """
+        SELECT m.id, -ts_rank(to_tsvector('simple', m.text), q) AS score,
+               ts_headline('simple', m.text, q, 'StartSel=[, StopSel=], MaxWords=20') AS snippet
+        FROM messages m, plainto_tsquery('simple', :query) q
+        WHERE to_tsvector('simple', m.text) @@ q AND m.thread_id IN ({threads})
+        ORDER BY score, m.timestamp DESC LIMIT :limit OFFSET :offset
+    """,
+}
+
+USER_THREADS_SQL = "SELECT id FROM message_threads WHERE participant1_id = :user_id OR participant2_id = :user_id"
+
+def _search_terms(query):
+    return re.findall(r'\w+', query or '')
+
+def search_messages(user_id, query, limit=20, offset=0):
+    """
+    Ranked full-text search over messages in the user's threads. Returns
+    ([(message, snippet)], has_more), best match first.
+    """
+    terms = _search_terms(query)
+    if not terms:
+        return [], False
+
+    dialect = db.engine.dialect.name
+    params = {'user_id': user_id, 'limit': limit + 1, 'offset': offset}
+    if dialect in SEARCH_SQL:
+        if dialect == 'sqlite':
+            # Quote every term so user input never reaches FTS5 query syntax; prefix-match the last
+            params['query'] = ' '.join(f'"{t}"' for t in terms) + '*'
+        else:
+            params['query'] = ' '.join(terms)
+        rows = db.session.execute(
+            db.text(SEARCH_SQL[dialect].format(threads=USER_THREADS_SQL)), params
+        ).all()
+        hits = [(row.id, row.snippet) for row in rows]
+    else:
+        matches = Message.query.filter(
+            Message.thread_id.in_(db.select(MessageThread.id).where(
+                or_(MessageThread.participant1_id == user_id, MessageThread.participant2_id == user_id)
+            )),
+            *[Message.text.ilike(f'%{t}%') for t in terms]
+        ).order_by(Message.timestamp.desc()).limit(limit + 1).offset(offset).all()
+        hits = [(m.id, None) for m in matches]
+
+    has_more = len(hits) > limit
+    hits = hits[:limit]
+    messages = Message.query.options(
+        joinedload(Message.thread).joinedload(MessageThread.participant1),
+        joinedload(Message.thread).joinedload(MessageThread.participant2),
+        joinedload(Message.sender)
+    ).filter(Message.id.in_([message_id for message_id, _ in hits])).all()
+    by_id = {m.id: m for m in messages}
+    return [(by_id[message_id], snippet) for message_id, snippet in hits if message_id in by_id], has_more
+
+def is_participant(thread_id, user_id):
+    return db.session.query(MessageThread.query.filter(
+        MessageThread.id == thread_id,
+        or_(MessageThread.participant1_id == user_id, MessageThread.participant2_id == user_id)
+    ).exists()).scalar()
+
+def mark_thread_read(thread_id, user_id):
+    """Flip every unread message addressed to the user in one UPDATE and reset their counter"""
+    thread = MessageThread.query.get(thread_id)
+    if not thread or user_id not in (thread.participant1_id, thread.participant2_id):
+        return None
+
+    updated = Message.query.filter_by(thread_id=thread_id, receiver_id=user_id, is_read=False)\
+        .update({'is_read': True}, synchronize_session=False)
+    MessageThread.query.filter_by(id=thread_id).update(
+        {thread.unread_column_for(user_id): 0, 'change_seq': next_change_seq()}, synchronize_session=False
+    )
+    db.session.commit()
+    # Having caught up, the reader gets a fresh notification for the next message
+    message_notification_throttle.invalidate((user_id, thread_id))
+
+    from app.services.event_broker import publish_to_user
+    payload = {'thread_id': thread_id, 'reader_id': user_id}
+    publish_to_user(thread.participant1_id, 'thread.read', payload)
+    publish_to_user(thread.participant2_id, 'thread.read', payload)
+    return updated
 
 def find_thread(user_id1, user_id2, shipment_id=None):
     """Find existing thread between two users, optionally for a specific shipment"""
-    query = MessageThread.query.filter(
-        or_(
-            and_(MessageThread.participant1_id == user_id1, MessageThread.participant2_id == user_id2),
-            and_(MessageThread.participant1_id == user_id2, MessageThread.participant2_id == user_id1)
-        )
-    )
-    
-    if shipment_id:
-        query = query.filter_by(shipment_id=shipment_id)
-        
-    return query.first()
+    low, high, context_key = MessageThread.thread_key(user_id1, user_id2, shipment_id)
+    return MessageThread.query.filter_by(
+        participant_low=low, participant_high=high, context_key=context_key
+    ).first()
+
+def _insert_ignoring_conflict(table, values, index_elements):
+    """INSERT that silently does nothing when the unique key already exists"""
+    dialect = db.engine.dialect.name
+    if dialect == 'postgresql':
+        from sqlalchemy.dialects.postgresql import insert
+    elif dialect == 'sqlite':
+        from sqlalchemy.dialects.sqlite import insert
+    else:
+        try:
+            with db.session.begin_nested():
+                db.session.execute(table.insert().values(**values))
+        except IntegrityError:
+            pass
+        return
+    db.session.execute(insert(table).values(**values).on_conflict_do_nothing(index_elements=index_elements))
 
 def create_thread(participant1_id, participant2_id, shipment_id=None):
-    """Create a new message thread"""
-    # Check if exists first
+    """Find or create the thread for two users and an optional shipment"""
     existing = find_thread(participant1_id, participant2_id, shipment_id)
     if existing:
         return existing
-        
-    thread = MessageThread(
-        participant1_id=participant1_id,
-        participant2_id=participant2_id,
-        shipment_id=shipment_id
-    )
-    db.session.add(thread)
+
+    # A concurrent request may insert the same key between the lookup and
+    # here; the unique index turns that race into a no-op instead of a duplicate
+    low, high, context_key = MessageThread.thread_key(participant1_id, participant2_id, shipment_id)
+    now = datetime.utcnow()
+    _insert_ignoring_conflict(MessageThread.__table__, {
+        'id': str(uuid.uuid4()),
+        'participant1_id': participant1_id,
+        'participant2_id': participant2_id,
+        'shipment_id': shipment_id,
+        'participant_low': low,
+        'participant_high': high,
+        'context_key': context_key,
+        'created_at': now,
+        'updated_at': now,
+        'participant1_unread': 0,
+        'participant2_unread': 0,
+        'change_seq': next_change_seq()
+    }, ['participant_low', 'participant_high', 'context_key'])
     db.session.commit()
-    return thread
+    return find_thread(participant1_id, participant2_id, shipment_id)
 
 def create_message(data):
     """Create a new message in a thread"""
@@ -56,29 +238,38 @@ def create_message(data):
     receiver_id = thread.participant2_id if thread.participant1_id == sender_id else thread.participant1_id
     
     message = Message(
+        id=str(uuid.uuid4()),
         thread_id=thread_id,
         sender_id=sender_id,
         receiver_id=receiver_id,
         text=text,
-        shipment_id=thread.shipment_id
+        shipment_id=thread.shipment_id,
+        timestamp=datetime.utcnow()
     )
     
-    # Update thread timestamp
-    thread.updated_at = message.timestamp
-    
-    db.session.add(message)
-    
-    # Create notification for receiver
-    from app.models.notification import create_notification
-    from app.models.user import User
-    sender = User.query.get(sender_id)
-    create_notification(
-        user_id=receiver_id,
-        title="New Message",
-        message=f"{sender.name} sent you a message.",
-        type='MESSAGE',
-        link=f"/messages"
+    # Update thread timestamp and last-message summary
+    thread.set_last_message(message)
+
+    # Atomic increment so concurrent sends never lose a count
+    unread = thread.unread_column_for(receiver_id)
+    MessageThread.query.filter_by(id=thread_id).update(
+        {unread: db.func.coalesce(unread, 0) + 1}, synchronize_session=False
     )
     
+    db.session.add(message)
     db.session.commit()
+
+    _notify_new_message(receiver_id, sender_id, thread_id)
+
+    from app.services.event_broker import publish_to_user
+    payload = {
+        'id': message.id,
+        'thread_id': message.thread_id,
+        'sender_id': message.sender_id,
+        'receiver_id': message.receiver_id,
+        'text': message.text,
+        'timestamp': message.timestamp.isoformat() if message.timestamp else None
+    }
+    publish_to_user(receiver_id, 'message', payload)
+    publish_to_user(sender_id, 'message', payload) # Sender's other open sessions
     return message
@@ -0,0 +1,412 @@
+from app.models.notification import Notification, NotificationCounter, BroadcastNotification, BroadcastTarget, BroadcastReceipt
+from app.models.shipment import ShipmentItem
+from app.models.user import User
+from app.models.sync import next_change_seq
+from app.extensions import db
+from app.cache import TTLCache
+from app.pagination import format_cursor, before_cursor, after_cursor
+from app.config import Config
+from app.services.event_broker import get_broker
+from sqlalchemy import or_, and_, union, event
+from sqlalchemy.orm import Session
+from datetime import datetime, timedelta
+
+BROADCAST_TARGET_TYPES = ('ALL', 'ROLE', 'USERS', 'LOCATION_HISTORY')
+
+unread_count_cache = TTLCache(ttl=Config.NOTIFICATION_COUNT_CACHE_SECONDS)
+_latest_broadcast_cache = TTLCache(ttl=Config.NOTIFICATION_COUNT_CACHE_SECONDS, maxsize=1)
+
+def invalidate_unread_count(user_id, session=None):
+    """
+    Drop the cached count once the current transaction commits. Dropping it
+    earlier would let a concurrent read cache the pre-commit count again.
+    """
+    session = session or db.session
+    session.info.setdefault('unread_count_stale', set()).add(user_id)
+
+@event.listens_for(Session, 'after_commit')
+def _invalidate_unread_counts(session):
+    for user_id in session.info.pop('unread_count_stale', ()):
+        unread_count_cache.invalidate(user_id)
+
+@event.listens_for(Session, 'after_rollback')
+def _discard_unread_counts(session):
+    session.info.pop('unread_count_stale', None)
+
+def _location_history(user_id):
+    """Countries a user has picked up from or delivered to as a partner"""
+    return union(
+        db.select(ShipmentItem.pickup_country).where(ShipmentItem.partner_id == user_id),
+        db.select(ShipmentItem.dest_country).where(ShipmentItem.partner_id == user_id)
+    )
+
+def _broadcast_filter(user):
+    """SQL predicate selecting the broadcasts that apply to a user"""
+    target_match = db.session.query(BroadcastTarget.broadcast_id).filter(
+        BroadcastTarget.broadcast_id == BroadcastNotification.id,
+        or_(
+            and_(BroadcastNotification.target_type == 'ROLE', BroadcastTarget.value == user.role.value),
+            and_(BroadcastNotification.target_type == 'USERS', BroadcastTarget.value == user.id),
+            and_(BroadcastNotification.target_type == 'LOCATION_HISTORY', BroadcastTarget.value.in_(_location_history(user.id)))
+        )
+    ).exists()
+
+    # Announcements made before the account existed were never addressed to it
+    return and_(
+        BroadcastNotification.created_at >= user.created_at,
+        or_(BroadcastNotification.target_type == 'ALL', target_match)
+    )
+
+def _broadcast_query(user, unread_only=False):
+    query = BroadcastNotification.query.filter(_broadcast_filter(user))
+    if unread_only:
+        read = db.session.query(BroadcastReceipt.broadcast_id).filter(
+            BroadcastReceipt.broadcast_id == BroadcastNotification.id,
+            BroadcastReceipt.user_id == user.id
+        ).exists()
+        query = query.filter(~read)
+    return query
+
+def create_broadcast(title, message, type='INFO', target_type='ALL', values=None, link=None, created_by=None):
+    """Store a broadcast once; it is merged into each recipient's feed on read"""
+    if target_type not in BROADCAST_TARGET_TYPES:
+        raise ValueError("Invalid target type")
+
+    broadcast = BroadcastNotification(
+        title=title,
+        message=message,
+        type=type,
+        link=link,
+        target_type=target_type,
+        created_by=created_by
+    )
+    if target_type != 'ALL':
+        unique_values = {str(v) for v in (values or []) if v}
+        if not unique_values:
+            raise ValueError("Broadcast target is empty")
+        broadcast.targets = [BroadcastTarget(value=v) for v in unique_values]
+
+    db.session.add(broadcast)
+    db.session.commit()
+    _latest_broadcast_cache.clear()
+    unread_count_cache.clear()
+    _publish_broadcast(broadcast)
+    return broadcast
+
+def _publish_broadcast(broadcast):
+    """Push a broadcast to connected streams whose topics match its target"""
+    payload = broadcast.to_dict()
+    values = [t.value for t in broadcast.targets]
+    if broadcast.target_type == 'ALL':
+        get_broker().publish('all', 'notification', payload)
+    elif broadcast.target_type == 'ROLE':
+        for role in values:
+            get_broker().publish(f"role:{role}", 'notification', payload)
+    elif broadcast.target_type == 'USERS':
+        for user_id in values:
+            get_broker().publish(f"user:{user_id}", 'notification', dict(payload, user_id=user_id))
+    else:
+        # Location history is resolved per user on read; just hint clients to refresh
+        get_broker().publish('all', 'notifications.changed', {'broadcast_id': broadcast.id})
+
+def _latest_broadcast_at():
+    latest = _latest_broadcast_cache.get('latest', default=False)
+    if latest is False:
+        latest = db.session.query(db.func.max(BroadcastNotification.created_at)).scalar()
+        _latest_broadcast_cache.set('latest', latest)
+    return latest
+
+def _before(model, cursor):
+    return before_cursor(model.created_at, model.id, cursor)
+
+def get_notifications(user_id, limit=50, before=None):
+    """
+    Personal notifications merged with applicable broadcasts, newest first.
+    `before` is a (created_at, id) cursor; returns (items, next_cursor).
+    """
+    user = User.query.get(user_id)
+    if not user:
+        return [], None
+
+    personal = Notification.query.filter_by(user_id=user_id)
+    broadcasts = _broadcast_query(user)
+    if before:
+        personal = personal.filter(_before(Notification, before))
+        broadcasts = broadcasts.filter(_before(BroadcastNotification, before))
+
+    # Each source is walked on its (user_id, created_at, id) / created_at index.
+    # One extra row from each tells whether anything follows the merged page.
+    personal = personal.order_by(Notification.created_at.desc(), Notification.id.desc()).limit(limit + 1).all()
+    broadcasts = broadcasts.order_by(BroadcastNotification.created_at.desc(), BroadcastNotification.id.desc()).limit(limit + 1).all()
+
+    merged = sorted(personal + broadcasts, key=lambda n: (n.created_at, n.id), reverse=True)
+    page = merged[:limit]
+    next_cursor = format_cursor(page[-1].created_at, page[-1].id) if len(merged) > limit else None
+
+    page_broadcasts = [n.id for n in page if isinstance(n, BroadcastNotification)]
+    read_ids = set()
+    if page_broadcasts:
+        read_ids = {r.broadcast_id for r in BroadcastReceipt.query.filter(
+            BroadcastReceipt.user_id == user_id,
+            BroadcastReceipt.broadcast_id.in_(page_broadcasts)
+        )}
+
+    items = [
+        n.to_dict(user_id=user_id, is_read=n.id in read_ids) if isinstance(n, BroadcastNotification) else n.to_dict()
+        for n in page
+    ]
+    return items, next_cursor
+
+def get_changed_notifications(user, since=0, limit=50):
+    """
+    Notification dicts created or updated after change sequence `since`,
+    for delta sync. A full sync (since=0) returns only the newest `limit`;
+    older history stays available through get_notifications paging.
+    """
+    personal = Notification.query.filter_by(user_id=user.id)
+    broadcasts = _broadcast_query(user)
+    if since:
+        personal = personal.filter(Notification.change_seq > since)
+        read_since = db.session.query(BroadcastReceipt.broadcast_id).filter(
+            BroadcastReceipt.broadcast_id == BroadcastNotification.id,
+            BroadcastReceipt.user_id == user.id,
+            BroadcastReceipt.change_seq > since
+        ).exists()
+        broadcasts = broadcasts.filter(or_(BroadcastNotification.change_seq > since, read_since))
+    else:
+        personal = personal.order_by(Notification.created_at.desc()).limit(limit)
+        broadcasts = broadcasts.order_by(BroadcastNotification.created_at.desc()).limit(limit)
+    personal = personal.all()
+    broadcasts = broadcasts.all()
+
+    read_ids = set()
+    if broadcasts:
+        read_ids = {r.broadcast_id for r in BroadcastReceipt.query.filter(
+            BroadcastReceipt.user_id == user.id,
+            BroadcastReceipt.broadcast_id.in_([b.id for b in broadcasts])
+        )}
+    merged = sorted(personal + broadcasts, key=lambda n: (n.created_at, n.id), reverse=True)
+    if not since:
+        merged = merged[:limit]
+    return [
+        n.to_dict(user_id=user.id, is_read=n.id in read_ids) if isinstance(n, BroadcastNotification) else n.to_dict()
+        for n in merged
+    ]
+
+def _count_unread(user, since=None, until=None, include_personal=True):
+    """
+    Unread count for a user: broadcasts published in (since, until] plus,
+    optionally, personal notifications. No `until` means no broadcasts exist yet.
+    """
+    total = 0
+    if until is not None:
+        broadcasts = _broadcast_query(user, unread_only=True).filter(BroadcastNotification.created_at <= until)
+        if since is not None:
+            broadcasts = broadcasts.filter(BroadcastNotification.created_at > since)
+        total += broadcasts.count()
+    if include_personal:
+        total += Notification.query.filter_by(user_id=user.id, is_read=False).count()
+    return total
+
+def rebuild_counter(user):
+    """Recompute a user's counter from scratch; caller commits"""
+    watermark = _latest_broadcast_at()
+    counter = NotificationCounter.query.get(user.id)
+    if not counter:
+        counter = NotificationCounter(user_id=user.id)
+        db.session.add(counter)
+    counter.unread_count = _count_unread(user, until=watermark)
+    counter.broadcast_watermark = watermark
+    invalidate_unread_count(user.id)
+    return counter
+
+def get_unread_count(user_id):
+    cached = unread_count_cache.get(user_id)
+    if cached is not None:
+        return cached
+
+    counter = NotificationCounter.query.get(user_id)
+    latest = _latest_broadcast_at()
+    if not counter:
+        user = User.query.get(user_id)
+        if not user:
+            return 0
+        counter = rebuild_counter(user)
+        db.session.commit()
+    elif latest and (counter.broadcast_watermark is None or latest > counter.broadcast_watermark):
+        # Fold in broadcasts published since the last read. The watermark guard
+        # makes concurrent readers fold each broadcast at most once.
+        user = User.query.get(user_id)
+        previous = counter.broadcast_watermark
+        fresh = _count_unread(user, since=previous, until=latest, include_personal=False) if user else 0
+        NotificationCounter.query.filter(
+            NotificationCounter.user_id == user_id,
+            NotificationCounter.broadcast_watermark.is_(None) if previous is None else NotificationCounter.broadcast_watermark == previous
+        ).update({
+            'unread_count': NotificationCounter.unread_count + fresh,
+            'broadcast_watermark': latest
+        }, synchronize_session=False)
+        db.session.commit()
+        db.session.refresh(counter)
+
+    unread_count_cache.set(user_id, counter.unread_count)
+    return counter.unread_count
+
+def mark_as_read(user_id, notification_id):
+    """Mark a personal notification or a broadcast as read; returns its dict or None"""
+    notification = Notification.query.filter_by(id=notification_id, user_id=user_id).first()
+    if notification:
+        flipped = Notification.query.filter_by(id=notification_id, is_read=False)\
+            .update({'is_read': True, 'open_group_key': None, 'change_seq': next_change_seq()}, synchronize_session=False)
+        NotificationCounter.adjust(user_id, -flipped)
+        db.session.commit()
+        db.session.refresh(notification)
+        return notification.to_dict()
+
+    user = User.query.get(user_id)
+    if not user:
+        return None
+    broadcast = _broadcast_query(user).filter(BroadcastNotification.id == notification_id).first()
+    if not broadcast:
+        return None
+
+    if not BroadcastReceipt.query.get((broadcast.id, user_id)):
+        db.session.add(BroadcastReceipt(broadcast_id=broadcast.id, user_id=user_id))
+        # Only broadcasts already folded into the counter were counted
+        counter = NotificationCounter.query.get(user_id)
+        if counter and counter.broadcast_watermark and broadcast.created_at <= counter.broadcast_watermark:
+            NotificationCounter.adjust(user_id, -1)
+        db.session.commit()
+    return broadcast.to_dict(user_id=user_id, is_read=True)
+
+def mark_all_as_read(user_id):
+    Notification.query.filter_by(user_id=user_id, is_read=False).update({'is_read': True, 'open_group_key': None, 'change_seq': next_change_seq()})
+
+    user = User.query.get(user_id)
+    if user:
+        now = datetime.utcnow()
+        for broadcast in _broadcast_query(user, unread_only=True).all():
+            db.session.add(BroadcastReceipt(broadcast_id=broadcast.id, user_id=user_id, read_at=now))
+
+        counter = NotificationCounter.query.get(user_id)
+        if not counter:
+            counter = NotificationCounter(user_id=user_id)
+            db.session.add(counter)
+        counter.unread_count = 0
+        counter.broadcast_watermark = _latest_broadcast_at()
+        invalidate_unread_count(user_id)
+    db.session.commit()
+
+def reconcile_unread_counters(batch_size=500):
+    """
+    Repair counter drift; returns the number of counters whose stored
+    unread_count was wrong. Users without a counter row are skipped:
+    get_unread_count builds theirs on first read.
+    """
+    repaired = 0
+    last_id = ''
+    while True:
+        counters = NotificationCounter.query.filter(NotificationCounter.user_id > last_id) \
+            .order_by(NotificationCounter.user_id).limit(batch_size).all()
+        if not counters:
+            break
+        for counter in counters:
+            before = counter.unread_count
+            if rebuild_counter(counter.user).unread_count != before:
+                repaired += 1
+        db.session.commit()
+        last_id = counters[-1].user_id
+    return repaired
+
+def _broadcast_recipients(broadcast):
+    """Query of the users a broadcast is addressed to, mirroring _broadcast_filter"""
+    from app.models.enums import UserRole
+    values = [t.value for t in broadcast.targets]
+    users = User.query.filter(User.created_at <= broadcast.created_at)
+    if broadcast.target_type == 'ROLE':
+        users = users.filter(User.role.in_([UserRole(v) for v in values if v in UserRole._value2member_map_]))
+    elif broadcast.target_type == 'USERS':
+        users = users.filter(User.id.in_(values))
+    elif broadcast.target_type == 'LOCATION_HISTORY':
+        users = users.filter(db.session.query(ShipmentItem.id).filter(
+            ShipmentItem.partner_id == User.id,
+            or_(ShipmentItem.pickup_country.in_(values), ShipmentItem.dest_country.in_(values))
+        ).exists())
+    return users
+
+def _has_unread_recipients(broadcast):
+    read = db.session.query(BroadcastReceipt.user_id).filter(
+        BroadcastReceipt.broadcast_id == broadcast.id,
+        BroadcastReceipt.user_id == User.id
+    ).exists()
+    return db.session.query(_broadcast_recipients(broadcast).filter(~read).exists()).scalar()
+
+def purge_read_notifications(older_than_days, archive=False, batch_size=1000):
+    """
+    Remove read notifications older than the cutoff in bounded batches,
+    optionally copying them to the archive tables first. A broadcast past
+    the cutoff is removed with its targets and receipts only once every
+    recipient has read it. Returns rows removed.
+    """
+    from app.models.notification import NotificationArchive, BroadcastArchive
+    cutoff = datetime.utcnow() - timedelta(days=older_than_days)
+    removed = 0
+
+    while True:
+        ids = [row.id for row in db.session.query(Notification.id).filter(
+            Notification.is_read == True,
+            Notification.created_at < cutoff
+        ).limit(batch_size)]
+        if not ids:
+            break
+
+        if archive:
+            columns = ['id', 'user_id', 'title', 'message', 'type', 'link', 'is_read', 'created_at']
+            db.session.execute(
+                NotificationArchive.__table__.insert().from_select(
+                    columns,
+                    db.select(*[Notification.__table__.c[c] for c in columns]).where(Notification.id.in_(ids))
+                )
+            )
+        Notification.query.filter(Notification.id.in_(ids)).delete(synchronize_session=False)
+        db.session.commit()
+        removed += len(ids)
+
+    # Broadcasts someone still hasn't read are kept, so walk past them by keyset
+    cursor = None
+    while True:
+        query = BroadcastNotification.query.filter(BroadcastNotification.created_at < cutoff)
+        if cursor:
+            query = query.filter(after_cursor(BroadcastNotification.created_at, BroadcastNotification.id, cursor))
+        broadcasts = query.order_by(BroadcastNotification.created_at, BroadcastNotification.id).limit(batch_size).all()
+        if not broadcasts:
+            break
+        cursor = (broadcasts[-1].created_at, broadcasts[-1].id)
+
+        done = [b for b in broadcasts if not _has_unread_recipients(b)]
+        ids = [b.id for b in done]
+        if archive:
+            for broadcast in done:
+                db.session.add(BroadcastArchive(
+                    id=broadcast.id,
+                    title=broadcast.title,
+                    message=broadcast.message,
+                    type=broadcast.type,
+                    link=broadcast.link,
+                    target_type=broadcast.target_type,
+                    target_values=[t.value for t in broadcast.targets],
+                    read_count=BroadcastReceipt.query.filter_by(broadcast_id=broadcast.id).count(),
+                    created_by=broadcast.created_by,
+                    created_at=broadcast.created_at
+                ))
+        for broadcast in broadcasts:
+            db.session.expunge(broadcast)
+        if ids:
+            BroadcastReceipt.query.filter(BroadcastReceipt.broadcast_id.in_(ids)).delete(synchronize_session=False)
+            BroadcastTarget.query.filter(BroadcastTarget.broadcast_id.in_(ids)).delete(synchronize_session=False)
+            BroadcastNotification.query.filter(BroadcastNotification.id.in_(ids)).delete(synchronize_session=False)
+            removed += len(ids)
+        db.session.commit()
+        _latest_broadcast_cache.clear()
+
+    return removed
@@ -1,4 +1,4 @@
-from app.models.subscription import SubscriptionPlan, SubscriptionTransaction
+from app.models.subscription import SubscriptionPlan, SubscriptionTransaction, UserEntitlement
 from app.extensions import db
 from datetime import datetime, timedelta
 import requests
@@ -21,6 +21,9 @@ def update_plan(plan_id, data):
     for key, value in data.items():
         if hasattr(plan, key):
             setattr(plan, key, value)
+    UserEntitlement.query.filter_by(plan_id=plan.id).update(
+        {'is_premium': bool(plan.is_premium)}, synchronize_session='fetch'
+    )
     db.session.commit()
     return plan
 
@@ -32,6 +35,69 @@ def delete_plan(plan_id):
     db.session.commit()
     return True
 
+# Entitlements
+def get_entitlement(user_id):
+    """The user's entitlement row; repeat reads in a request come from the session identity map"""
+    return db.session.get(UserEntitlement, user_id)
+
+def grant_entitlement(transaction, plan):
+    """Point the user's entitlement at a freshly activated transaction"""
+    if transaction.id is None:
+        db.session.flush()
+    entitlement = get_entitlement(transaction.user_id)
+    if not entitlement:
+        entitlement = UserEntitlement(user_id=transaction.user_id)
+        db.session.add(entitlement)
+    entitlement.transaction_id = transaction.id
+    entitlement.plan_id = transaction.plan_id
+    entitlement.is_premium = bool(plan and plan.is_premium)
+    entitlement.end_date = transaction.end_date
+    entitlement.remaining_usage = transaction.remaining_usage or 0
+    return entitlement
+
+def revoke_entitlement(transaction):
+    """Clear the user's entitlement if it still belongs to `transaction`"""
+    entitlement = get_entitlement(transaction.user_id)
+    if entitlement and entitlement.transaction_id == transaction.id:
+        entitlement.transaction_id = None
+        entitlement.plan_id = None
+        entitlement.is_premium = False
+        entitlement.end_date = None
+        entitlement.remaining_usage = 0
+    return entitlement
+
+def expire_subscription(transaction):
+    transaction.is_active = False
+    transaction.remaining_usage = 0 # Protocol reset: clear all remaining delivery slots
+    revoke_entitlement(transaction)
+
+def consume_quota(user_id):
+    """
+    Spend one unit of the user's subscription quota. Returns False when the
+    user has no active subscription with usage left. The decrement is a
+    conditional UPDATE, so concurrent requests cannot both spend the last
+    unit. Nothing is committed.
+    """
+    entitlement = get_entitlement(user_id)
+    if not entitlement or not entitlement.has_quota():
+        return False
+    table = UserEntitlement.__table__
+    result = db.session.execute(
+        table.update().where(
+            table.c.user_id == user_id,
+            table.c.transaction_id == entitlement.transaction_id,
+            table.c.remaining_usage > 0
+        ).values(remaining_usage=table.c.remaining_usage - 1, updated_at=datetime.utcnow())
+    )
+    db.session.expire(entitlement, ['remaining_usage', 'updated_at'])
+    if not result.rowcount:
+        return False
+    transaction = db.session.get(SubscriptionTransaction, entitlement.transaction_id)
+    if transaction:
+        # The transaction keeps its own count for billing history
+        transaction.remaining_usage = SubscriptionTransaction.remaining_usage - 1
+    return True
+
 # Transactions
 def get_all_transactions(page=1, per_page=20, status=None, payment_method=None, search=None):
     query = SubscriptionTransaction.query
@@ -64,6 +130,7 @@ def _activate_subscription(transaction):
     old_subs = SubscriptionTransaction.query.filter_by(user_id=user_id, is_active=True).all()
     for old in old_subs:
         old.is_active = False
+        revoke_entitlement(old)
 
     # Fetch Plan logic to get Limit
     plan = SubscriptionPlan.query.get(plan_id)
@@ -72,6 +139,7 @@ def _activate_subscription(transaction):
         transaction.is_active = True
         duration = getattr(plan, 'duration_days', 30) or 30
         transaction.end_date = datetime.utcnow() + timedelta(days=duration)
+        grant_entitlement(transaction, plan)
     
     # Update User
     from app.models.user import User
@@ -138,9 +206,12 @@ def update_transaction_status(transaction_id, status):
     elif status == 'REJECTED':
         transaction.status = 'REJECTED'
         transaction.is_active = False
+        revoke_entitlement(transaction)
         db.session.commit()
     else:
         transaction.status = status
+        if status != 'COMPLETED':
+            revoke_entitlement(transaction)
         db.session.commit()
         
     return transaction
@@ -0,0 +1,53 @@
+from app.models.user import User
+from app.models.shipment import ShipmentItem, ShipmentRequest
+from app.models.message import MessageThread
+from app.models.sync import current_change_seq
+from app.services import notification_service
+from sqlalchemy import or_
+from sqlalchemy.orm import joinedload
+
+def _changed(query, column, since):
+    return query.filter(column > since) if since else query
+
+def get_changes(user_id, since=0, notification_limit=50):
+    """
+    Everything the user's client caches that changed after change sequence
+    `since` (0 = full snapshot). Returns None for an unknown user. The token
+    is read before the rows, so a write racing this call is returned again
+    next time rather than skipped; clients apply records as upserts.
+    """
+    user = User.query.get(user_id)
+    if not user:
+        return None
+
+    token = current_change_seq()
+    full = not since or since > token # A token from another database (reset/restore) forces a full sync
+    if full:
+        since = 0
+
+    shipments = _changed(ShipmentItem.query.filter(
+        or_(ShipmentItem.sender_id == user_id, ShipmentItem.partner_id == user_id)
+    ), ShipmentItem.change_seq, since).all()
+
+    requests = _changed(ShipmentRequest.query.options(joinedload(ShipmentRequest.shipment)).filter(
+        ShipmentRequest.picker_id == user_id
+    ), ShipmentRequest.change_seq, since).all()
+
+    threads = _changed(MessageThread.query.options(
+        joinedload(MessageThread.participant1),
+        joinedload(MessageThread.participant2),
+        joinedload(MessageThread.shipment)
+    ).filter(
+        or_(MessageThread.participant1_id == user_id, MessageThread.participant2_id == user_id)
+    ), MessageThread.change_seq, since).order_by(MessageThread.updated_at.desc()).all()
+
+    return {
+        'token': token,
+        'full': full,
+        'profile': user if full or (user.change_seq or 0) > since else None,
+        'shipments': shipments,
+        'requests': requests,
+        'threads': threads,
+        'notifications': notification_service.get_changed_notifications(user, since, limit=notification_limit),
+        'unread_count': notification_service.get_unread_count(user_id)
+    }
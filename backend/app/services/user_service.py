@@ -3,9 +3,11 @@ from datetime import datetime, timedelta
 from app.models.user import User
 from app.extensions import db
 from flask_jwt_extended import create_access_token
+from app.auth import token_claims
 from flask import current_app
+from sqlalchemy.exc import IntegrityError
 
-def assign_default_subscription(user):
+def assign_default_subscription(user, commit=True):
     """Assigns the default 6-month free promotion plan to a new user."""
     from app.models.setting import GlobalSetting
     from app.constants import (
@@ -29,7 +31,7 @@ def assign_default_subscription(user):
     
     # Try to get plan ID from settings first
     setting_key = SETTING_FREE_PROMO_PICKER_PLAN_ID if is_picker else SETTING_FREE_PROMO_SENDER_PLAN_ID
-    promo_plan_id = GlobalSetting.get_value(setting_key)
+    promo_plan_id = GlobalSetting.get_value(setting_key, default='')
     
     # If no specific ID found in settings, return without subscription (per user request)
     if not promo_plan_id:
@@ -57,7 +59,8 @@ def assign_default_subscription(user):
         )
         user.current_plan_id = promo_plan.id
         db.session.add(sub)
-        db.session.commit()
+        from app.services.subscription_service import grant_entitlement
+        grant_entitlement(sub, promo_plan)
 
         # Notify User of Free Plan
         from app.models.notification import create_notification
@@ -71,7 +74,8 @@ def assign_default_subscription(user):
             title="Welcome Gift Unlocked!",
             message=f"Welcome to GlobalPath! You have been automatically upgraded to the '{promo_plan.name}'. Enjoy {promo_plan.limit} free {action_type}/month for the next {days_total} days.",
             type='SUCCESS',
-            link='/packaging'
+            link='/packaging',
+            commit=commit
         )
         print(f"Successfully assigned '{promo_plan.name}' to {user.email}")
         return True
@@ -97,12 +101,9 @@ def get_all_users(page=1, per_page=10, role=None, status=None, search=None):
             pass
             
     if search:
-        search_filter = f"%{search}%"
-        query = query.filter(
-            (User.first_name.ilike(search_filter)) |
-            (User.last_name.ilike(search_filter)) |
-            (User.email.ilike(search_filter))
-        )
+        search_filter = _user_search_filter(search)
+        if search_filter is not None:
+            query = query.filter(search_filter)
     
     # Order by newest first
     query = query.order_by(User.created_at.desc())
@@ -113,7 +114,52 @@ def get_user(user_id):
     return User.query.get(user_id)
 
 def get_user_by_email(email):
-    return User.query.filter_by(email=email).first()
+    normalized = User.normalize_email(email)
+    if not normalized:
+        return None
+    user = User.query.filter_by(email_lower=normalized).first()
+    if user is None:
+        # Accounts migrate.py could not normalize (case-only duplicates) keep email_lower NULL
+        user = User.query.filter(User.email_lower.is_(None), User.email == email).first()
+    return user
+
+def _like_escape(term):
+    return term.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+
+def _short_term_filter(term):
+    search_filter = f"%{_like_escape(term)}%"
+    return (User.first_name.ilike(search_filter, escape='\\')) | (User.last_name.ilike(search_filter, escape='\\')) | \
+        (User.email.ilike(search_filter, escape='\\'))
+
+def _user_search_filter(search):
+    """
+    Predicate for the admin directory search, served from the user search
+    index (see app.models.user). Trigrams need three characters, so shorter
+    terms fall back to ILIKE; alongside a longer term they only filter the
+    rows the index already matched.
+    """
+    from app.models.user import SEARCH_EXPRESSION
+    terms = search.lower().split()
+    if not terms:
+        return None
+    long_terms = [t for t in terms if len(t) >= 3]
+    short_filters = [_short_term_filter(t) for t in terms if len(t) < 3]
+    dialect = db.engine.dialect.name
+
+    if dialect not in ('sqlite', 'postgresql'):
+        search_filter = f"%{search}%"
+        return (User.first_name.ilike(search_filter)) | (User.last_name.ilike(search_filter)) | (User.email.ilike(search_filter))
+    if not long_terms:
+        return db.and_(*short_filters)
+    if dialect == 'sqlite':
+        match = ' AND '.join('"' + t.replace('"', '""') + '"' for t in long_terms)
+        matches = db.text("SELECT user_id FROM users_fts WHERE users_fts MATCH :match")\
+            .bindparams(match=f"{{name email}} : ({match})").columns(db.column('user_id'))
+        return db.and_(User.id.in_(matches), *short_filters)
+    return db.and_(*[
+        db.text(f"{SEARCH_EXPRESSION} LIKE :term_{i} ESCAPE '\\'").bindparams(**{f'term_{i}': f'%{_like_escape(t)}%'})
+        for i, t in enumerate(long_terms)
+    ], *short_filters)
 
 def create_user(data):
     if get_user_by_email(data.get('email')):
@@ -147,26 +193,41 @@ def create_user(data):
         user.set_password(data['password'])
     
     db.session.add(user)
-    db.session.commit() # Commit first to get user.id
+    try:
+        # A concurrent signup for the same email fails the unique index here at the flush
+        db.session.flush() # Assigns user.id; everything below commits together
+        _welcome_new_user(user, "New Account Protocol Initialization")
+        if user.email_otp:
+            # Outbox row commits with the account: no code for a signup that rolled back
+            from app.services.email_service import send_otp_email
+            send_otp_email(user.email, user.email_otp)
+        db.session.commit()
+    except IntegrityError:
+        db.session.rollback() # Lost a race with a concurrent signup for the same email
+        return None
 
-    # Auto-subscribe to default promo plan
-    assign_default_subscription(user)
+    return user
 
-    # Award Registration Bonus
+def _welcome_new_user(user, bonus_reason):
+    """Promo plan, welcome notifications and registration bonus, inside the caller's transaction"""
+    from app.models.setting import GlobalSetting
     from app.constants import SETTING_REGISTRATION_BONUS
-    reg_bonus = int(GlobalSetting.get_value(SETTING_REGISTRATION_BONUS, default=10))
-    reward_user_coins(user.id, reg_bonus, "New Account Protocol Initialization")
-
-    return user
+    assign_default_subscription(user, commit=False)
+    reg_bonus = GlobalSetting.get_value(SETTING_REGISTRATION_BONUS, default=10)
+    reward_user_coins(user.id, reg_bonus, bonus_reason, commit=False)
 
   
 def authenticate_user(email, password):
-    user = User.query.filter_by(email=email).first()
+    user = get_user_by_email(email)
     if user and user.check_password(password):
+        if user.password_needs_rehash():
+            # Work factor changed since this hash was made; upgrade it while we have the plaintext
+            user.set_password(password)
+            db.session.commit()
         if not user.is_email_verified:
            pass
             # return {"unverified": True, "message": "Email not verified. Please check your inbox."}
-        access_token = create_access_token(identity=user.id)
+        access_token = create_access_token(identity=user.id, additional_claims=token_claims(user))
         return {"token": access_token, "user": user}
     return None
 
@@ -195,25 +256,33 @@ def update_user(user_id, data):
             else:
                 setattr(user, key, value)
         db.session.commit()
+        from app.services.message_service import sender_name_cache
+        sender_name_cache.invalidate(user_id)
     return user
 
-def reward_user_coins(user_id, amount, reason="Activity Reward"):
+def reward_user_coins(user_id, amount, reason="Activity Reward", commit=True):
     """Awards technical credits (coins) to a user for specific achievements."""
     user = User.query.get(user_id)
     if not user or amount <= 0:
         return False
         
     user.coins_balance += int(amount)
-    db.session.commit()
     
-    # Notify User
-    from app.models.notification import create_notification
-    create_notification(
+    # Notify User (bursts of rewards fold into one unread notification)
+    from app.models.notification import create_grouped_notification
+    create_grouped_notification(
         user_id=user_id,
+        group_key='credits',
         title="Protocol Credits Received",
         message=f"You have been awarded {amount} technical credits for: {reason}. Use them to unlock premium tiers.",
         type='SUCCESS',
-        link='/packaging'
+        link='/packaging',
+        amount=int(amount),
+        summarize=lambda count, total: (
+            "Protocol Credits Received",
+            f"+{total} technical credits from {count} rewards. Latest: {reason}. Use them to unlock premium tiers."
+        ),
+        commit=commit
     )
     print(f"Awarded {amount} coins to user {user_id} for {reason}")
     return True
@@ -229,18 +298,18 @@ def initiate_password_reset(email):
     import secrets
     from datetime import datetime, timedelta
     
-    user = User.query.filter_by(email=email).first()
+    user = get_user_by_email(email)
     if not user:
         return False
     
     token = secrets.token_urlsafe(32)
     user.reset_token = token
     user.reset_token_expiry = datetime.utcnow() + timedelta(hours=1)
-    db.session.commit()
     
-    # Send Actual Email
+    # Queued with the token it carries
     from app.services.email_service import send_password_reset_email
     send_password_reset_email(email, token)
+    db.session.commit()
     
     return True
 
@@ -260,7 +329,7 @@ def complete_password_reset(token, new_password):
 def verify_email_otp(email, otp):
     from datetime import datetime
     from app.models.enums import VerificationStatus
-    user = User.query.filter_by(email=email).first()
+    user = get_user_by_email(email)
     
     if not user or not user.email_otp or not user.email_otp_expiry:
         return False, "User or OTP not found"
@@ -280,17 +349,13 @@ def verify_email_otp(email, otp):
     return True, "Email verified successfully"
 
 def google_login(token, role=None):
-    from google.oauth2 import id_token
-    from google.auth.transport import requests
+    from app.google_tokens import google_verifier
     from flask import current_app
     from app.models.enums import UserRole, VerificationStatus
 
     try:
-        # Verify Google Token
-        idinfo = id_token.verify_oauth2_token(token, requests.Request(), current_app.config['GOOGLE_CLIENT_ID'])
-
-        if idinfo['iss'] not in ['accounts.google.com', 'https://accounts.google.com']:
-            raise ValueError('Wrong issuer.')
+        # Verify Google Token locally against the cached signing keys (issuer checked too)
+        idinfo = google_verifier.verify(token, current_app.config['GOOGLE_CLIENT_ID'])
 
         google_id = idinfo['sub']
         email = idinfo['email']
@@ -298,7 +363,7 @@ def google_login(token, role=None):
         last_name = idinfo.get('family_name', '')
         avatar = idinfo.get('picture', '')
 
-        user = User.query.filter_by(email=email).first()
+        user = get_user_by_email(email)
 
         if not user:
             # If it's a new user but no role was provided, tell the frontend to ask for a role
@@ -317,16 +382,9 @@ def google_login(token, role=None):
                 verification_status=VerificationStatus.VERIFIED
             )
             db.session.add(user)
+            db.session.flush()
+            _welcome_new_user(user, "Google Protocol Authentication Bonus")
             db.session.commit()
-            
-            # Auto-subscribe new Google user to default promo plan
-            assign_default_subscription(user)
-
-            # Award Registration Bonus for new Google User
-            from app.models.setting import GlobalSetting
-            from app.constants import SETTING_REGISTRATION_BONUS
-            reg_bonus = int(GlobalSetting.get_value(SETTING_REGISTRATION_BONUS, default=10))
-            reward_user_coins(user.id, reg_bonus, "Google Protocol Authentication Bonus")
         elif not user.google_id:
             # Link Google ID to existing account
             user.google_id = google_id
@@ -335,7 +393,7 @@ def google_login(token, role=None):
             user.is_email_verified = True
             db.session.commit()
 
-        access_token = create_access_token(identity=user.id)
+        access_token = create_access_token(identity=user.id, additional_claims=token_claims(user))
         return {"token": access_token, "user": user}
 
     except Exception as e:
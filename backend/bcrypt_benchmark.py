@@ -0,0 +1,92 @@
+import argparse
+import os
+import statistics
+import sys
+import tempfile
+import threading
+import time
+
+# Login throughput against bcrypt cost. Drives POST /api/v1/users/login
+# in-process through the Flask test client on a throwaway SQLite database,
+# from `--clients` concurrent threads, once per work factor. Rejections are
+# logins the bounded hashing pool turned away with 503.
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="bcrypt login throughput benchmark")
+    parser.add_argument("--rounds", default="10,11,12,13", help="Comma-separated bcrypt work factors")
+    parser.add_argument("--logins", type=int, default=100, help="Logins per work factor")
+    parser.add_argument("--clients", type=int, default=16, help="Concurrent login threads")
+    parser.add_argument("--workers", type=int, help="Hashing pool size (default: PASSWORD_HASH_WORKERS)")
+    parser.add_argument("--queue", type=int, help="Hashing queue limit (default: PASSWORD_HASH_QUEUE_SIZE)")
+    return parser.parse_args()
+
+def main():
+    args = parse_args()
+    db_file = tempfile.NamedTemporaryFile(suffix='.db', delete=False)
+    db_file.close()
+    os.environ['DATABASE_URL'] = f"sqlite:///{db_file.name}"
+
+    from app import create_app
+    from app.extensions import db
+    from app.models.user import User
+    from app.passwords import password_hasher
+
+    app = create_app()
+    overrides = {'workers': args.workers or password_hasher.workers, 'max_pending': args.queue or password_hasher.max_pending}
+    client = app.test_client()
+    email, password = 'bench@globalpath.com', 'bench-password'
+
+    print(f"workers={overrides['workers']} queue={overrides['max_pending']} clients={args.clients} logins={args.logins}")
+    print(f"{'cost':>4} {'hash ms':>8} {'logins/s':>9} {'p50 ms':>8} {'p95 ms':>8} {'503s':>5}")
+    try:
+        for rounds in [int(r) for r in args.rounds.split(',')]:
+            password_hasher.configure(rounds=rounds, timeout=password_hasher.timeout, **overrides)
+            with app.app_context():
+                user = User.query.filter_by(email=email).first()
+                if not user:
+                    user = User(first_name='Bench', last_name='User', email=email, is_email_verified=True)
+                    db.session.add(user)
+                started = time.perf_counter()
+                user.set_password(password)
+                hash_ms = (time.perf_counter() - started) * 1000
+                db.session.commit()
+
+            latencies, rejected = [], [0]
+            lock = threading.Lock()
+            remaining = [args.logins]
+
+            def worker():
+                while True:
+                    with lock:
+                        if remaining[0] <= 0:
+                            return
+                        remaining[0] -= 1
+                    started = time.perf_counter()
+                    resp = client.post('/api/v1/users/login', json={'email': email, 'password': password})
+                    elapsed = time.perf_counter() - started
+                    with lock:
+                        if resp.status_code == 503:
+                            rejected[0] += 1
+                        elif resp.status_code == 200:
+                            latencies.append(elapsed)
+                        else:
+                            print(f"Unexpected status {resp.status_code}: {resp.get_data(as_text=True)}")
+
+            threads = [threading.Thread(target=worker) for _ in range(args.clients)]
+            started = time.perf_counter()
+            for t in threads:
+                t.start()
+            for t in threads:
+                t.join()
+            wall = time.perf_counter() - started
+
+            latencies.sort()
+            p50 = statistics.median(latencies) * 1000 if latencies else 0
+            p95 = latencies[int(len(latencies) * 0.95) - 1] * 1000 if latencies else 0
+            print(f"{rounds:>4} {hash_ms:>8.1f} {len(latencies) / wall:>9.1f} {p50:>8.1f} {p95:>8.1f} {rejected[0]:>5}")
+    finally:
+        os.remove(db_file.name)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,42 @@
+import argparse
+import os
+import sys
+import time
+from datetime import datetime
+
+# Standalone email outbox worker. Delivers queued mail in batches over one
+# SMTP connection each, for deployments that run web workers with
+# EMAIL_OUTBOX_WORKER=false. Claims are leased per row, so several copies
+# can run at once.
+
+def main():
+    parser = argparse.ArgumentParser(description="GlobalPath email outbox worker")
+    parser.add_argument("--once", action="store_true", help="Drain due mail once and exit")
+    parser.add_argument("--poll", type=float, help="Seconds between polls (default: EMAIL_OUTBOX_POLL_SECONDS)")
+    args = parser.parse_args()
+
+    os.environ['EMAIL_OUTBOX_WORKER'] = 'false' # This process is the worker; no extra thread
+    from app import create_app
+    from app.services.email_service import deliver_outbox
+
+    app = create_app()
+    poll = args.poll or app.config.get('EMAIL_OUTBOX_POLL_SECONDS', 30)
+    print(f"--- GlobalPath Email Outbox Worker Initialized (poll {poll}s) ---")
+
+    while True:
+        with app.app_context():
+            while True:
+                sent, failed = deliver_outbox()
+                if not sent and not failed:
+                    break
+                print(f"[{datetime.now()}] Delivered {sent}, failed {failed}")
+        if args.once:
+            return 0
+        time.sleep(poll)
+
+if __name__ == "__main__":
+    try:
+        sys.exit(main())
+    except KeyboardInterrupt:
+        print("\n--- Email Outbox Worker Terminated by User ---")
+        sys.exit(0)
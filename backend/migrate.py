@@ -0,0 +1,261 @@
+from app import create_app
+from app.extensions import db
+from sqlalchemy import inspect
+
+app = create_app()
+
+# db.create_all() only creates missing tables. These steps bring an existing
+# database up to date with additive changes (new columns, indexes, backfills)
+# without dropping data the way seed.py does. Every step is idempotent.
+
+def add_missing_columns():
+    """ALTER TABLE ... ADD COLUMN for model columns the database lacks"""
+    inspector = inspect(db.engine)
+    for table in db.metadata.sorted_tables:
+        if not inspector.has_table(table.name):
+            continue
+        existing = {c['name'] for c in inspector.get_columns(table.name)}
+        for column in table.columns:
+            if column.name in existing:
+                continue
+            column_type = column.type.compile(dialect=db.engine.dialect)
+            print(f"Adding column {table.name}.{column.name} ({column_type})")
+            with db.engine.begin() as conn:
+                conn.exec_driver_sql(f'ALTER TABLE {table.name} ADD COLUMN {column.name} {column_type}')
+
+def create_missing_indexes():
+    """Create every index declared on the models that does not exist yet"""
+    inspector = inspect(db.engine)
+    for table in db.metadata.sorted_tables:
+        existing = {i['name'] for i in inspector.get_indexes(table.name)}
+        for index in table.indexes:
+            if index.name not in existing:
+                print(f"Creating index {index.name} on {table.name}")
+                index.create(db.engine)
+
+def backfill_thread_keys(batch_size=500):
+    """Populate MessageThread participant_low/high and context_key"""
+    from app.models.message import MessageThread
+    filled = 0
+    while True:
+        threads = MessageThread.query.filter(MessageThread.participant_low.is_(None)).limit(batch_size).all()
+        if not threads:
+            break
+        for thread in threads:
+            thread.participant_low, thread.participant_high, thread.context_key = \
+                MessageThread.thread_key(thread.participant1_id, thread.participant2_id, thread.shipment_id)
+        db.session.commit()
+        filled += len(threads)
+    print(f"Backfilled {filled} thread keys")
+
+def backfill_email_lower(batch_size=1000):
+    """
+    Fill users.email_lower before its unique index is built. When emails
+    differ only by case, the oldest account keeps the normalized value and
+    the others are reported for manual cleanup (NULLs never conflict).
+    """
+    from app.models.user import User
+    from app.pagination import after_cursor
+    claimed = {e for (e,) in db.session.query(User.email_lower).filter(User.email_lower.isnot(None))}
+    filled, conflicts, cursor = 0, [], None
+    while True:
+        query = User.query.filter(User.email_lower.is_(None))
+        if cursor:
+            query = query.filter(after_cursor(User.created_at, User.id, cursor))
+        users = query.order_by(User.created_at.asc(), User.id.asc()).limit(batch_size).all()
+        if not users:
+            break
+        cursor = (users[-1].created_at, users[-1].id)
+        for user in users:
+            normalized = User.normalize_email(user.email)
+            if normalized in claimed:
+                conflicts.append((user.id, user.email))
+                continue
+            claimed.add(normalized)
+            user.email_lower = normalized
+            filled += 1
+        db.session.commit()
+    print(f"Backfilled {filled} normalized emails")
+    for user_id, email in conflicts:
+        print(f"WARNING: {email} (user {user_id}) differs only by case from another account; email_lower left empty")
+
+def merge_duplicate_threads():
+    """
+    Fold threads sharing a canonical key into the oldest one before the
+    unique index is created: messages move over, per-user unread counts
+    add up, and the last-message summary is recomputed.
+    """
+    from app.models.message import Message, MessageThread
+    keys = db.session.query(
+        MessageThread.participant_low, MessageThread.participant_high, MessageThread.context_key
+    ).group_by(
+        MessageThread.participant_low, MessageThread.participant_high, MessageThread.context_key
+    ).having(db.func.count(MessageThread.id) > 1).all()
+
+    merged = 0
+    for low, high, context_key in keys:
+        threads = MessageThread.query.filter_by(
+            participant_low=low, participant_high=high, context_key=context_key
+        ).order_by(MessageThread.created_at.asc(), MessageThread.id.asc()).all()
+        keeper, duplicates = threads[0], threads[1:]
+
+        unread = {keeper.participant1_id: 0, keeper.participant2_id: 0}
+        for thread in threads:
+            unread[thread.participant1_id] += thread.participant1_unread or 0
+            unread[thread.participant2_id] += thread.participant2_unread or 0
+
+        duplicate_ids = [t.id for t in duplicates]
+        Message.query.filter(Message.thread_id.in_(duplicate_ids))\
+            .update({'thread_id': keeper.id}, synchronize_session=False)
+        for thread in duplicates:
+            db.session.expunge(thread)
+        MessageThread.query.filter(MessageThread.id.in_(duplicate_ids)).delete(synchronize_session=False)
+
+        keeper.participant1_unread = unread[keeper.participant1_id]
+        keeper.participant2_unread = unread[keeper.participant2_id]
+        latest = Message.query.filter_by(thread_id=keeper.id)\
+            .order_by(Message.timestamp.desc(), Message.id.desc()).first()
+        if latest:
+            keeper.set_last_message(latest)
+        db.session.commit()
+        merged += len(duplicates)
+    print(f"Merged {merged} duplicate threads into {len(keys)} threads")
+
+def backfill_thread_summaries(batch_size=500):
+    """Populate MessageThread.last_message_* from each thread's newest message"""
+    from app.models.message import Message, MessageThread
+    filled = 0
+    while True:
+        threads = MessageThread.query.filter(
+            MessageThread.last_message_id.is_(None),
+            MessageThread.messages.any()
+        ).limit(batch_size).all()
+        if not threads:
+            break
+        for thread in threads:
+            latest = Message.query.filter_by(thread_id=thread.id)\
+                .order_by(Message.timestamp.desc(), Message.id.desc()).first()
+            thread.set_last_message(latest)
+        db.session.commit()
+        filled += len(threads)
+    print(f"Backfilled {filled} thread summaries")
+
+def initialize_thread_unread_counters():
+    """
+    Start per-thread unread counters at zero. Message.is_read was never
+    maintained before counters existed, so legacy messages are marked read
+    rather than surfacing every historical message as unread.
+    """
+    from app.models.message import Message, MessageThread
+    pending = MessageThread.query.filter(
+        (MessageThread.participant1_unread.is_(None)) | (MessageThread.participant2_unread.is_(None))
+    )
+    thread_ids = [t.id for t in pending.with_entities(MessageThread.id)]
+    for start in range(0, len(thread_ids), 500):
+        batch = thread_ids[start:start + 500]
+        Message.query.filter(Message.thread_id.in_(batch), Message.is_read == False)\
+            .update({'is_read': True}, synchronize_session=False)
+        MessageThread.query.filter(MessageThread.id.in_(batch))\
+            .update({'participant1_unread': 0, 'participant2_unread': 0}, synchronize_session=False)
+        db.session.commit()
+    print(f"Initialized unread counters on {len(thread_ids)} threads")
+
+def create_message_search_index():
+    """
+    Full-text index for message search, indexing messages that predate it
+    and replacing the older message_id-keyed FTS table
+    """
+    from app.models.message import create_search_index
+    with db.engine.begin() as conn:
+        create_search_index(conn, backfill=True)
+
+def create_user_search_index():
+    """Search index for the admin user directory, indexing existing users"""
+    from app.models.user import create_search_index
+    with db.engine.begin() as conn:
+        create_search_index(conn, backfill=True)
+
+def advance_change_sequence():
+    """
+    On PostgreSQL, move the change_seq sequence past the value the
+    sync_sequences counter reached before the sequence replaced it, so new
+    stamps sort after every existing one
+    """
+    if db.engine.dialect.name != 'postgresql':
+        return
+    from app.models.sync import CHANGES, SyncSequence
+    with db.engine.begin() as conn:
+        conn.exec_driver_sql("CREATE SEQUENCE IF NOT EXISTS change_seq")
+        counter = conn.execute(
+            db.select(SyncSequence.value).where(SyncSequence.name == CHANGES)
+        ).scalar() or 0
+        issued = conn.exec_driver_sql(
+            "SELECT CASE WHEN is_called THEN last_value ELSE 0 END FROM change_seq"
+        ).scalar()
+        if counter > issued:
+            conn.exec_driver_sql("SELECT setval('change_seq', %(value)s)", {'value': counter})
+        value = max(counter, issued)
+    print(f"Change sequence at {value}")
+
+def backfill_change_sequence():
+    """Stamp rows that predate delta sync so they show up in the first full sync"""
+    from app.models.sync import next_change_seq
+    seq = None
+    for table in db.metadata.sorted_tables:
+        if 'change_seq' not in table.c:
+            continue
+        pending = db.session.execute(
+            db.select(db.func.count()).select_from(table).where(table.c.change_seq.is_(None))
+        ).scalar()
+        if pending:
+            seq = seq or next_change_seq()
+            db.session.execute(table.update().where(table.c.change_seq.is_(None)).values(change_seq=seq))
+            print(f"Stamped {pending} rows in {table.name}")
+    db.session.commit()
+
+def backfill_entitlements(batch_size=500):
+    """Create user_entitlements rows from each user's newest active subscription"""
+    from app.models.subscription import SubscriptionPlan, SubscriptionTransaction, UserEntitlement
+    from app.services.subscription_service import grant_entitlement
+    done = {user_id for (user_id,) in db.session.query(UserEntitlement.user_id)}
+    active = SubscriptionTransaction.query.filter(
+        SubscriptionTransaction.is_active == True,
+        SubscriptionTransaction.status == 'COMPLETED'
+    ).order_by(SubscriptionTransaction.user_id, SubscriptionTransaction.timestamp.desc())
+    filled = 0
+    for transaction in active:
+        if transaction.user_id in done:
+            continue
+        done.add(transaction.user_id)
+        grant_entitlement(transaction, SubscriptionPlan.query.get(transaction.plan_id))
+        filled += 1
+        if filled % batch_size == 0:
+            db.session.commit()
+    db.session.commit()
+    print(f"Backfilled {filled} user entitlements")
+
+MIGRATIONS = [
+    add_missing_columns,
+    backfill_thread_keys,
+    backfill_email_lower,
+    initialize_thread_unread_counters,
+    merge_duplicate_threads,
+    create_missing_indexes,
+    backfill_thread_summaries,
+    create_message_search_index,
+    create_user_search_index,
+    advance_change_sequence,
+    backfill_change_sequence,
+    backfill_entitlements,
+]
+
+def migrate():
+    with app.app_context():
+        for step in MIGRATIONS:
+            print(f"Running {step.__name__}...")
+            step()
+        db.session.commit()
+        print("Migration complete!")
+
+if __name__ == "__main__":
+    migrate()
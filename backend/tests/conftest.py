@@ -0,0 +1,33 @@
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import create_app
+from app.config import Config
+from app.extensions import db
+
+@pytest.fixture
+def make_app(tmp_path):
+    """create_app on a fresh SQLite file with config overrides; background workers off"""
+    apps = []
+
+    def factory(**overrides):
+        settings = dict(
+            SQLALCHEMY_DATABASE_URI=f"sqlite:///{tmp_path / 'test.db'}",
+            TESTING=True,
+            RATE_LIMIT_ENABLED=False,
+            EMAIL_OUTBOX_WORKER=False
+        )
+        settings.update(overrides)
+        app = create_app(type('TestConfig', (Config,), settings))
+        apps.append(app)
+        return app
+
+    yield factory
+    for app in apps:
+        with app.app_context():
+            db.session.remove()
+            db.engine.dispose()
@@ -0,0 +1,50 @@
+import time
+
+from app import cache
+from app.cache import TTLCache
+
+class FakeClock:
+    def __init__(self):
+        self.now = 100.0
+
+    def monotonic(self):
+        return self.now
+
+def test_expired_entries_are_purged_on_set(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(cache, 'time', clock)
+    ttl_cache = TTLCache(ttl=5, maxsize=3)
+    for key in 'abc':
+        ttl_cache.set(key, key)
+    clock.now += 6
+    ttl_cache.set('d', 'd')
+    assert list(ttl_cache._data) == ['d']
+
+def test_full_cache_evicts_least_recently_used(monkeypatch):
+    monkeypatch.setattr(cache, 'time', FakeClock())
+    ttl_cache = TTLCache(ttl=5, maxsize=3)
+    for key in 'abc':
+        ttl_cache.set(key, key)
+    assert ttl_cache.get('a') == 'a' # Touch 'a' so 'b' is now the oldest
+    ttl_cache.set('d', 'd')
+    assert ttl_cache.get('b') is None
+    assert [ttl_cache.get(k) for k in 'acd'] == ['a', 'c', 'd']
+
+def test_overwrite_does_not_evict(monkeypatch):
+    monkeypatch.setattr(cache, 'time', FakeClock())
+    ttl_cache = TTLCache(ttl=5, maxsize=2)
+    ttl_cache.set('a', 1)
+    ttl_cache.set('b', 2)
+    ttl_cache.set('a', 3)
+    assert (ttl_cache.get('a'), ttl_cache.get('b')) == (3, 2)
+
+def test_set_on_a_full_cache_stays_constant_time():
+    ttl_cache = TTLCache(ttl=60, maxsize=20000)
+    for i in range(20000):
+        ttl_cache.set(i, i)
+    started = time.perf_counter()
+    for i in range(20000, 30000):
+        ttl_cache.set(i, i)
+    per_set = (time.perf_counter() - started) / 10000
+    assert len(ttl_cache._data) == 20000
+    assert per_set < 100e-6 # A scan of 20k keys per set takes milliseconds
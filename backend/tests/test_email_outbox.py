@@ -0,0 +1,183 @@
+import socket
+from datetime import datetime, timedelta
+
+import pytest
+from aiosmtpd.controller import Controller
+
+from app.extensions import db
+from app.models.email_outbox import OutboundEmail
+from app.services import email_service
+from app.services.email_service import deliver_outbox, send_email
+
+class RecordingHandler:
+    """aiosmtpd handler standing in for the SMTP relay; replies can be scripted per recipient"""
+
+    def __init__(self):
+        self.messages = []
+        self.rcpt_replies = {} # address -> list of replies, consumed one per attempt
+        self.data_replies = []
+
+    async def handle_RCPT(self, server, session, envelope, address, rcpt_options):
+        replies = self.rcpt_replies.get(address)
+        if replies:
+            return replies.pop(0)
+        envelope.rcpt_tos.append(address)
+        return '250 OK'
+
+    async def handle_DATA(self, server, session, envelope):
+        if self.data_replies:
+            return self.data_replies.pop(0)
+        self.messages.append((envelope.rcpt_tos, envelope.content))
+        return '250 Message accepted for delivery'
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+@pytest.fixture
+def smtp():
+    handler = RecordingHandler()
+    controller = Controller(handler, hostname='127.0.0.1', port=free_port())
+    controller.start()
+    yield handler, controller.port
+    controller.stop()
+
+@pytest.fixture
+def app(make_app, smtp):
+    _, port = smtp
+    app = make_app(
+        MAIL_SERVER='127.0.0.1',
+        MAIL_PORT=port,
+        MAIL_USE_TLS=False,
+        MAIL_USE_SSL=False,
+        MAIL_USERNAME=None,
+        MAIL_PASSWORD=None,
+        MAIL_SUPPRESS_SEND=False,
+        MAIL_DEFAULT_SENDER='noreply@globalpath.test',
+        EMAIL_RETRY_BASE_SECONDS=30,
+        EMAIL_RETRY_MAX_SECONDS=3600,
+        EMAIL_MAX_ATTEMPTS=3,
+        EMAIL_OUTBOX_LEASE_SECONDS=300
+    )
+    with app.app_context():
+        yield app
+
+def queue(*recipients):
+    for recipient in recipients:
+        send_email('Subject', [recipient], '<p>Body</p>')
+    db.session.commit()
+
+def make_due(email):
+    email.next_attempt_at = datetime.utcnow() - timedelta(seconds=1)
+    db.session.commit()
+
+def test_send_email_joins_the_callers_transaction(app):
+    send_email('Subject', ['rolled-back@example.com'], 'Body')
+    db.session.rollback()
+    assert OutboundEmail.query.count() == 0
+
+    send_email('Subject', ['kept@example.com'], 'Body')
+    db.session.commit()
+    assert [e.recipients for e in OutboundEmail.query.all()] == [['kept@example.com']]
+
+def test_commit_wakes_the_worker(app, monkeypatch):
+    woken = []
+    monkeypatch.setattr(email_service.outbox_worker, 'wake', lambda: woken.append(True))
+    send_email('Subject', ['a@example.com'], 'Body')
+    assert woken == []
+    db.session.commit()
+    assert woken == [True]
+
+def test_delivers_batch_and_marks_sent(app, smtp):
+    handler, _ = smtp
+    queue('a@example.com', 'b@example.com', 'c@example.com')
+
+    assert deliver_outbox() == (3, 0)
+    assert sorted(rcpt for rcpts, _ in handler.messages for rcpt in rcpts) == ['a@example.com', 'b@example.com', 'c@example.com']
+    for email in OutboundEmail.query.all():
+        assert (email.status, email.attempts, email.claim_token) == ('SENT', 1, None)
+        assert email.sent_at is not None
+    assert deliver_outbox() == (0, 0)
+
+def test_claim_is_leased_and_reclaimed_after_expiry(app):
+    queue('a@example.com')
+
+    claimed = email_service._claim_due(10, lease_seconds=300)
+    assert len(claimed) == 1 and claimed[0].status == 'SENDING'
+    first_token = claimed[0].claim_token
+    assert email_service._claim_due(10, lease_seconds=300) == [] # Another worker sees nothing while the lease holds
+
+    claimed[0].locked_until = datetime.utcnow() - timedelta(seconds=1) # The holder died mid-batch
+    db.session.commit()
+    reclaimed = email_service._claim_due(10, lease_seconds=300)
+    assert len(reclaimed) == 1 and reclaimed[0].claim_token != first_token
+
+def test_transient_failure_backs_off_exponentially(app, smtp):
+    handler, _ = smtp
+    handler.data_replies = ['451 Try again later', '451 Try again later']
+    queue('a@example.com')
+    email = OutboundEmail.query.one()
+
+    before = datetime.utcnow()
+    assert deliver_outbox() == (0, 1)
+    db.session.refresh(email)
+    assert (email.status, email.attempts) == ('PENDING', 1)
+    assert 'SMTPDataError' in email.last_error
+    assert timedelta(seconds=29) <= email.next_attempt_at - before <= timedelta(seconds=32)
+    assert deliver_outbox() == (0, 0) # Not due yet
+
+    make_due(email)
+    before = datetime.utcnow()
+    assert deliver_outbox() == (0, 1)
+    db.session.refresh(email)
+    assert email.attempts == 2
+    assert timedelta(seconds=59) <= email.next_attempt_at - before <= timedelta(seconds=62)
+
+def test_retry_delivers_after_transient_failure(app, smtp):
+    handler, _ = smtp
+    handler.rcpt_replies['a@example.com'] = ['450 Mailbox busy']
+    queue('a@example.com')
+    email = OutboundEmail.query.one()
+
+    assert deliver_outbox() == (0, 1)
+    db.session.refresh(email)
+    assert email.status == 'PENDING' # A 4xx refusal is retried, not dead-lettered
+
+    make_due(email)
+    assert deliver_outbox() == (1, 0)
+    db.session.refresh(email)
+    assert (email.status, email.attempts, email.last_error) == ('SENT', 2, None)
+    assert len(handler.messages) == 1
+
+def test_permanent_rejection_is_dead_lettered(app, smtp):
+    handler, _ = smtp
+    handler.rcpt_replies['nobody@example.com'] = ['550 No such user']
+    queue('nobody@example.com', 'ok@example.com')
+
+    assert deliver_outbox() == (1, 1)
+    failed = OutboundEmail.query.filter_by(status='FAILED').one()
+    assert failed.recipients == ['nobody@example.com'] and failed.attempts == 1
+    assert OutboundEmail.query.filter_by(status='SENT').one().recipients == ['ok@example.com']
+
+def test_gives_up_after_max_attempts(app, smtp):
+    handler, _ = smtp
+    handler.data_replies = ['421 Service not available'] * 3
+    queue('a@example.com')
+    email = OutboundEmail.query.one()
+
+    for attempt in range(3):
+        make_due(email)
+        assert deliver_outbox() == (0, 1)
+        db.session.refresh(email)
+    assert (email.status, email.attempts) == ('FAILED', 3)
+    make_due(email)
+    assert deliver_outbox() == (0, 0) # Dead-lettered rows are never claimed again
+
+def test_unreachable_server_reschedules_the_whole_batch(make_app):
+    app = make_app(MAIL_SERVER='127.0.0.1', MAIL_PORT=1, MAIL_USE_TLS=False, MAIL_USERNAME=None,
+                   MAIL_PASSWORD=None, MAIL_SUPPRESS_SEND=False, MAIL_DEFAULT_SENDER='noreply@globalpath.test')
+    with app.app_context():
+        queue('a@example.com', 'b@example.com')
+        assert deliver_outbox() == (0, 2)
+        assert {(e.status, e.attempts) for e in OutboundEmail.query.all()} == {('PENDING', 1)}
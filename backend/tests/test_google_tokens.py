@@ -0,0 +1,182 @@
+import datetime
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+from cryptography import x509
+from cryptography.hazmat.primitives import hashes, serialization
+from cryptography.hazmat.primitives.asymmetric import rsa
+from cryptography.x509.oid import NameOID
+from google.auth import crypt, jwt as google_jwt
+
+from app import google_tokens
+from app.google_tokens import GoogleTokenVerifier, cache_lifetime
+
+AUDIENCE = 'test-client.apps.googleusercontent.com'
+
+def make_key(kid):
+    """(kid, private key PEM, self-signed certificate PEM), like one entry of Google's certs document"""
+    key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+    name = x509.Name([x509.NameAttribute(NameOID.COMMON_NAME, kid)])
+    now = datetime.datetime.now(datetime.timezone.utc)
+    cert = x509.CertificateBuilder().subject_name(name).issuer_name(name).public_key(key.public_key()) \
+        .serial_number(x509.random_serial_number()).not_valid_before(now - datetime.timedelta(days=1)) \
+        .not_valid_after(now + datetime.timedelta(days=1)).sign(key, hashes.SHA256())
+    private_pem = key.private_bytes(serialization.Encoding.PEM, serialization.PrivateFormat.PKCS8, serialization.NoEncryption())
+    return kid, private_pem, cert.public_bytes(serialization.Encoding.PEM).decode()
+
+def make_token(key, **claims):
+    kid, private_pem, _ = key
+    now = int(time.time())
+    payload = dict(iss='https://accounts.google.com', aud=AUDIENCE, sub='1234', email='user@example.com', iat=now, exp=now + 3600)
+    payload.update(claims)
+    return google_jwt.encode(crypt.RSASigner.from_string(private_pem, key_id=kid), payload).decode()
+
+class CertServer:
+    """Local stand-in for Google's certs endpoint; keys, headers and status can be swapped between requests"""
+
+    def __init__(self):
+        self.keys = []
+        self.headers = {'Cache-Control': 'public, max-age=600'}
+        self.status = 200
+        self.requests = 0
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                server.requests += 1
+                body = json.dumps({kid: cert for kid, _, cert in server.keys}).encode()
+                self.send_response(server.status)
+                self.send_header('Content-Type', 'application/json')
+                for name, value in server.headers.items():
+                    self.send_header(name, value)
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        self.httpd = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        self.url = f"http://127.0.0.1:{self.httpd.server_port}/oauth2/v1/certs"
+        threading.Thread(target=self.httpd.serve_forever, daemon=True).start()
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+class FakeClock:
+    """Stands in for the time module inside app.google_tokens so expiry can be stepped through"""
+
+    def __init__(self):
+        self.now = 1000.0
+
+    def monotonic(self):
+        return self.now
+
+    def advance(self, seconds):
+        self.now += seconds
+
+@pytest.fixture
+def server():
+    server = CertServer()
+    yield server
+    server.stop()
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(google_tokens, 'time', clock)
+    return clock
+
+@pytest.fixture
+def verifier(server, clock):
+    return GoogleTokenVerifier(certs_url=server.url, default_ttl=3600, refresh_margin=300, min_refetch_interval=60)
+
+def wait_for_refresh(verifier):
+    deadline = time.time() + 5
+    while verifier._refreshing and time.time() < deadline:
+        time.sleep(0.01)
+    assert not verifier._refreshing
+
+def test_cache_lifetime_honours_max_age_and_age():
+    assert cache_lifetime({'Cache-Control': 'public, max-age=19800, must-revalidate'}, 3600) == 19800
+    assert cache_lifetime({'Cache-Control': 'max-age=600', 'Age': '100'}, 3600) == 500
+    assert cache_lifetime({'Cache-Control': 'max-age=60', 'Age': '100'}, 3600) == 0
+    assert cache_lifetime({'Cache-Control': 'no-store'}, 3600) == 0
+    assert cache_lifetime({}, 3600) == 3600
+
+def test_certs_are_reused_until_max_age_expires(server, verifier, clock):
+    key = make_key('key-1')
+    server.keys = [key]
+    server.headers = {'Cache-Control': 'public, max-age=600', 'Age': '100'}
+
+    assert verifier.verify(make_token(key), AUDIENCE)['email'] == 'user@example.com'
+    clock.advance(150) # Still outside the refresh margin of the 500s lifetime
+    verifier.verify(make_token(key), AUDIENCE)
+    assert server.requests == 1
+
+    clock.advance(400)
+    verifier.verify(make_token(key), AUDIENCE)
+    assert server.requests == 2
+
+def test_refreshes_in_background_before_expiry(server, verifier, clock):
+    old_key, new_key = make_key('old'), make_key('new')
+    server.keys = [old_key]
+    verifier.verify(make_token(old_key), AUDIENCE)
+
+    server.keys = [old_key, new_key]
+    clock.advance(400) # Inside the 300s margin before the 600s expiry
+    assert 'new' not in verifier.certs() # Served from cache without waiting on the fetch
+    wait_for_refresh(verifier)
+    assert server.requests == 2
+    assert set(verifier.certs()) == {'old', 'new'}
+    assert verifier._expires_at == clock.now + 600
+
+    verifier.verify(make_token(new_key), AUDIENCE)
+    assert server.requests == 2
+
+def test_unknown_kid_forces_one_refetch(server, verifier, clock):
+    current, rotated, bogus = make_key('current'), make_key('rotated'), make_key('bogus')
+    server.keys = [current]
+    verifier.verify(make_token(current), AUDIENCE)
+
+    clock.advance(61)
+    server.keys = [current, rotated] # Google rotated keys before our cached copy expired
+    assert verifier.verify(make_token(rotated), AUDIENCE)['sub'] == '1234'
+    assert server.requests == 2
+
+    with pytest.raises(ValueError):
+        verifier.verify(make_token(bogus), AUDIENCE)
+    assert server.requests == 2 # Unknown kids can't force a refetch more than once per interval
+
+    clock.advance(61)
+    with pytest.raises(ValueError):
+        verifier.verify(make_token(bogus), AUDIENCE)
+    assert server.requests == 3
+
+def test_failed_refetch_keeps_expired_keys(server, verifier, clock):
+    key = make_key('key-1')
+    server.keys = [key]
+    verifier.verify(make_token(key), AUDIENCE)
+
+    server.status = 500
+    clock.advance(601)
+    verifier.verify(make_token(key), AUDIENCE)
+    assert server.requests == 2
+    verifier.verify(make_token(key), AUDIENCE)
+    assert server.requests == 2 # Backed off instead of hitting the failing endpoint per login
+
+    server.status = 200
+    clock.advance(61)
+    verifier.verify(make_token(key), AUDIENCE)
+    assert server.requests == 3
+
+def test_rejects_wrong_audience_and_issuer(server, verifier):
+    key = make_key('key-1')
+    server.keys = [key]
+    with pytest.raises(ValueError):
+        verifier.verify(make_token(key, aud='someone-else'), AUDIENCE)
+    with pytest.raises(ValueError):
+        verifier.verify(make_token(key, iss='https://evil.example.com'), AUDIENCE)
@@ -0,0 +1,37 @@
+import uuid
+
+import pytest
+
+from app.extensions import db
+from app.models.notification import Notification, NotificationCounter
+from app.models.user import User
+from app.services import notification_service
+
+@pytest.fixture
+def app(make_app):
+    app = make_app()
+    with app.app_context():
+        yield app
+
+def add_user(name, unread=0):
+    user = User(id=str(uuid.uuid4()), first_name=name, last_name='N', email=f'{name}@example.com', email_lower=f'{name}@example.com')
+    db.session.add(user)
+    for i in range(unread):
+        db.session.add(Notification(user_id=user.id, title=f'n{i}', message='m'))
+    db.session.commit()
+    return user
+
+def test_reconcile_counts_only_drifted_counters(app):
+    accurate, drifted, uncounted = add_user('accurate', 2), add_user('drifted', 3), add_user('uncounted', 1)
+    for user in (accurate, drifted):
+        notification_service.rebuild_counter(user)
+    db.session.commit()
+    NotificationCounter.query.get(drifted.id).unread_count = 7
+    db.session.commit()
+
+    assert notification_service.reconcile_unread_counters(batch_size=1) == 1
+    assert NotificationCounter.query.get(drifted.id).unread_count == 3
+    assert NotificationCounter.query.get(accurate.id).unread_count == 2
+    # Left for get_unread_count to build on first read
+    assert NotificationCounter.query.get(uncounted.id) is None
+    assert notification_service.get_unread_count(uncounted.id) == 1
@@ -0,0 +1,56 @@
+import uuid
+from datetime import datetime, timedelta
+
+import pytest
+
+from app.extensions import db
+from app.models.notification import Notification, BroadcastNotification
+from app.models.user import User
+from app.pagination import parse_cursor
+from app.services import notification_service
+
+START = datetime(2026, 1, 1)
+
+@pytest.fixture
+def app(make_app):
+    app = make_app()
+    with app.app_context():
+        yield app
+
+@pytest.fixture
+def user(app):
+    user = User(id=str(uuid.uuid4()), first_name='Pat', last_name='P', email='pat@example.com', email_lower='pat@example.com', created_at=START)
+    db.session.add(user)
+    db.session.commit()
+    return user
+
+def add_personal(user, minutes):
+    for m in minutes:
+        db.session.add(Notification(user_id=user.id, title=f'p{m}', message='m', created_at=START + timedelta(minutes=m)))
+    db.session.commit()
+
+def add_broadcasts(minutes):
+    for m in minutes:
+        db.session.add(BroadcastNotification(title=f'b{m}', message='m', target_type='ALL', created_at=START + timedelta(minutes=m)))
+    db.session.commit()
+
+def walk(user, limit):
+    pages, cursor = [], None
+    while True:
+        items, next_cursor = notification_service.get_notifications(user.id, limit=limit, before=cursor)
+        pages.append([n['title'] for n in items])
+        if not next_cursor:
+            return pages
+        cursor = parse_cursor(next_cursor)
+
+def test_no_cursor_when_one_source_exactly_fills_the_page(user):
+    add_personal(user, [1, 2, 3])
+    items, next_cursor = notification_service.get_notifications(user.id, limit=3)
+    assert len(items) == 3
+    assert next_cursor is None
+
+def test_merged_pages_end_without_an_empty_page(user):
+    add_personal(user, [1, 3, 5])
+    add_broadcasts([2, 4, 6])
+    assert walk(user, 2) == [['b6', 'p5'], ['b4', 'p3'], ['b2', 'p1']]
+    assert walk(user, 3) == [['b6', 'p5', 'b4'], ['p3', 'b2', 'p1']]
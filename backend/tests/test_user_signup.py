@@ -0,0 +1,44 @@
+import uuid
+
+import pytest
+
+from app.extensions import db
+from app.models.email_outbox import OutboundEmail
+from app.models.setting import GlobalSetting
+from app.models.user import User
+from app.services import user_service
+
+SIGNUP = dict(email='Racer@Example.com', password='pw123456', first_name='Race', last_name='R', phone_number='0911')
+
+@pytest.fixture
+def app(make_app):
+    app = make_app(BCRYPT_LOG_ROUNDS=4)
+    with app.app_context():
+        db.session.add(GlobalSetting(key='require_otp_for_signup', value='true'))
+        db.session.commit()
+        yield app
+
+def insert_conflicting_user(email):
+    """What a concurrent signup commits between our existence check and our flush"""
+    with db.engine.begin() as conn:
+        conn.execute(User.__table__.insert().values(
+            id=str(uuid.uuid4()), first_name='Other', last_name='O', email=email, email_lower=User.normalize_email(email)
+        ))
+
+def test_losing_the_signup_race_returns_none(app, monkeypatch):
+    exists = user_service.get_user_by_email
+    def lookup_then_lose_race(email):
+        found = exists(email)
+        insert_conflicting_user('racer@example.com')
+        return found
+    monkeypatch.setattr(user_service, 'get_user_by_email', lookup_then_lose_race)
+
+    assert user_service.create_user(dict(SIGNUP)) is None
+    assert User.query.filter_by(email_lower='racer@example.com').count() == 1
+    assert OutboundEmail.query.count() == 0 # The OTP email rolled back with the account
+
+def test_signup_queues_otp_with_the_account(app):
+    user = user_service.create_user(dict(SIGNUP))
+    assert user is not None and user.email_otp
+    assert [e.recipients for e in OutboundEmail.query.all()] == [['Racer@Example.com']]
+    assert user_service.create_user(dict(SIGNUP, email='racer@example.com')) is None
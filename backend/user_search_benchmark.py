@@ -0,0 +1,69 @@
+import argparse
+import os
+import statistics
+import sys
+import tempfile
+import time
+import uuid
+
+# Admin directory search latency: the indexed predicate from
+# user_service._user_search_filter against the leading-wildcard ILIKE it
+# replaced. Seeds `--users` accounts into a throwaway SQLite database and
+# times the same paginated query get_all_users runs, COUNT included, taking
+# the median of `--repeat` runs per term.
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Admin user search benchmark")
+    parser.add_argument("--users", type=int, default=200000, help="Accounts to seed")
+    parser.add_argument("--terms", default="user19999,last123456,xyzzy,us", help="Comma-separated search terms")
+    parser.add_argument("--repeat", type=int, default=5, help="Runs per term and predicate")
+    return parser.parse_args()
+
+def time_query(query, repeat):
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        query.paginate(page=1, per_page=20, error_out=False).total
+        timings.append((time.perf_counter() - started) * 1000)
+    return statistics.median(timings)
+
+def main():
+    args = parse_args()
+    db_file = tempfile.NamedTemporaryFile(suffix='.db', delete=False)
+    db_file.close()
+    os.environ['DATABASE_URL'] = f"sqlite:///{db_file.name}"
+
+    from app import create_app
+    from app.extensions import db
+    from app.models.enums import UserRole
+    from app.models.user import User
+    from app.services.user_service import _user_search_filter
+
+    app = create_app()
+    try:
+        with app.app_context():
+            started = time.perf_counter()
+            for start in range(0, args.users, 20000):
+                db.session.execute(User.__table__.insert(), [
+                    dict(id=str(uuid.uuid4()), first_name=f'First{i}', last_name=f'Last{i}', email=f'user{i}@example.com',
+                         email_lower=f'user{i}@example.com', role=UserRole.SENDER)
+                    for i in range(start, min(start + 20000, args.users))
+                ])
+            db.session.commit()
+            print(f"Seeded {args.users} users in {time.perf_counter() - started:.1f}s")
+
+            print(f"{'term':>12} {'matches':>8} {'ilike ms':>9} {'index ms':>9}")
+            for term in args.terms.split(','):
+                like = f"%{term}%"
+                legacy = User.query.filter(User.first_name.ilike(like) | User.last_name.ilike(like) | User.email.ilike(like))
+                indexed = User.query.filter(_user_search_filter(term))
+                matches = indexed.count()
+                legacy_ms = time_query(legacy.order_by(User.created_at.desc()), args.repeat)
+                indexed_ms = time_query(indexed.order_by(User.created_at.desc()), args.repeat)
+                print(f"{term:>12} {matches:>8} {legacy_ms:>9.1f} {indexed_ms:>9.1f}")
+    finally:
+        os.remove(db_file.name)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,182 @@
+import asyncio
+import argparse
+import json
+import statistics
+import sys
+import time
+from datetime import datetime
+
+import requests
+import websockets
+
+# Fan-out load test for the chat WebSocket. Opens N sockets as the receiving
+# user, sends messages over one socket as the sender, and measures how long
+# each message takes to reach every receiver connection.
+#
+# With --integrity-bursts, both users then fire sends and pings back to back
+# on one socket each, so acks, pongs and pushed message events are written to
+# the same connection concurrently. Every frame must arrive as valid JSON of
+# a known type, and each side must get exactly one ack per send and every
+# message the other side sent; a corrupted frame fails the run.
+#
+# The dev server must be threaded (one thread per socket), and the client
+# needs enough file descriptors, e.g. `ulimit -n 20000` for 5000 connections.
+
+BASE_URL = "http://localhost:5000/api/v1"
+WS_URL = "ws://localhost:5000/api/v1/messages/ws"
+
+def login(email, password):
+    resp = requests.post(f"{BASE_URL}/users/login", json={"email": email, "password": password}, timeout=15)
+    if resp.status_code != 200:
+        print(f"CRITICAL: Login failed for {email} with status {resp.status_code}")
+        sys.exit(1)
+    data = resp.json()
+    return data['token'], data['user']['id']
+
+def open_thread(token, participant_id):
+    resp = requests.post(
+        f"{BASE_URL}/messages/threads",
+        json={"participant_id": participant_id},
+        headers={"Authorization": f"Bearer {token}"},
+        timeout=15
+    )
+    resp.raise_for_status()
+    return resp.json()['id']
+
+async def receiver(token, sent_at, latencies, ready, expected):
+    async with websockets.connect(f"{WS_URL}?jwt={token}", open_timeout=60, max_queue=None) as ws:
+        ready.append(ws)
+        received = 0
+        while received < expected:
+            frame = json.loads(await ws.recv())
+            if frame.get('type') != 'message':
+                continue
+            started = sent_at.get(frame['data']['text'])
+            if started is not None:
+                latencies.append(time.perf_counter() - started)
+                received += 1
+
+FRAME_TYPES = {'ack', 'error', 'pong', 'ping', 'resync', 'message', 'notification', 'thread.read'}
+
+def integrity_text(name, i):
+    return f"integrity {name} {i}"
+
+async def duplex_side(ws, name, peer, thread_id, bursts, results):
+    """Send `bursts` messages and pings back to back while a reader collects every frame"""
+    acks, events, bad = {}, set(), []
+    expected = {integrity_text(peer, i) for i in range(bursts)}
+    results[name] = (acks, events, bad, expected)
+
+    async def read():
+        while len(acks) < bursts or not expected <= events:
+            raw = await ws.recv()
+            try:
+                frame = json.loads(raw)
+            except ValueError:
+                bad.append(raw[:200])
+                continue
+            if not isinstance(frame, dict) or frame.get('type') not in FRAME_TYPES:
+                bad.append(str(raw)[:200])
+            elif frame['type'] == 'ack':
+                acks[frame['client_id']] = acks.get(frame['client_id'], 0) + 1
+            elif frame['type'] == 'message':
+                events.add(frame['data']['text'])
+            elif frame['type'] == 'error':
+                bad.append(f"error frame: {frame.get('error')}")
+
+    reader = asyncio.create_task(read())
+    for i in range(bursts):
+        await ws.send(json.dumps({"type": "send", "thread_id": thread_id, "text": integrity_text(name, i), "client_id": f"{name}-{i}"}))
+        await ws.send(json.dumps({"type": "ping"}))
+    await reader
+
+async def integrity_check(args, sender_token, receiver_token, thread_id):
+    results = {}
+    async with websockets.connect(f"{WS_URL}?jwt={sender_token}", max_queue=None) as a, \
+            websockets.connect(f"{WS_URL}?jwt={receiver_token}", max_queue=None) as b:
+        try:
+            await asyncio.wait_for(asyncio.gather(
+                duplex_side(a, 'sender', 'receiver', thread_id, args.integrity_bursts, results),
+                duplex_side(b, 'receiver', 'sender', thread_id, args.integrity_bursts, results)
+            ), timeout=args.timeout)
+        except asyncio.TimeoutError:
+            print("CRITICAL: Integrity check timed out waiting for acks and peer messages")
+        except websockets.ConnectionClosed as e:
+            print(f"CRITICAL: Socket closed during integrity check: {e}")
+
+    ok = True
+    for name in ('sender', 'receiver'):
+        acks, events, bad, expected = results[name]
+        duplicated = [k for k, n in acks.items() if n != 1]
+        print(f"{name}: {len(acks)}/{args.integrity_bursts} acks, {len(expected & events)}/{len(expected)} peer messages, "
+              f"{len(duplicated)} duplicate acks, {len(bad)} bad frames")
+        for frame in bad[:5]:
+            print(f"  bad frame: {frame}")
+        ok = ok and not bad and not duplicated and len(acks) == args.integrity_bursts and expected <= events
+    return ok
+
+async def run(args):
+    receiver_token, receiver_id = login(args.receiver_email, args.password)
+    sender_token, _ = login(args.sender_email, args.password)
+    thread_id = open_thread(sender_token, receiver_id)
+
+    if args.connections <= 0:
+        ok = await integrity_check(args, sender_token, receiver_token, thread_id)
+        print("Frame integrity OK" if ok else "CRITICAL: Frame integrity check failed")
+        return 0 if ok else 1
+
+    sent_at, latencies, ready = {}, [], []
+    print(f"[{datetime.now()}] Opening {args.connections} receiver connections...")
+    connect_started = time.perf_counter()
+    tasks = []
+    for _ in range(args.connections):
+        tasks.append(asyncio.create_task(receiver(receiver_token, sent_at, latencies, ready, args.messages)))
+        await asyncio.sleep(args.connect_delay)
+    while len(ready) < args.connections:
+        failed = [t for t in tasks if t.done() and t.exception()]
+        if failed:
+            print(f"CRITICAL: {len(failed)} connections failed: {failed[0].exception()}")
+            return 1
+        await asyncio.sleep(0.1)
+    print(f"[{datetime.now()}] Connected in {time.perf_counter() - connect_started:.1f}s")
+
+    async with websockets.connect(f"{WS_URL}?jwt={sender_token}") as ws:
+        for i in range(args.messages):
+            text = f"load-test {i} {time.time()}"
+            sent_at[text] = time.perf_counter()
+            await ws.send(json.dumps({"type": "send", "thread_id": thread_id, "text": text, "client_id": str(i)}))
+            await asyncio.sleep(args.interval)
+
+        try:
+            await asyncio.wait_for(asyncio.gather(*tasks), timeout=args.timeout)
+        except asyncio.TimeoutError:
+            print("WARNING: Timed out waiting for deliveries")
+
+    expected = args.connections * args.messages
+    print(f"Delivered {len(latencies)}/{expected} messages")
+    if latencies:
+        latencies.sort()
+        p = lambda q: latencies[min(len(latencies) - 1, int(len(latencies) * q))] * 1000
+        print(f"Latency ms: mean={statistics.mean(latencies) * 1000:.1f} p50={p(0.5):.1f} "
+              f"p95={p(0.95):.1f} p99={p(0.99):.1f} max={latencies[-1] * 1000:.1f}")
+    ok = len(latencies) == expected
+    if args.integrity_bursts:
+        intact = await integrity_check(args, sender_token, receiver_token, thread_id)
+        print("Frame integrity OK" if intact else "CRITICAL: Frame integrity check failed")
+        ok = ok and intact
+    return 0 if ok else 1
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Chat WebSocket fan-out load test")
+    parser.add_argument("--connections", type=int, default=5000)
+    parser.add_argument("--messages", type=int, default=10)
+    parser.add_argument("--interval", type=float, default=0.5, help="Seconds between sends")
+    parser.add_argument("--connect-delay", type=float, default=0.002, help="Seconds between opening sockets")
+    parser.add_argument("--timeout", type=float, default=60)
+    parser.add_argument("--integrity-bursts", type=int, default=0,
+                        help="Sends per side for the concurrent ack/event frame integrity check; use with --connections 0 to run it alone")
+    parser.add_argument("--sender-email", default="sender@globalpath.com")
+    parser.add_argument("--receiver-email", default="receiver@globalpath.com")
+    parser.add_argument("--password", default="password123")
+    args = parser.parse_args()
+    sys.exit(asyncio.run(run(args)))
@@ -28,10 +28,10 @@ const Navbar: React.FC<NavbarProps> = ({ user, onLogout, onNavigate, currentPage
   const loadNotifications = async () => {
     try {
       const [notifs, count] = await Promise.all([
-        NotificationService.getNotifications(),
+        NotificationService.getNotifications(5), // Only show last 5 in dropdown
         NotificationService.getUnreadCount()
       ]);
-      setNotifications(notifs.slice(0, 5)); // Only show last 5 in dropdown
+      setNotifications(notifs);
       setUnreadCount(count);
     } catch (e) { console.error(e); }
   };
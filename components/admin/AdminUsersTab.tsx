@@ -62,6 +62,9 @@ const AdminUsersTab: React.FC<AdminUsersTabProps> = ({ onVerify }) => {
     fetchUsers(currentPage, searchTerm, filterRole, filterStatus);
   };
 
+  // Review thumbnails load first; the full document opens in the modal
+  const thumbnailFor = (u: User, field: string, url: string) => u.kycDocuments?.[field]?.thumbnailUrl || url;
+
   const openModal = (type: 'image' | 'video', url: string) => {
     setModalContent({ type, url });
   };
@@ -215,7 +218,7 @@ const AdminUsersTab: React.FC<AdminUsersTabProps> = ({ onVerify }) => {
                                 <div className="space-y-4">
                                   {u.idFrontUrl ? (
                                     <div className="group relative cursor-pointer" onClick={() => openModal('image', u.idFrontUrl!)}>
-                                      <img src={u.idFrontUrl} className="w-full h-40 object-cover rounded-2xl border-2 border-slate-100" alt="ID Front" />
+                                      <img src={thumbnailFor(u, 'id_front_url', u.idFrontUrl)} loading="lazy" className="w-full h-40 object-cover rounded-2xl border-2 border-slate-100" alt="ID Front" />
                                       <div className="absolute inset-0 bg-slate-900/60 opacity-0 group-hover:opacity-100 transition-opacity rounded-2xl flex items-center justify-center text-white text-[10px] font-black uppercase tracking-widest text-center px-4">Click to Inspect Artifact</div>
                                       <p className="mt-2 text-[9px] font-bold text-slate-400 uppercase tracking-widest text-center">Primary Document (Front)</p>
                                     </div>
@@ -227,7 +230,7 @@ const AdminUsersTab: React.FC<AdminUsersTabProps> = ({ onVerify }) => {
                                   )}
                                   {u.idBackUrl ? (
                                     <div className="group relative cursor-pointer" onClick={() => openModal('image', u.idBackUrl!)}>
-                                      <img src={u.idBackUrl} className="w-full h-40 object-cover rounded-2xl border-2 border-slate-100" alt="ID Back" />
+                                      <img src={thumbnailFor(u, 'id_back_url', u.idBackUrl)} loading="lazy" className="w-full h-40 object-cover rounded-2xl border-2 border-slate-100" alt="ID Back" />
                                       <div className="absolute inset-0 bg-slate-900/60 opacity-0 group-hover:opacity-100 transition-opacity rounded-2xl flex items-center justify-center text-white text-[10px] font-black uppercase tracking-widest text-center px-4">Click to Inspect Artifact</div>
                                       <p className="mt-2 text-[9px] font-bold text-slate-400 uppercase tracking-widest text-center">Primary Document (Back)</p>
                                     </div>
@@ -249,7 +252,7 @@ const AdminUsersTab: React.FC<AdminUsersTabProps> = ({ onVerify }) => {
                                 <div className="space-y-4">
                                   {u.selfieUrl ? (
                                     <div className="group relative cursor-pointer" onClick={() => openModal('image', u.selfieUrl!)}>
-                                      <img src={u.selfieUrl} className="w-full h-40 object-cover rounded-2xl border-2 border-slate-100" alt="Selfie" />
+                                      <img src={thumbnailFor(u, 'selfie_url', u.selfieUrl)} loading="lazy" className="w-full h-40 object-cover rounded-2xl border-2 border-slate-100" alt="Selfie" />
                                       <div className="absolute inset-0 bg-slate-900/60 opacity-0 group-hover:opacity-100 transition-opacity rounded-2xl flex items-center justify-center text-white text-[10px] font-black uppercase tracking-widest text-center px-4">Verify Identity</div>
                                       <p className="mt-2 text-[9px] font-bold text-slate-400 uppercase tracking-widest text-center">Live Headshot</p>
                                     </div>
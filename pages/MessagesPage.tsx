@@ -8,6 +8,15 @@ interface MessagesPageProps {
   user: User;
 }
 
+// Union of two message lists by id, oldest first; keeps paged-in history while the newest page is polled
+const mergeMessages = (current: Message[], incoming: Message[]): Message[] => {
+  const byId = new Map(current.map(m => [m.id, m]));
+  incoming.forEach(m => byId.set(m.id, m));
+  return Array.from(byId.values()).sort((a, b) =>
+    new Date(a.timestamp).getTime() - new Date(b.timestamp).getTime() || a.id.localeCompare(b.id)
+  );
+};
+
 const MessagesPage: React.FC<MessagesPageProps> = ({ user }) => {
   const location = useLocation();
   const [threads, setThreads] = useState<MessageThread[]>([]);
@@ -33,6 +42,8 @@ const MessagesPage: React.FC<MessagesPageProps> = ({ user }) => {
 
   const [activeThreadId, setActiveThreadId] = useState<string | null>(initialThreadId || null);
   const [messages, setMessages] = useState<Message[]>([]);
+  const [olderCursor, setOlderCursor] = useState<string | null>(null);
+  const [loadingOlder, setLoadingOlder] = useState(false);
   const [inputText, setInputText] = useState('');
   const [showListOnMobile, setShowListOnMobile] = useState(!initialThreadId);
   const scrollRef = useRef<HTMLDivElement>(null);
@@ -56,20 +67,47 @@ const MessagesPage: React.FC<MessagesPageProps> = ({ user }) => {
 
   useEffect(() => {
     if (activeThreadId) {
+      setMessages([]);
+      setOlderCursor(null);
+      let first = true;
+      let active = true;
       const fetchMessages = async () => {
         try {
-          const msgs = await MessageService.getThreadMessages(activeThreadId);
-          setMessages(msgs);
+          const page = await MessageService.getThreadMessagePage(activeThreadId);
+          if (!active) return; // Thread switched while the request was in flight
+          setMessages(prev => mergeMessages(prev, page.messages));
+          if (first) {
+            // Older history is paged in on demand; polling only refreshes the newest page
+            setOlderCursor(page.nextCursor);
+            first = false;
+          }
         } catch (e) {
           console.error("Failed to fetch messages", e);
         }
       };
       fetchMessages();
       const interval = setInterval(fetchMessages, 3000);
-      return () => clearInterval(interval);
+      return () => {
+        active = false;
+        clearInterval(interval);
+      };
     }
   }, [activeThreadId]);
 
+  const loadOlderMessages = async () => {
+    if (!activeThreadId || !olderCursor) return;
+    setLoadingOlder(true);
+    try {
+      const page = await MessageService.getThreadMessagePage(activeThreadId, olderCursor);
+      setMessages(prev => mergeMessages(prev, page.messages));
+      setOlderCursor(page.nextCursor);
+    } catch (e) {
+      console.error("Failed to load older messages", e);
+    } finally {
+      setLoadingOlder(false);
+    }
+  };
+
   useEffect(() => {
     if (scrollRef.current) {
       scrollRef.current.scrollTo({
@@ -86,7 +124,7 @@ const MessagesPage: React.FC<MessagesPageProps> = ({ user }) => {
       setInputText('');
       // Refresh messages immediately
       const msgs = await MessageService.getThreadMessages(activeThreadId);
-      setMessages(msgs);
+      setMessages(prev => mergeMessages(prev, msgs));
     } catch (e) {
       console.error("Failed to send message", e);
     }
@@ -234,6 +272,17 @@ const MessagesPage: React.FC<MessagesPageProps> = ({ user }) => {
 
             {/* Messages Stream */}
             <div ref={scrollRef} className="flex-1 overflow-y-auto p-8 space-y-8 bg-slate-50/30 custom-scrollbar">
+              {olderCursor && (
+                <div className="text-center">
+                  <button
+                    onClick={loadOlderMessages}
+                    disabled={loadingOlder}
+                    className="text-[10px] font-black text-slate-400 uppercase tracking-widest hover:text-[#009E49] disabled:opacity-50"
+                  >
+                    {loadingOlder ? 'Loading...' : 'Load Earlier Messages'}
+                  </button>
+                </div>
+              )}
               {Object.keys(groupedMessages).length === 0 ? (
                 <div className="h-full flex flex-col items-center justify-center opacity-40">
                   <div className="w-20 h-20 bg-white rounded-full flex items-center justify-center shadow-sm mb-4">
@@ -9,6 +9,8 @@ interface NotificationsPageProps {
 const NotificationsPage: React.FC<NotificationsPageProps> = ({ user }) => {
     const [notifications, setNotifications] = useState<Notification[]>([]);
     const [loading, setLoading] = useState(true);
+    const [nextCursor, setNextCursor] = useState<string | null>(null);
+    const [loadingMore, setLoadingMore] = useState(false);
 
     useEffect(() => {
         fetchNotifications();
@@ -17,8 +19,9 @@ const NotificationsPage: React.FC<NotificationsPageProps> = ({ user }) => {
     const fetchNotifications = async () => {
         setLoading(true);
         try {
-            const data = await NotificationService.getNotifications();
-            setNotifications(data);
+            const page = await NotificationService.getNotificationPage();
+            setNotifications(page.items);
+            setNextCursor(page.nextCursor);
         } catch (error) {
             console.error('Failed to fetch notifications', error);
         } finally {
@@ -26,6 +29,20 @@ const NotificationsPage: React.FC<NotificationsPageProps> = ({ user }) => {
         }
     };
 
+    const fetchMore = async () => {
+        if (!nextCursor) return;
+        setLoadingMore(true);
+        try {
+            const page = await NotificationService.getNotificationPage(nextCursor);
+            setNotifications(prev => [...prev, ...page.items]);
+            setNextCursor(page.nextCursor);
+        } catch (error) {
+            console.error('Failed to fetch more notifications', error);
+        } finally {
+            setLoadingMore(false);
+        }
+    };
+
     const handleMarkAsRead = async (id: string) => {
         try {
             await NotificationService.markAsRead(id);
@@ -104,7 +121,7 @@ const NotificationsPage: React.FC<NotificationsPageProps> = ({ user }) => {
                                     <div className="flex-1 min-w-0">
                                         <div className="flex justify-between items-start mb-1">
                                             <h4 className="text-sm font-black text-slate-900 uppercase tracking-tight">{notif.title}</h4>
-                                            <span className="text-[10px] font-bold text-slate-400 uppercase tracking-widest">{new Date(notif.created_at).toLocaleString()}</span>
+                                            <span className="text-[10px] font-bold text-slate-400 uppercase tracking-widest">{new Date(notif.updated_at || notif.created_at).toLocaleString()}</span>
                                         </div>
                                         <p className="text-slate-600 text-sm font-medium leading-relaxed mb-4">{notif.message}</p>
 
@@ -129,6 +146,17 @@ const NotificationsPage: React.FC<NotificationsPageProps> = ({ user }) => {
                                     </div>
                                 </div>
                             ))}
+                            {nextCursor && (
+                                <div className="p-6 text-center">
+                                    <button
+                                        onClick={fetchMore}
+                                        disabled={loadingMore}
+                                        className="text-[10px] font-black text-slate-500 uppercase tracking-widest hover:text-[#009E49] disabled:opacity-50"
+                                    >
+                                        {loadingMore ? 'Loading...' : 'Load Older'}
+                                    </button>
+                                </div>
+                            )}
                         </div>
                     )}
                 </div>
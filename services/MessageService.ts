@@ -2,6 +2,11 @@ import api from './api';
 import { Message, MessageThread } from '../types';
 import { transformUserData } from './UserService';
 
+export interface MessagePage {
+    messages: Message[];
+    nextCursor: string | null;
+}
+
 export const MessageService = {
     getUserThreads: async (): Promise<MessageThread[]> => {
         const response = await api.get('/messages/threads');
@@ -23,12 +28,21 @@ export const MessageService = {
     },
 
     getThreadMessages: async (threadId: string): Promise<Message[]> => {
-        const response = await api.get(`/messages/threads/${threadId}/messages`);
-        return response.data.map((msg: any) => ({
-            ...msg,
-            sender: msg.sender ? transformUserData(msg.sender) : null,
-            receiver: msg.receiver ? transformUserData(msg.receiver) : null
-        }));
+        const page = await MessageService.getThreadMessagePage(threadId);
+        return page.messages;
+    },
+
+    // Newest page without a cursor; pass the returned nextCursor as `before` to load older history
+    getThreadMessagePage: async (threadId: string, before?: string): Promise<MessagePage> => {
+        const response = await api.get(`/messages/threads/${threadId}/messages`, { params: { before } });
+        return {
+            messages: response.data.map((msg: any) => ({
+                ...msg,
+                sender: msg.sender ? transformUserData(msg.sender) : null,
+                receiver: msg.receiver ? transformUserData(msg.receiver) : null
+            })),
+            nextCursor: response.headers['x-next-cursor'] || null
+        };
     },
 
     sendMessage: async (threadId: string, text: string): Promise<Message> => {
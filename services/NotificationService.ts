@@ -8,12 +8,26 @@ export interface Notification {
     link?: string;
     is_read: boolean;
     created_at: string;
+    updated_at?: string; // Newest event folded into a grouped notification
+}
+
+export interface NotificationPage {
+    items: Notification[];
+    nextCursor: string | null;
 }
 
 export const NotificationService = {
-    async getNotifications(): Promise<Notification[]> {
-        const response = await api.get('/notifications');
-        return response.data;
+    async getNotifications(limit?: number): Promise<Notification[]> {
+        const page = await NotificationService.getNotificationPage(undefined, limit);
+        return page.items;
+    },
+
+    async getNotificationPage(before?: string, limit?: number): Promise<NotificationPage> {
+        const response = await api.get('/notifications', { params: { before, limit } });
+        return {
+            items: response.data,
+            nextCursor: response.headers['x-next-cursor'] || null
+        };
     },
 
     async getUnreadCount(): Promise<number> {
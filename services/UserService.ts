@@ -33,6 +33,18 @@ export const transformUserData = (userData: any): User => {
         idFrontUrl: userData.id_front_url,
         idBackUrl: userData.id_back_url,
         livenessVideo: userData.liveness_video,
+        kycDocuments: userData.kyc_documents && Object.fromEntries(
+            Object.entries(userData.kyc_documents).map(([field, doc]: [string, any]) => [field, {
+                url: doc.url,
+                thumbnailUrl: doc.thumbnail_url,
+                size: doc.size,
+                checksum: doc.checksum,
+                originalUrl: doc.source,
+                originalChecksum: doc.original_checksum,
+                width: doc.width,
+                height: doc.height,
+            }])
+        ),
         dateOfBirth: userData.date_of_birth,
         createdAt: userData.created_at,
         averageDeliveryTime: userData.average_delivery_time,
@@ -128,6 +128,8 @@ export interface User {
   idBackUrl?: string;
   // Added livenessVideo property to track video verification status
   livenessVideo?: string;
+  // Normalized upload metadata keyed by field (id_front_url, selfie_url, ...)
+  kycDocuments?: Record<string, KycDocument>;
   dateOfBirth?: string;
   createdAt?: string;
   // Privacy Settings
@@ -137,6 +139,17 @@ export interface User {
   hideEmail?: boolean;
 }
 
+export interface KycDocument {
+  url: string;
+  thumbnailUrl?: string;
+  size: number;
+  checksum: string;
+  originalUrl?: string;
+  originalChecksum?: string;
+  width?: number;
+  height?: number;
+}
+
 export interface ShipmentItem {
   id: string;
   senderId: string;